@@ -1,20 +1,26 @@
 from django.contrib import admin
 from django.contrib.auth.admin import UserAdmin as BaseUserAdmin
 from django.contrib.auth.models import User
-from django.db.models import Sum
 
 from core.models import (
     AdPlacement, Reward, VideoTask, QuizQuestion, VideoWatchSession, QuizResponse,
-    UserProfile, SurveyCompletion, SurveyTransaction
+    UserProfile, SurveyCompletion, SurveyTransaction, PointsBalance
 )
 
 class UserAdmin(BaseUserAdmin):
     list_display = ('username', 'email', 'first_name', 'last_name', 'is_staff', 'get_total_points')
 
+    def get_queryset(self, request):
+        # join the materialized balance so the changelist doesn't query per row
+        return super().get_queryset(request).select_related('points_balance')
+
     def get_total_points(self, obj):
-        total = obj.rewards.aggregate(total=Sum('points'))['total']
-        return total or 0
+        try:
+            return obj.points_balance.total_points
+        except PointsBalance.DoesNotExist:
+            return 0
     get_total_points.short_description = 'Total Points'
+    get_total_points.admin_order_field = 'points_balance__total_points'
 
 
 # Unregister default User and register custom UserAdmin
@@ -27,6 +33,12 @@ class RewardAdmin(admin.ModelAdmin):
     list_filter = ('user', 'paid_out', 'created_at')
     search_fields = ('user__username',)
 
+@admin.register(PointsBalance)
+class PointsBalanceAdmin(admin.ModelAdmin):
+    list_display = ('user', 'total_points', 'updated_at')
+    search_fields = ('user__username',)
+    readonly_fields = ('user', 'total_points', 'updated_at')
+
 @admin.register(AdPlacement)
 class AdPlacementAdmin(admin.ModelAdmin):
     list_display = ('placement_key', 'ad_format', 'is_enabled', 'points_reward')
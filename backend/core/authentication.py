@@ -0,0 +1,157 @@
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
+from rest_framework_simplejwt.settings import api_settings
+
+from core.utils.shared_cache import cache_is_shared
+
+try:
+    from rest_framework_simplejwt.utils import get_md5_hash_password
+except ImportError:  # simplejwt < 5.4 has no token revocation check
+    get_md5_hash_password = None
+
+SHARED_CACHE_PREFIX = 'jwt-user:'
+
+# all a request needs from the user; anything else is loaded on first access
+CACHED_USER_FIELDS = ('id', 'username', 'is_active', 'is_staff')
+
+
+def _revoke_check_enabled():
+    return get_md5_hash_password is not None and getattr(api_settings, 'CHECK_REVOKE_TOKEN', False)
+
+
+def snapshot_user(user):
+    """
+    The cacheable part of a user: the fields in CACHED_USER_FIELDS and, when
+    token revocation is checked, the same password digest the token carries.
+    Never the password hash itself.
+    """
+    snapshot = {name: getattr(user, name) for name in CACHED_USER_FIELDS}
+    if _revoke_check_enabled():
+        snapshot['password_digest'] = get_md5_hash_password(user.password)
+    return snapshot
+
+
+def user_from_snapshot(snapshot):
+    """
+    A User built from snapshot_user() as if loaded with .only(): other fields
+    are fetched when first read and save() writes back only the cached ones.
+    """
+    model = get_user_model()
+    # from_db wants the loaded fields in model order
+    names = [field.attname for field in model._meta.concrete_fields if field.attname in snapshot]
+    return model.from_db('default', names, [snapshot[name] for name in names])
+
+
+class UserCache:
+    """
+    Two-level cache of user snapshots by primary key: a per-process LRU with a
+    short TTL in front of the shared Django cache. invalidate() drops an entry
+    from both; other processes pick the change up (a deactivation, say) when
+    their local TTL expires. The shared level is only used when the Django
+    cache really is shared between processes; a per-process cache there would
+    keep serving a user for the whole shared_ttl after another process
+    invalidated it.
+    """
+
+    def __init__(self, ttl=5, max_size=10000, shared_ttl=300):
+        self.ttl = ttl
+        self.max_size = max_size
+        self.shared_ttl = shared_ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, user_id):
+        # token claims may carry the id as a string; key everything by str(pk)
+        user_id = str(user_id)
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is not None:
+                user, expires_at = entry
+                if expires_at > time.monotonic():
+                    self._entries.move_to_end(user_id)
+                    return user
+                del self._entries[user_id]
+        if self.shared_ttl:
+            user = cache.get(f'{SHARED_CACHE_PREFIX}{user_id}')
+            if user is not None:
+                self._store_local(user_id, user)
+                return user
+        return None
+
+    def set(self, user_id, user):
+        user_id = str(user_id)
+        self._store_local(user_id, user)
+        if self.shared_ttl:
+            cache.set(f'{SHARED_CACHE_PREFIX}{user_id}', user, self.shared_ttl)
+
+    def invalidate(self, user_id):
+        user_id = str(user_id)
+        with self._lock:
+            self._entries.pop(user_id, None)
+        if self.shared_ttl:
+            cache.delete(f'{SHARED_CACHE_PREFIX}{user_id}')
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def _store_local(self, user_id, user):
+        with self._lock:
+            self._entries[user_id] = (user, time.monotonic() + self.ttl)
+            self._entries.move_to_end(user_id)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+
+_user_cache = None
+_user_cache_lock = threading.Lock()
+
+
+def get_user_cache():
+    global _user_cache
+    if _user_cache is None:
+        with _user_cache_lock:
+            if _user_cache is None:
+                config = settings.JWT_USER_CACHE
+                _user_cache = UserCache(
+                    ttl=config.get('TTL', 5),
+                    max_size=config.get('MAX_SIZE', 10000),
+                    shared_ttl=config.get('SHARED_TTL', 300) if cache_is_shared() else 0,
+                )
+    return _user_cache
+
+
+class CachedJWTAuthentication(JWTAuthentication):
+    """
+    simplejwt authentication that resolves the token's user from UserCache, so
+    an authenticated request doesn't need a user lookup query. The token itself
+    is still fully validated on every request.
+    """
+
+    def get_user(self, validated_token):
+        try:
+            user_id = validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError:
+            raise InvalidToken("Token contained no recognizable user identification")
+
+        user_cache = get_user_cache()
+        snapshot = user_cache.get(user_id)
+        if snapshot is None:
+            # loads from the database and runs simplejwt's own checks
+            user = super().get_user(validated_token)
+            user_cache.set(user_id, snapshot_user(user))
+            return user
+
+        if getattr(api_settings, 'CHECK_USER_IS_ACTIVE', True) and not snapshot['is_active']:
+            raise AuthenticationFailed("User is inactive", code="user_inactive")
+        if _revoke_check_enabled():
+            if validated_token.get(api_settings.REVOKE_TOKEN_CLAIM) != snapshot.get('password_digest'):
+                raise AuthenticationFailed("The user's password has been changed.", code="password_changed")
+        return user_from_snapshot(snapshot)
@@ -0,0 +1,58 @@
+from contextlib import ContextDecorator
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db import connections
+
+REPLICA_ALIAS = 'replica'
+
+_replica_reads: ContextVar[bool] = ContextVar('replica_reads', default=False)
+
+
+class replica_reads(ContextDecorator):
+    """
+    Send ORM reads to the read replica (when one is configured) for the
+    duration of a block or a sync view. Only for read-only endpoints that
+    can tolerate replication lag; never wrap code that writes and then
+    reads back, or that fills a long-lived cache.
+    """
+
+    def _recreate_cm(self):
+        # a fresh instance per decorated call, so concurrent calls don't share a token
+        return type(self)()
+
+    def __enter__(self):
+        self._token = _replica_reads.set(True)
+        return self
+
+    def __exit__(self, *exc):
+        _replica_reads.reset(self._token)
+        return False
+
+
+def replica_configured() -> bool:
+    return REPLICA_ALIAS in settings.DATABASES
+
+
+class ReadReplicaRouter:
+    """
+    Writes, migrations and every read outside replica_reads() go to
+    'default'. Inside replica_reads(), reads go to the replica unless the
+    default connection is in a transaction, so a transaction always reads
+    its own writes.
+    """
+
+    def db_for_read(self, model, **hints):
+        if _replica_reads.get() and replica_configured() and not connections['default'].in_atomic_block:
+            return REPLICA_ALIAS
+        return None
+
+    def db_for_write(self, model, **hints):
+        return 'default'
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # the replica mirrors default, so objects from either may be related
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db != REPLICA_ALIAS
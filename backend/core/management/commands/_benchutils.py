@@ -0,0 +1,54 @@
+"""Helpers shared by the bench_* management commands."""
+
+import math
+import os
+import tempfile
+from contextlib import contextmanager
+
+from django.db import connection, connections
+
+
+@contextmanager
+def isolated_database(on_disk=False):
+    """
+    Run a benchmark against a throwaway test database so it never touches
+    real data. The database is destroyed again on exit.
+
+    SQLite test databases are in-memory by default; ``on_disk`` puts the
+    database in a temporary file instead, so concurrent benchmarks see real
+    file locking and journaling. Aliases whose TEST MIRROR is 'default'
+    (a read replica) are pointed at the same throwaway database.
+    """
+    old_name = connection.settings_dict['NAME']
+    test_settings = connection.settings_dict.setdefault('TEST', {})
+    old_test_name = test_settings.get('NAME')
+    tmp_dir = None
+    if on_disk and connection.vendor == 'sqlite':
+        tmp_dir = tempfile.TemporaryDirectory(prefix='bench-db-')
+        test_settings['NAME'] = os.path.join(tmp_dir.name, 'bench.sqlite3')
+    connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+    mirrors = {}
+    for alias in connections:
+        if connections[alias].settings_dict.get('TEST', {}).get('MIRROR') == connection.alias:
+            mirrors[alias] = connections[alias].settings_dict['NAME']
+            connections[alias].close()
+            connections[alias].creation.set_as_test_mirror(connection.settings_dict)
+    try:
+        yield
+    finally:
+        for alias, name in mirrors.items():
+            connections[alias].close()
+            connections[alias].settings_dict['NAME'] = name
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+        test_settings['NAME'] = old_test_name
+        if tmp_dir is not None:
+            tmp_dir.cleanup()
+
+
+def percentile(samples, pct):
+    """Nearest-rank percentile of a list of numbers"""
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    rank = max(1, math.ceil(pct / 100 * len(ordered)))
+    return ordered[rank - 1]
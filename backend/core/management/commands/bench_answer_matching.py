@@ -0,0 +1,49 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from core.management.commands._benchutils import isolated_database
+from core.models import QuizQuestion, VideoTask
+from core.utils.answer_matching import MATCHERS, answer_key_sets
+
+
+class Command(BaseCommand):
+    help = "Benchmark per-answer grading cost as the number of accepted alternatives grows"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--iterations', type=int, default=2000)
+        parser.add_argument('--alternatives', type=int, nargs='+', default=[0, 10, 100, 1000])
+        parser.add_argument('--modes', nargs='+', default=sorted(MATCHERS))
+
+    def handle(self, *args, **options):
+        iterations = options['iterations']
+        with isolated_database():
+            video = VideoTask.objects.create(title='bench', youtube_url='https://youtu.be/bench')
+            # every iteration loads the question afresh, the way submit_quiz_responses does;
+            # "cold" clears the process-wide key sets first (a restart or an edit)
+            self.stdout.write(f"{'mode':<8} {'alternatives':>12} {'hit (us)':>10} {'miss (us)':>10} {'cold (us)':>10}")
+            for mode in options['modes']:
+                for count in options['alternatives']:
+                    question = QuizQuestion.objects.create(
+                        video=video,
+                        question_text='Which planet is known as the red planet?',
+                        correct_answer='Mars',
+                        accepted_answers=[f'alternative answer number {i}' for i in range(count)],
+                        match_mode=mode,
+                    )
+                    hit = self._time(question.id, '  MARS ', iterations)
+                    miss = self._time(question.id, 'Jupiter', iterations)
+                    cold = self._time(question.id, '  MARS ', iterations, cold=True)
+                    self.stdout.write(f"{mode:<8} {count:>12} {hit:>10.1f} {miss:>10.1f} {cold:>10.1f}")
+
+    def _time(self, question_id, answer, iterations, cold=False):
+        # warm the key set once so the hit / miss runs measure steady state
+        QuizQuestion.objects.for_grading([question_id])[question_id].is_correct_answer(answer)
+        elapsed = 0
+        for _ in range(iterations):
+            if cold:
+                answer_key_sets.clear()
+            start = time.perf_counter_ns()
+            QuizQuestion.objects.for_grading([question_id])[question_id].is_correct_answer(answer)
+            elapsed += time.perf_counter_ns() - start
+        return elapsed / iterations / 1000
@@ -0,0 +1,93 @@
+import time
+import tracemalloc
+
+from django.core.management.base import BaseCommand
+from django.test import Client, override_settings
+from django.utils import timezone
+
+from core.management.commands._benchutils import isolated_database, percentile
+from core.models import QuizQuestion, VideoTask
+from core.services.catalogue_cache import get_catalogue_cache
+
+
+class Command(BaseCommand):
+    help = "Benchmark the video catalogue endpoints with and without the serialized response cache"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--videos', type=int, default=10000)
+        parser.add_argument('--questions', type=int, default=3, help='questions per video')
+        parser.add_argument('--pages', type=int, default=50, help='list pages walked per round')
+        parser.add_argument('--details', type=int, default=200, help='detail requests per round')
+        parser.add_argument('--rounds', type=int, default=5)
+
+    def handle(self, *args, **options):
+        with isolated_database():
+            self.stdout.write(f"seeding {options['videos']} videos ...")
+            now = timezone.now()
+            videos = VideoTask.objects.bulk_create(
+                [VideoTask(title=f'Video {i}', description='bench ' * 20, youtube_url=f'https://youtu.be/v{i}',
+                           yt_video_id=f'v{i}', created_at=now - timezone.timedelta(seconds=i))
+                 for i in range(options['videos'])],
+                batch_size=1000,
+            )
+            QuizQuestion.objects.bulk_create(
+                [QuizQuestion(video=video, question_text=f'Question {n} about {video.title}?',
+                              correct_answer='answer', answer_keys=['answer'])
+                 for video in videos for n in range(options['questions'])],
+                batch_size=1000,
+            )
+            self.detail_ids = [v.id for v in videos[::max(1, len(videos) // options['details'])]][:options['details']]
+
+            self.stdout.write(f"{'mode':<9} {'requests':>8} {'p50 ms':>7} {'p99 ms':>7} {'req/s':>8} "
+                              f"{'peak KiB/req':>13}")
+            for mode in ('uncached', 'cached'):
+                with override_settings(VIDEO_CATALOGUE_CACHE={'ENABLED': mode == 'cached'}):
+                    get_catalogue_cache().clear()
+                    self._run(mode, options)
+
+    def _round(self, client, options, samples=None, trace=False):
+        """One pass over the list pages and detail ids; appends latency or peak allocation per request"""
+        def fetch(url):
+            if trace:
+                tracemalloc.reset_peak()
+                baseline = tracemalloc.get_traced_memory()[0]
+            start = time.perf_counter()
+            response = client.get(url)
+            elapsed = time.perf_counter() - start
+            if samples is not None:
+                samples.append(tracemalloc.get_traced_memory()[1] - baseline if trace else elapsed)
+            return response
+
+        url = '/api/video-tasks/'
+        for _ in range(options['pages']):
+            url = fetch(url).json()['next']
+            if not url:
+                break
+        for video_id in self.detail_ids:
+            fetch(f'/api/video-tasks/{video_id}/')
+
+    def _run(self, mode, options):
+        client = Client()
+        # the first round warms the cache (and the ORM / URL resolver in both modes)
+        self._round(client, options)
+
+        latencies = []
+        started = time.perf_counter()
+        for _ in range(options['rounds']):
+            self._round(client, options, latencies)
+        wall = time.perf_counter() - started
+
+        # allocations are measured in a separate round so tracing doesn't skew latency
+        peaks = []
+        tracemalloc.start()
+        try:
+            self._round(client, options, peaks, trace=True)
+        finally:
+            tracemalloc.stop()
+
+        total = len(latencies)
+        self.stdout.write(
+            f"{mode:<9} {total:>8} {percentile(latencies, 50) * 1000:>7.2f} "
+            f"{percentile(latencies, 99) * 1000:>7.2f} {total / wall:>8.0f} "
+            f"{sum(peaks) / 1024 / max(len(peaks), 1):>13.1f}"
+        )
@@ -0,0 +1,90 @@
+import threading
+import time
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test import Client, override_settings
+from django.test.utils import CaptureQueriesContext
+
+from core.management.commands._benchutils import isolated_database, percentile
+from core.models import VideoTask, VideoWatchSession
+from core.services.heartbeat_buffer import get_heartbeat_buffer
+
+
+class Command(BaseCommand):
+    help = "Benchmark update_watch_progress under concurrent heartbeats (queries/request and latency)"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--threads', type=int, default=8)
+        parser.add_argument('--sessions', type=int, default=20)
+        parser.add_argument('--heartbeats', type=int, default=200, help='heartbeats per thread')
+        parser.add_argument('--modes', nargs='+', default=['direct', 'buffered'], choices=['direct', 'buffered'])
+
+    def handle(self, *args, **options):
+        with isolated_database(on_disk=True):
+            user = self.user = User.objects.create_user(username='bench', password='bench')
+            # one video per session: a user may only have one open session per video
+            session_ids = [
+                VideoWatchSession.objects.create(
+                    user=user,
+                    video=VideoTask.objects.create(title=f'bench {n}', youtube_url=f'https://youtu.be/bench{n}'),
+                ).id
+                for n in range(options['sessions'])
+            ]
+
+            self.sent = {}
+            self.stdout.write(f"{'mode':<9} {'requests':>8} {'errors':>6} {'q/req':>6} "
+                              f"{'p50 ms':>7} {'p99 ms':>7} {'req/s':>8}")
+            for mode in options['modes']:
+                heartbeat_settings = {'ENABLED': mode == 'buffered', 'FLUSH_INTERVAL': 0.5, 'MAX_PENDING': 10000}
+                with override_settings(HEARTBEAT_BUFFER=heartbeat_settings):
+                    self._run(mode, session_ids, options)
+
+            if 'buffered' in options['modes']:
+                get_heartbeat_buffer().stop()
+
+            stored = dict(VideoWatchSession.objects.filter(id__in=session_ids).values_list('id', 'watch_duration'))
+            intact = sum(1 for sid, highest in self.sent.items() if stored[sid] == highest)
+            self.stdout.write(f"sessions holding their highest acknowledged heartbeat: {intact}/{len(self.sent)}")
+
+    def _run(self, mode, session_ids, options):
+        latencies, query_counts, errors = [], [], []
+        lock = threading.Lock()
+
+        def worker(offset):
+            client = Client()
+            client.force_login(self.user)
+            for i in range(1, options['heartbeats'] + 1):
+                session_id = session_ids[(offset + i) % len(session_ids)]
+                with CaptureQueriesContext(connection) as queries:
+                    start = time.perf_counter()
+                    response = client.put(
+                        f'/api/update-watch-progress/{session_id}/',
+                        {'watch_duration': i, 'percent_viewed': i / options['heartbeats'] * 100},
+                        content_type='application/json',
+                    )
+                    elapsed = time.perf_counter() - start
+                with lock:
+                    latencies.append(elapsed)
+                    query_counts.append(len(queries))
+                    if response.status_code != 200:
+                        errors.append(response.status_code)
+                    else:
+                        self.sent[session_id] = max(self.sent.get(session_id, 0), i)
+            connection.close()
+
+        threads = [threading.Thread(target=worker, args=(n,)) for n in range(options['threads'])]
+        started = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        wall = time.perf_counter() - started
+
+        total = len(latencies)
+        self.stdout.write(
+            f"{mode:<9} {total:>8} {len(errors):>6} {sum(query_counts) / max(total, 1):>6.2f} "
+            f"{percentile(latencies, 50) * 1000:>7.2f} {percentile(latencies, 99) * 1000:>7.2f} "
+            f"{total / wall:>8.0f}"
+        )
@@ -0,0 +1,73 @@
+import os
+import pickle
+import random
+import tempfile
+import time
+import tracemalloc
+
+from django.core.management.base import BaseCommand
+
+from core.management.commands._benchutils import percentile
+from core.utils.ranked_scores import RankedScores
+
+
+class Command(BaseCommand):
+    help = "Benchmark the in-memory leaderboard structure (updates, rank lookups, top-N pages, snapshots)"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=1000000)
+        parser.add_argument('--ops', type=int, default=100000, help='operations per measured kind')
+        parser.add_argument('--page-size', type=int, default=20)
+        parser.add_argument('--seed', type=int, default=42)
+
+    def handle(self, *args, **options):
+        rng = random.Random(options['seed'])
+        users, ops, page_size = options['users'], options['ops'], options['page_size']
+        members = range(1, users + 1)
+
+        tracemalloc.start()
+        started = time.perf_counter()
+        scores = RankedScores()
+        scores.load_scores((member, rng.randint(0, 100000)) for member in members)
+        build = time.perf_counter() - started
+        memory = tracemalloc.get_traced_memory()[0]
+        tracemalloc.stop()
+        self.stdout.write(f"built {len(scores)} members in {build:.2f}s, {memory / 1024 / 1024:.0f} MiB")
+
+        self.stdout.write(f"{'operation':<12} {'ops':>8} {'p50 us':>8} {'p99 us':>8} {'ops/s':>10}")
+        self._measure('credit', ops, lambda: scores.add(rng.randint(1, users), rng.randint(1, 500)))
+        self._measure('rank', ops, lambda: scores.rank(rng.randint(1, users)))
+        self._measure('top page', ops, lambda: scores.page(0, page_size))
+        self._measure('deep page', ops, lambda: scores.page(rng.randrange(users), page_size))
+        self._measure('new member', min(ops, 10000), lambda: scores.add(users + rng.randint(1, users), 1))
+
+        fd, path = tempfile.mkstemp(suffix='.snapshot')
+        os.close(fd)
+        try:
+            started = time.perf_counter()
+            with open(path, 'wb') as f:
+                pickle.dump(scores.to_arrays(), f, protocol=pickle.HIGHEST_PROTOCOL)
+            saved = time.perf_counter() - started
+            started = time.perf_counter()
+            with open(path, 'rb') as f:
+                loaded = RankedScores.from_arrays(*pickle.load(f))
+            restored = time.perf_counter() - started
+            self.stdout.write(
+                f"snapshot {os.path.getsize(path) / 1024 / 1024:.1f} MiB: save {saved:.2f}s, load {restored:.2f}s "
+                f"({'identical' if loaded.page(0, 1000) == scores.page(0, 1000) else 'MISMATCH'})"
+            )
+        finally:
+            os.remove(path)
+
+    def _measure(self, name, count, operation):
+        latencies = []
+        started = time.perf_counter()
+        for _ in range(count):
+            start = time.perf_counter()
+            operation()
+            latencies.append(time.perf_counter() - start)
+        wall = time.perf_counter() - started
+        self.stdout.write(
+            f"{name:<12} {count:>8} {percentile(latencies, 50) * 1e6:>8.1f} "
+            f"{percentile(latencies, 99) * 1e6:>8.1f} {count / wall:>10.0f}"
+        )
@@ -0,0 +1,97 @@
+import logging
+import os
+import queue
+import tempfile
+import threading
+import time
+from logging.handlers import RotatingFileHandler
+
+from django.core.management.base import BaseCommand
+
+from core.management.commands._benchutils import percentile
+from core.utils.log_pipeline import BoundedQueueHandler, DrainingQueueListener, JsonFormatter
+
+
+class _SlowDiskHandler(RotatingFileHandler):
+    """Rotating file handler whose every flush stalls, like a busy or networked disk"""
+
+    def __init__(self, *args, flush_delay=0.0, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.flush_delay = flush_delay
+
+    def flush(self):
+        super().flush()
+        if self.flush_delay:
+            time.sleep(self.flush_delay)
+
+
+class Command(BaseCommand):
+    help = "Compare request latency with synchronous file logging vs the queue-based JSON pipeline"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--threads', type=int, default=8)
+        parser.add_argument('--requests', type=int, default=500, help='simulated requests per thread')
+        parser.add_argument('--lines', type=int, default=3, help='log lines per request')
+        parser.add_argument('--work-ms', type=float, default=1.0, help='time per request spent outside logging')
+        parser.add_argument('--flush-delay-ms', type=float, default=2.0, help='stall added to every disk flush')
+        parser.add_argument('--queue-size', type=int, default=10000)
+
+    def handle(self, *args, **options):
+        self.stdout.write(f"{'mode':<7} {'requests':>8} {'p50 ms':>7} {'p99 ms':>7} {'req/s':>8} "
+                          f"{'written':>8} {'dropped':>8}")
+        with tempfile.TemporaryDirectory() as tmp:
+            for mode in ('sync', 'queue'):
+                self._run(mode, os.path.join(tmp, f'{mode}.log'), options)
+
+    def _run(self, mode, path, options):
+        file_handler = _SlowDiskHandler(path, maxBytes=50 * 1024 * 1024, backupCount=1,
+                                        encoding='utf-8', flush_delay=options['flush_delay_ms'] / 1000)
+        file_handler.setFormatter(JsonFormatter())
+        if mode == 'sync':
+            handler = file_handler
+        else:
+            handler = BoundedQueueHandler(queue.Queue(maxsize=options['queue_size']))
+            handler.listener = DrainingQueueListener(handler.queue, file_handler)
+
+        bench_logger = logging.getLogger(f'bench_logging.{mode}')
+        bench_logger.propagate = False
+        bench_logger.setLevel(logging.INFO)
+        bench_logger.addHandler(handler)
+
+        latencies = []
+        lock = threading.Lock()
+        work = options['work_ms'] / 1000
+
+        def worker(thread_id):
+            local = []
+            for n in range(options['requests']):
+                start = time.perf_counter()
+                for line in range(options['lines']):
+                    bench_logger.info("request step", extra={'worker': thread_id, 'request': n, 'step': line})
+                time.sleep(work)  # the rest of the request, e.g. waiting on the database
+                local.append(time.perf_counter() - start)
+            with lock:
+                latencies.extend(local)
+
+        threads = [threading.Thread(target=worker, args=(n,)) for n in range(options['threads'])]
+        started = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        wall = time.perf_counter() - started
+
+        dropped = 0
+        if mode == 'queue':
+            handler.stop_listener()  # drains what was queued
+            dropped = handler.dropped
+        bench_logger.removeHandler(handler)
+        file_handler.close()
+        with open(path, encoding='utf-8') as f:
+            written = sum(1 for _ in f)
+
+        total = len(latencies)
+        self.stdout.write(
+            f"{mode:<7} {total:>8} {percentile(latencies, 50) * 1000:>7.2f} "
+            f"{percentile(latencies, 99) * 1000:>7.2f} {total / wall:>8.0f} {written:>8} {dropped:>8}"
+        )
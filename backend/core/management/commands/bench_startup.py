@@ -0,0 +1,72 @@
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+# Runs in a fresh interpreter; prints timings (seconds since interpreter start) as JSON
+PROBE = r'''
+import json, os, time
+t0 = time.perf_counter()
+import django
+django.setup()
+t_setup = time.perf_counter()
+import core.urls
+t_urls = time.perf_counter()
+
+from django.db import connection
+from django.test import Client
+from django.test.utils import setup_test_environment
+setup_test_environment()
+connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+t_db = time.perf_counter()
+response = Client().get(os.environ['BENCH_STARTUP_PATH'])
+t_first = time.perf_counter()
+print(json.dumps({
+    'setup': t_setup - t0,
+    'import_urls': t_urls - t_setup,
+    'first_request': t_first - t_db,
+    'ready': (t_urls - t0) + (t_first - t_db),
+    'status': response.status_code,
+}))
+'''
+
+
+class Command(BaseCommand):
+    help = "Measure cold start: django.setup(), importing core.urls and serving the first request"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--runs', type=int, default=5)
+        parser.add_argument('--path', default='/api/ad-placements/')
+
+    def handle(self, *args, **options):
+        env = dict(os.environ, DJANGO_SETTINGS_MODULE=os.environ.get('DJANGO_SETTINGS_MODULE', 'project.settings'),
+                   BENCH_STARTUP_PATH=options['path'])
+        results = []
+        for _ in range(options['runs']):
+            started = time.perf_counter()
+            output = subprocess.run(
+                [sys.executable, '-c', PROBE], cwd=settings.BASE_DIR, env=env,
+                capture_output=True, text=True, check=True,
+            ).stdout
+            wall = time.perf_counter() - started
+            result = json.loads(output.strip().splitlines()[-1])
+            result['process'] = wall
+            results.append(result)
+
+        self.stdout.write(f"first request to {options['path']} -> HTTP {results[-1]['status']} "
+                          f"(median of {len(results)} runs, ms)")
+        for key, label in (
+            ('setup', 'django.setup()'),
+            ('import_urls', 'import core.urls'),
+            ('first_request', 'first request'),
+            ('ready', 'start -> first response (excl. test db)'),
+            ('process', 'whole probe process'),
+        ):
+            values = [r[key] * 1000 for r in results]
+            self.stdout.write(f"{label:<42} {statistics.median(values):>8.1f}  "
+                              f"(min {min(values):.1f}, max {max(values):.1f})")
@@ -0,0 +1,78 @@
+import logging
+import threading
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+
+from core.services.bitlabs_callbacks import drain_inbox_batch, inbox_lag
+
+logger = logging.getLogger(__name__)
+
+
+class Command(BaseCommand):
+    help = "Apply BitLabs callbacks queued in CallbackInbox (BITLABS_CALLBACK_MODE=queue)"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=2)
+        parser.add_argument('--batch-size', type=int, default=200)
+        parser.add_argument('--max-attempts', type=int, default=5)
+        parser.add_argument('--poll-interval', type=float, default=0.5, help='seconds to sleep when idle')
+        parser.add_argument('--stats-interval', type=float, default=30, help='seconds between lag reports')
+        parser.add_argument('--once', action='store_true', help='drain the current backlog and exit')
+
+    def handle(self, *args, **options):
+        self.stopped = threading.Event()
+        self.processed = 0
+        self.lock = threading.Lock()
+
+        threads = [
+            threading.Thread(target=self._work, args=(index, options), daemon=True)
+            for index in range(options['workers'])
+        ]
+        for thread in threads:
+            thread.start()
+
+        try:
+            last_count, last_time = 0, time.monotonic()
+            while any(thread.is_alive() for thread in threads):
+                for thread in threads:
+                    thread.join(timeout=options['stats_interval'] / len(threads))
+                now = time.monotonic()
+                with self.lock:
+                    processed = self.processed
+                rate = (processed - last_count) / max(now - last_time, 1e-9)
+                last_count, last_time = processed, now
+                self._report(processed, rate)
+        except KeyboardInterrupt:
+            self.stopped.set()
+            for thread in threads:
+                thread.join()
+
+    def _work(self, index, options):
+        try:
+            while not self.stopped.is_set():
+                count = drain_inbox_batch(
+                    batch_size=options['batch_size'],
+                    workers=options['workers'],
+                    worker_index=index,
+                    max_attempts=options['max_attempts'],
+                )
+                with self.lock:
+                    self.processed += count
+                if count == 0:
+                    if options['once']:
+                        return
+                    self.stopped.wait(options['poll_interval'])
+        except Exception as e:
+            logger.error(f"Callback inbox worker {index} stopped: {e}")
+            raise
+        finally:
+            connection.close()
+
+    def _report(self, processed, rate):
+        lag = inbox_lag()
+        message = (f"callback inbox: processed={processed} rate={rate:.1f}/s "
+                   f"backlog={lag['backlog']} oldest_age={lag['oldest_age_seconds']:.1f}s")
+        logger.info(message)
+        self.stdout.write(message)
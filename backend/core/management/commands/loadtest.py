@@ -0,0 +1,403 @@
+import asyncio
+import json
+import platform
+import random
+import subprocess
+import threading
+import time
+from collections import Counter, defaultdict
+from pathlib import Path
+from typing import NamedTuple, Optional
+
+import django
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, connections
+from django.test import AsyncClient, Client, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework_simplejwt.tokens import AccessToken
+
+from core.db_routers import replica_configured
+from core.management.commands._benchutils import isolated_database, percentile
+from core.services.heartbeat_buffer import get_heartbeat_buffer, heartbeat_buffering_enabled
+from core.services.metrics import get_metrics_registry, metrics_enabled
+from core.tests.bitlabs_stub import BitLabsStubServer, make_survey, sign_callback
+from core.tests.factories import seed_catalogue, seed_placements, seed_user
+
+DRIVERS = ('wsgi', 'asgi')
+
+
+class Request(NamedTuple):
+    step: str
+    method: str
+    path: str
+    body: Optional[str] = None
+    headers: Optional[dict] = None
+
+
+class VirtualUser:
+    """One simulated app install: its token, BitLabs id and what it has seen so far"""
+
+    def __init__(self, user, seed):
+        self.user = user
+        self.bitlabs_user_id = user.userprofile.bitlabs_user_id
+        self.headers = {'Authorization': f'Bearer {AccessToken.for_user(user)}'}
+        self.rng = random.Random(seed)
+        self.placements_etag = None
+        self.surveys_started = 0
+
+
+class Recorder:
+    """Latency samples and status codes per step, shared by all virtual users"""
+
+    def __init__(self):
+        self.latencies = defaultdict(list)
+        self.statuses = defaultdict(Counter)
+        self.enabled = True
+        self._lock = threading.Lock()
+
+    def record(self, step, status, elapsed):
+        if not self.enabled:
+            return
+        with self._lock:
+            self.latencies[step].append(elapsed)
+            self.statuses[step][status] += 1
+
+
+# report order, with the URL name and method RequestMetricsMiddleware files each step under
+STEPS = (
+    ('placements', 'ad-placements', 'GET'),
+    ('video_list', 'video-tasks-list', 'GET'),
+    ('start_session', 'start-video-session', 'POST'),
+    ('video_detail', 'video-tasks-detail', 'GET'),
+    ('heartbeat', 'update-watch-progress', 'PUT'),
+    ('complete_session', 'complete-video-session', 'POST'),
+    ('submit_quiz', 'submit-quiz-responses', 'POST'),
+    ('award_ad_points', 'award-ad-points', 'POST'),
+    ('surveys', 'get_surveys', 'GET'),
+    ('start_survey', 'start_survey', 'POST'),
+    ('bitlabs_callback', 'bitlabs_callback', 'POST'),
+)
+ASYNC_SURVEY_STEPS = {'surveys': 'get_surveys_async', 'start_survey': 'start_survey_async'}
+
+
+class Command(BaseCommand):
+    help = (
+        "Replay the mobile client flow (placements, videos, watch session, quiz, ad reward, surveys, "
+        "BitLabs callback) against the app in-process and report per-endpoint throughput and latency"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--driver', choices=DRIVERS, default='wsgi',
+                            help='wsgi: a thread per virtual user; asgi: a task per virtual user on one event loop')
+        parser.add_argument('--concurrency', type=int, default=8, help='virtual users running at once')
+        parser.add_argument('--iterations', type=int, default=5, help='journeys per virtual user')
+        parser.add_argument('--warmup', type=int, default=1, help='unrecorded journeys per virtual user first')
+        parser.add_argument('--heartbeats', type=int, default=6, help='progress updates per watched video')
+        parser.add_argument('--videos', type=int, default=2000)
+        parser.add_argument('--history', type=int, default=1000,
+                            help='past rewards per user (surveys and transactions scale with it)')
+        parser.add_argument('--async-surveys', action='store_true',
+                            help='use the /api/async/ survey endpoints, as an ASGI deployment would')
+        parser.add_argument('--output', help='where to write the JSON results (default: loadtest-results/)')
+        parser.add_argument('--compare', help='a previous JSON result to print deltas against')
+        parser.add_argument('--seed', type=int, default=0)
+
+    def handle(self, *args, **options):
+        if options['concurrency'] < 1 or options['iterations'] < 1:
+            raise CommandError('--concurrency and --iterations must be at least 1')
+        baseline = self._load_baseline(options['compare']) if options['compare'] else None
+
+        journeys = options['iterations'] + options['warmup']
+        stub = BitLabsStubServer(surveys=[make_survey(f'lt{n}') for n in range(journeys)]).start()
+        bitlabs_config = {**settings.BITLABS_CONFIG, 'BASE_URL': stub.url}
+        try:
+            with override_settings(BITLABS_CONFIG=bitlabs_config), isolated_database(on_disk=True):
+                self.stdout.write(f"seeding {options['videos']} videos and {options['concurrency']} users ...")
+                users = self._seed(options)
+                result = self._run(users, options)
+                self._stop_buffers()
+        finally:
+            stub.stop()
+        result['meta']['bitlabs_calls'] = dict(stub.calls)
+
+        self._report(result, baseline)
+        path = self._save(result, options['output'])
+        self.stdout.write(f"results written to {path}")
+
+    def _seed(self, options):
+        seed_catalogue(options['videos'], questions_per_video=5, seed=options['seed'])
+        seed_placements()
+        history = options['history']
+        return [
+            VirtualUser(
+                seed_user(f'loadtest{n}', rewards=history, surveys=history // 5, transactions=history // 2,
+                          seed=options['seed'] + n),
+                seed=options['seed'] + n,
+            )
+            for n in range(options['concurrency'])
+        ]
+
+    def _urls(self, options):
+        names = {step: url_name for step, url_name, _ in STEPS}
+        if options['async_surveys']:
+            names.update(ASYNC_SURVEY_STEPS)
+        return names
+
+    def journey(self, vu, urls, heartbeats):
+        """
+        One pass through the app as the Android client makes it. Yields the
+        next Request and is sent back its response.
+        """
+        headers = vu.headers
+        placement_headers = dict(headers)
+        if vu.placements_etag:
+            placement_headers['If-None-Match'] = vu.placements_etag
+        response = yield Request('placements', 'GET', reverse(urls['placements']), headers=placement_headers)
+        if response.status_code == 200:
+            vu.placements_etag = response.headers.get('ETag')
+
+        response = yield Request('video_list', 'GET', reverse(urls['video_list']), headers=headers)
+        if response.status_code != 200 or not response.json()['results']:
+            return
+        video = vu.rng.choice(response.json()['results'])
+
+        response = yield Request('start_session', 'POST', reverse(urls['start_session']),
+                                 json.dumps({'task_id': video['id']}), headers)
+        if response.status_code not in (200, 201):
+            return
+        session_id = response.json()['id']
+        response = yield Request('video_detail', 'GET', reverse(urls['video_detail'], args=[video['id']]),
+                                 headers=headers)
+        questions = response.json().get('questions', []) if response.status_code == 200 else []
+
+        progress_url = reverse(urls['heartbeat'], args=[session_id])
+        for beat in range(1, heartbeats + 1):
+            body = {'watch_duration': beat * 10, 'percent_viewed': round(100 * beat / heartbeats, 1)}
+            yield Request('heartbeat', 'PUT', progress_url, json.dumps(body), headers)
+        yield Request('complete_session', 'POST', reverse(urls['complete_session'], args=[session_id]),
+                      headers=headers)
+
+        answers = [{'question': q['id'], 'user_answer': vu.rng.choice(['yes', 'no', 'maybe'])} for q in questions]
+        yield Request('submit_quiz', 'POST', reverse(urls['submit_quiz']),
+                      json.dumps({'session_id': session_id, 'responses': answers}), headers)
+        yield Request('award_ad_points', 'POST', reverse(urls['award_ad_points']),
+                      json.dumps({'placement_key': 'home_screen_rewarded'}), headers)
+
+        response = yield Request('surveys', 'GET', reverse(urls['surveys']), headers=headers)
+        if response.status_code != 200:
+            return
+        surveys = response.json()['surveys']
+        if vu.surveys_started >= len(surveys):
+            return
+        survey = surveys[vu.surveys_started]
+        vu.surveys_started += 1
+        response = yield Request('start_survey', 'POST', reverse(urls['start_survey']),
+                                 json.dumps({'survey_id': survey['id']}), headers)
+        if response.status_code != 200:
+            return
+
+        # BitLabs reports the completion server to server
+        body, signature = sign_callback({
+            'type': 'survey_completed',
+            'uid': vu.bitlabs_user_id,
+            'survey_id': survey['id'],
+            'click_id': response.json()['click_id'],
+            'reward': '0.50',
+        }, settings.BITLABS_CONFIG['S2S_SECRET'])
+        yield Request('bitlabs_callback', 'POST', reverse(urls['bitlabs_callback']), body,
+                      {'X-BitLabs-Signature': signature})
+
+    def _run(self, users, options):
+        recorder = Recorder()
+        urls = self._urls(options)
+        run = self._run_wsgi if options['driver'] == 'wsgi' else self._run_asgi
+
+        recorder.enabled = False
+        run(users, recorder, urls, options, options['warmup'])
+        recorder.enabled = True
+        if metrics_enabled():
+            get_metrics_registry().reset()
+
+        self.stdout.write(f"running {options['iterations']} journeys x {len(users)} virtual users "
+                          f"({options['driver']}) ...")
+        started = time.perf_counter()
+        run(users, recorder, urls, options, options['iterations'])
+        wall = time.perf_counter() - started
+        return self._result(recorder, wall, options)
+
+    def _run_wsgi(self, users, recorder, urls, options, iterations):
+        def worker(vu):
+            client = Client(raise_request_exception=False)
+            try:
+                for _ in range(iterations):
+                    flow = self.journey(vu, urls, options['heartbeats'])
+                    response = None
+                    while True:
+                        try:
+                            request = flow.send(response)
+                        except StopIteration:
+                            break
+                        start = time.perf_counter()
+                        response = client.generic(request.method, request.path, request.body or '',
+                                                  content_type='application/json', headers=request.headers)
+                        recorder.record(request.step, response.status_code, time.perf_counter() - start)
+            finally:
+                connections.close_all()
+
+        threads = [threading.Thread(target=worker, args=(vu,)) for vu in users]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+    def _run_asgi(self, users, recorder, urls, options, iterations):
+        async def worker(vu):
+            client = AsyncClient(raise_request_exception=False)
+            for _ in range(iterations):
+                flow = self.journey(vu, urls, options['heartbeats'])
+                response = None
+                while True:
+                    try:
+                        request = flow.send(response)
+                    except StopIteration:
+                        break
+                    start = time.perf_counter()
+                    response = await client.generic(request.method, request.path, request.body or '',
+                                                    content_type='application/json', headers=request.headers)
+                    recorder.record(request.step, response.status_code, time.perf_counter() - start)
+
+        async def main():
+            await asyncio.gather(*(worker(vu) for vu in users))
+
+        asyncio.run(main())
+
+    def _stop_buffers(self):
+        """Write out buffered heartbeats before the database goes away"""
+        if heartbeat_buffering_enabled():
+            get_heartbeat_buffer().stop()
+
+    def _result(self, recorder, wall, options):
+        registry = get_metrics_registry() if metrics_enabled() else None
+        urls = self._urls(options)
+        endpoints = {}
+        for step, _, method in STEPS:
+            samples = recorder.latencies.get(step)
+            if not samples:
+                continue
+            statuses = recorder.statuses[step]
+            entry = {
+                'requests': len(samples),
+                'errors': sum(count for status, count in statuses.items() if status >= 500),
+                'statuses': {str(status): count for status, count in sorted(statuses.items())},
+                'requests_per_second': round(len(samples) / wall, 2),
+                'p50_ms': round(percentile(samples, 50) * 1000, 3),
+                'p95_ms': round(percentile(samples, 95) * 1000, 3),
+                'p99_ms': round(percentile(samples, 99) * 1000, 3),
+                'max_ms': round(max(samples) * 1000, 3),
+            }
+            snapshot = registry.snapshot(urls[step], method) if registry else None
+            if snapshot:
+                entry['db_queries_p50'] = snapshot['request_db_queries']['p50']
+                entry['db_ms_p50'] = round(snapshot['request_db_duration_seconds']['p50'] / 1000, 3)
+            endpoints[step] = entry
+
+        total = sum(entry['requests'] for entry in endpoints.values())
+        return {
+            'meta': {
+                'timestamp': timezone.now().isoformat(timespec='seconds'),
+                'git': self._git_revision(),
+                'driver': options['driver'],
+                'concurrency': options['concurrency'],
+                'iterations': options['iterations'],
+                'heartbeats': options['heartbeats'],
+                'videos': options['videos'],
+                'history': options['history'],
+                'async_surveys': options['async_surveys'],
+                'database': {
+                    'profile': settings.DB_PROFILE,
+                    'replica': replica_configured(),
+                    'vendor': connection.vendor,
+                    'engine': connection.settings_dict['ENGINE'],
+                    'options': connection.settings_dict.get('OPTIONS', {}),
+                    'conn_max_age': connection.settings_dict.get('CONN_MAX_AGE'),
+                },
+                'python': platform.python_version(),
+                'django': django.get_version(),
+                'settings': {
+                    'catalogue_cache': settings.VIDEO_CATALOGUE_CACHE.get('ENABLED', True),
+                    'heartbeat_buffer': heartbeat_buffering_enabled(),
+                    'ad_reward_batching': settings.AD_REWARDS.get('BATCH_ENABLED', True),
+                    'callback_mode': settings.BITLABS_CONFIG.get('CALLBACK_MODE', 'sync'),
+                },
+            },
+            'summary': {
+                'requests': total,
+                'errors': sum(entry['errors'] for entry in endpoints.values()),
+                'wall_seconds': round(wall, 3),
+                'requests_per_second': round(total / wall, 2),
+                'journeys_per_second': round(options['iterations'] * options['concurrency'] / wall, 2),
+            },
+            'endpoints': endpoints,
+        }
+
+    def _git_revision(self):
+        try:
+            out = subprocess.run(['git', 'describe', '--always', '--dirty'], cwd=settings.BASE_DIR,
+                                 capture_output=True, text=True, timeout=10)
+        except (OSError, subprocess.SubprocessError):
+            return None
+        return out.stdout.strip() or None
+
+    def _report(self, result, baseline):
+        base = baseline['endpoints'] if baseline else {}
+        self.stdout.write(f"{'endpoint':<17} {'requests':>8} {'errors':>6} {'non-2xx':>7} {'req/s':>8} "
+                          f"{'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'queries':>7}")
+        for step, entry in result['endpoints'].items():
+            non_2xx = sum(count for status, count in entry['statuses'].items() if not status.startswith(('2', '3')))
+            self.stdout.write(
+                f"{step:<17} {entry['requests']:>8} {entry['errors']:>6} {non_2xx:>7} "
+                f"{entry['requests_per_second']:>8.1f} {entry['p50_ms']:>8.2f} {entry['p95_ms']:>8.2f} "
+                f"{entry['p99_ms']:>8.2f} {entry.get('db_queries_p50', '-'):>7}"
+            )
+            if step in base:
+                old = base[step]
+                self.stdout.write(
+                    f"{'  vs baseline':<17} {'':>8} {'':>6} {'':>7} "
+                    f"{_delta(entry['requests_per_second'], old['requests_per_second']):>8} "
+                    f"{_delta(entry['p50_ms'], old['p50_ms']):>8} {_delta(entry['p95_ms'], old['p95_ms']):>8} "
+                    f"{_delta(entry['p99_ms'], old['p99_ms']):>8}"
+                )
+        summary = result['summary']
+        line = (f"total: {summary['requests']} requests, {summary['errors']} errors in {summary['wall_seconds']:.2f}s, "
+                f"{summary['requests_per_second']:.1f} req/s, {summary['journeys_per_second']:.2f} journeys/s")
+        if baseline:
+            line += f" ({_delta(summary['requests_per_second'], baseline['summary']['requests_per_second'])} req/s " \
+                    f"vs {baseline['meta'].get('git') or 'baseline'})"
+        self.stdout.write(line)
+
+    def _load_baseline(self, path):
+        try:
+            with open(path, encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError) as e:
+            raise CommandError(f"Can't read baseline {path}: {e}")
+
+    def _save(self, result, output):
+        if output:
+            path = Path(output)
+        else:
+            meta = result['meta']
+            stamp = timezone.now().strftime('%Y%m%dT%H%M%S')
+            path = Path(settings.BASE_DIR) / 'loadtest-results' / \
+                f"{stamp}-{meta['driver']}-{meta['database']['profile']}-c{meta['concurrency']}.json"
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(json.dumps(result, indent=2, default=str) + '\n', encoding='utf-8')
+        return path
+
+
+def _delta(new, old):
+    if not old:
+        return '-'
+    return f"{(new - old) / old * 100:+.0f}%"
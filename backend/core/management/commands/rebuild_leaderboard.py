@@ -0,0 +1,29 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from core.services.leaderboard import BOARDS, WINDOWS, Leaderboard
+
+
+class Command(BaseCommand):
+    help = "Rebuild every leaderboard from the database and write the snapshot servers load on startup"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--store-path', default=settings.LEADERBOARD.get('STORE_PATH'))
+
+    def handle(self, *args, **options):
+        leaderboard = Leaderboard(store_path=options['store_path'])
+        started = time.perf_counter()
+        leaderboard.rebuild()
+        elapsed = time.perf_counter() - started
+
+        for board in BOARDS:
+            for window in WINDOWS:
+                period, total, _ = leaderboard.top(board, window, 0, 0)
+                self.stdout.write(f"{board:<9} {window:<7} {period:<11} {total:>9} members")
+
+        if leaderboard.save():
+            self.stdout.write(self.style.SUCCESS(f"Rebuilt in {elapsed:.2f}s, snapshot written to {options['store_path']}"))
+        else:
+            self.stdout.write(self.style.WARNING(f"Rebuilt in {elapsed:.2f}s, no snapshot written"))
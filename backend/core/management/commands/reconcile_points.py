@@ -0,0 +1,51 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Sum
+
+from core.models import PointsBalance, Reward
+from core.services.dashboard_cache import invalidate_dashboard
+from core.utils.user_points import reward_totals
+
+
+class Command(BaseCommand):
+    help = "Check materialized PointsBalance rows against the Reward table (and optionally fix them)"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--fix', action='store_true', help='rewrite mismatched balances from Reward')
+
+    def handle(self, *args, **options):
+        expected = reward_totals()
+        stored = dict(PointsBalance.objects.values_list('user_id', 'total_points'))
+
+        mismatches = {
+            user_id: (stored.get(user_id, 0), expected.get(user_id, 0))
+            for user_id in expected.keys() | stored.keys()
+            if stored.get(user_id, 0) != expected.get(user_id, 0)
+        }
+
+        for user_id, (balance, total) in sorted(mismatches.items()):
+            self.stdout.write(f"user {user_id}: balance {balance} != rewards {total}")
+
+        if mismatches and options['fix']:
+            fixed = sum(self.fix_balance(user_id) for user_id in sorted(mismatches))
+            self.stdout.write(self.style.SUCCESS(f"Fixed {fixed} balances"))
+        elif mismatches:
+            self.stdout.write(self.style.WARNING(f"{len(mismatches)} balances out of sync (run with --fix)"))
+        else:
+            self.stdout.write(self.style.SUCCESS(f"All {len(stored)} balances match the Reward table"))
+
+    def fix_balance(self, user_id) -> bool:
+        """
+        Recompute one user's balance from Reward with the balance row locked,
+        so a credit can't land between the SUM and the write. Returns whether
+        the balance changed (a credit may have fixed it meanwhile).
+        """
+        with transaction.atomic():
+            balance, _ = PointsBalance.objects.select_for_update().get_or_create(user_id=user_id)
+            total = Reward.objects.filter(user_id=user_id).aggregate(total=Sum('points'))['total'] or 0
+            if balance.total_points == total:
+                return False
+            balance.total_points = total
+            balance.save(update_fields=['total_points', 'updated_at'])
+            invalidate_dashboard(user_id)
+        return True
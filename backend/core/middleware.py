@@ -0,0 +1,83 @@
+import logging
+import time
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+
+from core.services.metrics import begin_request, end_request, get_metrics_registry, metrics_enabled
+
+logger = logging.getLogger(__name__)
+
+UNRESOLVED = '<unresolved>'
+
+
+class RequestMetricsMiddleware:
+    """
+    Records wall time, database query count and time, upstream (BitLabs) calls
+    and response size per resolved URL name into the metrics registry, and
+    logs requests that go over METRICS SLOW_REQUEST_MS or QUERY_BUDGET.
+    Should be first in MIDDLEWARE so the whole stack is measured. Queries are
+    counted by the execute wrapper core.signals installs on every connection,
+    which follows the request into sync_to_async threads.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        if not metrics_enabled():
+            return self.get_response(request)
+        state, token = begin_request()
+        start = time.perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            end_request(token)
+        self._observe(request, response, state, time.perf_counter() - start)
+        return response
+
+    async def __acall__(self, request):
+        if not metrics_enabled():
+            return await self.get_response(request)
+        state, token = begin_request()
+        start = time.perf_counter()
+        try:
+            response = await self.get_response(request)
+        finally:
+            end_request(token)
+        self._observe(request, response, state, time.perf_counter() - start)
+        return response
+
+    def _observe(self, request, response, state, duration):
+        match = getattr(request, 'resolver_match', None)
+        endpoint = (match.view_name or match.url_name) if match else UNRESOLVED
+        if endpoint == 'metrics':
+            return
+        if response.streaming:
+            size = int(response.get('Content-Length') or 0)
+        else:
+            size = len(response.content)
+        get_metrics_registry().observe_request(endpoint, request.method, response.status_code, duration, state, size)
+
+        config = settings.METRICS
+        slow_ms = config.get('SLOW_REQUEST_MS', 0)
+        query_budget = config.get('QUERY_BUDGET', 0)
+        if (slow_ms and duration * 1000 > slow_ms) or (query_budget and state.queries > query_budget):
+            logger.warning("request over budget", extra={
+                'endpoint': endpoint,
+                'method': request.method,
+                'status': response.status_code,
+                'duration_ms': round(duration * 1000, 2),
+                'queries': state.queries,
+                'db_ms': round(state.db_time * 1000, 2),
+                'upstream_calls': state.upstream_calls,
+                'upstream_ms': round(state.upstream_time * 1000, 2),
+            })
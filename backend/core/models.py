@@ -1,7 +1,12 @@
-from django.db import models
+from django.db import IntegrityError, models, transaction
+from django.db.models import F, Q, Value
+from django.db.models.functions import Greatest
 from django.conf import settings
 from django.utils import timezone
 from django.contrib.auth.models import User
+import uuid
+
+from core.utils.answer_matching import answer_key_sets, get_matcher, matcher_choices
 
 
 class VideoTask(models.Model):
@@ -12,20 +17,137 @@ class VideoTask(models.Model):
     created_by = models.ForeignKey(User, null=True, blank=True, on_delete=models.SET_NULL)
     created_at = models.DateTimeField(default=timezone.now)
 
+    class Meta:
+        indexes = [
+            # newest-first catalogue pages (VideoTaskCursorPagination)
+            models.Index(fields=['-created_at', '-id'], name='videotask_created_idx'),
+        ]
+
     def __str__(self):
         return self.title
 
+class QuizQuestionQuerySet(models.QuerySet):
+    def for_grading(self, id_list):
+        """
+        ``in_bulk`` for grading: answer keys are left out of the query and
+        taken from the process-wide key set cache. Questions whose keys are
+        not cached yet (first grading in this process, or since an edit) get
+        them in one more query.
+        """
+        questions = self.defer('answer_keys', 'accepted_answers').in_bulk(id_list)
+        missing = {q.pk: q for q in questions.values() if answer_key_sets.get(q.answer_keys_token) is None}
+        if missing:
+            rows = QuizQuestion.objects.filter(pk__in=missing).values_list('pk', 'answer_keys', 'accepted_answers')
+            for pk, answer_keys, accepted_answers in rows:
+                missing[pk].answer_keys = answer_keys
+                missing[pk].accepted_answers = accepted_answers
+        return questions
+
+
 class QuizQuestion(models.Model):
     video = models.ForeignKey(VideoTask, related_name='questions', on_delete=models.CASCADE)
     question_text = models.TextField()
     correct_answer = models.TextField()
+    # other answers that should also be graded as correct
+    accepted_answers = models.JSONField(default=list, blank=True)
+    # name of a matcher registered in core.utils.answer_matching
+    match_mode = models.CharField(max_length=20, default='exact', choices=matcher_choices)
+    # normalized correct + accepted answers, rebuilt on every save
+    answer_keys = models.JSONField(default=list, blank=True, editable=False)
+    # new on every rebuild; names the keys' entry in the process-wide key set cache
+    answer_keys_token = models.CharField(max_length=32, blank=True, editable=False)
     # optional weight/points per question
     points = models.PositiveIntegerField(default=1)
     created_at = models.DateTimeField(default=timezone.now)
 
+    objects = QuizQuestionQuerySet.as_manager()
+
     def __str__(self):
         return f"Q{self.id} for {self.video_id}"
 
+    def build_answer_keys(self):
+        matcher = get_matcher(self.match_mode)
+        self.answer_keys = matcher.build_keys([self.correct_answer, *self.accepted_answers])
+        self.answer_keys_token = uuid.uuid4().hex
+
+    @property
+    def answer_key_set(self):
+        keys = answer_key_sets.get(self.answer_keys_token) if self.answer_keys_token else None
+        if keys is not None:
+            return keys
+        if not self.answer_keys or not self.answer_keys_token:
+            # rows saved before answer keys existed; their token isn't stored, so don't cache it
+            self.build_answer_keys()
+            return frozenset(self.answer_keys)
+        keys = frozenset(self.answer_keys)
+        answer_key_sets.set(self.answer_keys_token, keys)
+        return keys
+
+    def is_correct_answer(self, answer):
+        return get_matcher(self.match_mode).matches(self.answer_key_set, answer)
+
+    def save(self, *args, **kwargs):
+        self.build_answer_keys()
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None:
+            kwargs['update_fields'] = {*update_fields, 'answer_keys', 'answer_keys_token'}
+        super().save(*args, **kwargs)
+
+class VideoWatchSessionQuerySet(models.QuerySet):
+    def advance_progress(self, watch_duration=None, percent_viewed=None):
+        """
+        Raise watch progress in a single UPDATE without reading the rows first.
+        Values lower than what is stored are ignored, so concurrent or
+        out-of-order heartbeats can't move progress backwards.
+        """
+        updates = {}
+        if watch_duration is not None:
+            updates['watch_duration'] = Greatest(F('watch_duration'), Value(watch_duration))
+        if percent_viewed is not None:
+            updates['percent_viewed'] = Greatest(F('percent_viewed'), Value(percent_viewed))
+        if not updates:
+            return self.count()
+        return self.update(**updates)
+
+    def start(self, user, video_id, idempotency_key=None):
+        """
+        Return ``(session, created)`` for the user's open session on a video,
+        inserting it only when there is none. A session already started with
+        ``idempotency_key`` is returned as is, even if it has been completed
+        since. The INSERT goes first and the constraints decide: a new start
+        is one query, and a repeat start (the one-open-session or idempotency
+        key constraint fires) adds one SELECT for the existing row; concurrent
+        first starts settle the same way. Raises VideoTask.DoesNotExist for
+        an unknown video.
+        """
+        connection = transaction.get_connection(self.db)
+        try:
+            if not connection.in_atomic_block:
+                # autocommit: a failed INSERT leaves no transaction to roll back
+                return self.create(user=user, video_id=video_id, idempotency_key=idempotency_key), True
+            # foreign keys are only checked at commit inside a transaction
+            if not VideoTask.objects.filter(id=video_id).exists():
+                raise VideoTask.DoesNotExist(f"No VideoTask with id {video_id}")
+            with transaction.atomic(using=self.db):
+                return self.create(user=user, video_id=video_id, idempotency_key=idempotency_key), True
+        except IntegrityError:
+            existing = self._find_started(user, video_id, idempotency_key)
+            if existing is not None:
+                return existing, False
+            if not VideoTask.objects.filter(id=video_id).exists():
+                raise VideoTask.DoesNotExist(f"No VideoTask with id {video_id}")
+            raise
+
+    def _find_started(self, user, video_id, idempotency_key):
+        lookup = Q(video_id=video_id, completed=False)
+        if idempotency_key:
+            lookup |= Q(idempotency_key=idempotency_key)
+        sessions = list(self.filter(lookup, user=user)[:2])
+        for session in sessions:
+            if idempotency_key and session.idempotency_key == idempotency_key:
+                return session
+        return sessions[0] if sessions else None
+
 class VideoWatchSession(models.Model):
     user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='watch_sessions')
     video = models.ForeignKey(VideoTask, on_delete=models.CASCADE)
@@ -34,6 +156,24 @@ class VideoWatchSession(models.Model):
     watch_duration = models.PositiveIntegerField(default=0)   # seconds watched (latest)
     percent_viewed = models.FloatField(default=0.0)
     completed = models.BooleanField(default=False)
+    # optional client-supplied key that makes retried session starts idempotent
+    idempotency_key = models.CharField(max_length=64, null=True, blank=True)
+
+    objects = VideoWatchSessionQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            # start_video_session / session history per user and video
+            models.Index(fields=['user', 'video', 'completed'], name='watch_session_user_video_idx'),
+        ]
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'video'],
+                condition=models.Q(completed=False),
+                name='watch_session_one_open_per_video',
+            ),
+            models.UniqueConstraint(fields=['user', 'idempotency_key'], name='watch_session_idempotency_key'),
+        ]
 
     def mark_complete(self):
         self.completed = True
@@ -55,6 +195,25 @@ class Reward(models.Model):
     created_at = models.DateTimeField(default=timezone.now)
     paid_out = models.BooleanField(default=False)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['user', 'created_at'], name='reward_user_created_idx'),
+        ]
+
+    def save(self, *args, **kwargs):
+        # the PointsBalance update in core.signals runs inside this transaction
+        with transaction.atomic(using=kwargs.get('using')):
+            super().save(*args, **kwargs)
+
+class PointsBalance(models.Model):
+    """Running total of a user's Reward points, kept in step by core.signals"""
+    user = models.OneToOneField(User, primary_key=True, related_name='points_balance', on_delete=models.CASCADE)
+    total_points = models.IntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.user_id}: {self.total_points}"
+
 class AdPlacement(models.Model):
     AD_FORMAT_CHOICES = [
         ('REWARDED', 'Rewarded'),
@@ -106,6 +265,10 @@ class SurveyCompletion(models.Model):
     
     class Meta:
         unique_together = ['user_profile', 'survey_id']
+        # callback lookups by (user_profile, click_id) are served by the unique click_id index
+        indexes = [
+            models.Index(fields=['user_profile', '-started_at'], name='survey_completion_recent_idx'),
+        ]
     
     def __str__(self):
         return f"{self.user_profile.user.username} - Survey {self.survey_id}"
@@ -128,6 +291,37 @@ class SurveyTransaction(models.Model):
         blank=True
     )
     created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['user_profile', '-created_at'], name='survey_transaction_recent_idx'),
+        ]
     
     def __str__(self):
-        return f"{self.user_profile.user.username} - {self.transaction_type}: ${self.amount}"
\ No newline at end of file
+        return f"{self.user_profile.user.username} - {self.transaction_type}: ${self.amount}"
+
+class ProcessedCallback(models.Model):
+    """One row per BitLabs callback already applied, keyed by click_id + event type"""
+    idempotency_key = models.CharField(max_length=255, unique=True)
+    event_type = models.CharField(max_length=50)
+    click_id = models.CharField(max_length=200)
+    processed_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return self.idempotency_key
+
+class CallbackInbox(models.Model):
+    """Raw, signature-verified BitLabs callbacks waiting for drain_callback_inbox"""
+    payload = models.TextField()
+    received_at = models.DateTimeField(default=timezone.now)
+    processed_at = models.DateTimeField(null=True, blank=True)
+    attempts = models.PositiveIntegerField(default=0)
+    last_error = models.TextField(blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['processed_at', 'id'], name='callback_inbox_pending_idx'),
+        ]
+
+    def __str__(self):
+        return f"Callback {self.id} received {self.received_at}"
@@ -1,11 +1,19 @@
 from rest_framework import serializers
 from .models import  AdPlacement, VideoTask, QuizQuestion, VideoWatchSession, QuizResponse, Reward
+from core.utils.answer_matching import MATCHERS
 
 class QuizQuestionSerializer(serializers.ModelSerializer):
     class Meta:
         model = QuizQuestion
         fields = ['id', 'question_text', 'points']
 
+class VideoTaskListSerializer(serializers.ModelSerializer):
+    # catalogue rows: expects the queryset to be annotated with question_count
+    question_count = serializers.IntegerField(read_only=True)
+    class Meta:
+        model = VideoTask
+        fields = ['id', 'title', 'description', 'youtube_url', 'yt_video_id', 'question_count', 'created_at']
+
 class VideoTaskSerializer(serializers.ModelSerializer):
     questions = QuizQuestionSerializer(many=True, read_only=True)
     class Meta:
@@ -15,7 +23,6 @@ class VideoTaskSerializer(serializers.ModelSerializer):
 class VideoCreateSerializer(serializers.ModelSerializer):
     # admin create with inline questions
     questions = serializers.ListField(child=serializers.DictField(), write_only=True, required=False)
-    print("Questions ", questions)
 
     class Meta:
         model = VideoTask
@@ -32,14 +39,26 @@ class VideoCreateSerializer(serializers.ModelSerializer):
             video.yt_video_id = m.group(1)
             video.save()
         for q in questions:
+            # answer keys are precomputed in QuizQuestion.save()
             QuizQuestion.objects.create(
                 video=video,
                 question_text=q.get('question_text', ''),
                 correct_answer=q.get('correct_answer', ''),
+                accepted_answers=q.get('accepted_answers', []),
+                match_mode=q.get('match_mode', 'exact'),
                 points=q.get('points', 1)
             )
         return video
 
+    def validate_questions(self, questions):
+        for q in questions:
+            accepted = q.get('accepted_answers', [])
+            if not isinstance(accepted, list) or not all(isinstance(a, str) for a in accepted):
+                raise serializers.ValidationError('accepted_answers must be a list of strings.')
+            if q.get('match_mode', 'exact') not in MATCHERS:
+                raise serializers.ValidationError(f"Unknown match_mode: {q.get('match_mode')}")
+        return questions
+
 class VideoWatchSessionSerializer(serializers.ModelSerializer):
     class Meta:
         model = VideoWatchSession
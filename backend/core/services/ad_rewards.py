@@ -0,0 +1,141 @@
+# services/ad_rewards.py
+
+import threading
+import time
+import logging
+from django.conf import settings
+from django.core.cache import cache
+from typing import Hashable, List, Optional
+
+from core.models import Reward
+from core.utils.user_points import bulk_create_rewards
+
+logger = logging.getLogger(__name__)
+
+
+class SlidingWindowLimiter:
+    """
+    Rate limit keyed by e.g. (user_id, placement_key), counted in the Django
+    cache so that every worker shares it when CACHES is shared (see
+    CACHE_BACKEND); with the default per-process cache each worker counts
+    on its own.
+
+    Allows up to ``limit`` hits per ``window`` seconds, estimated from the
+    current and previous fixed windows (the previous one weighted by how much
+    of it still overlaps the sliding window). The hit is counted with an
+    atomic incr before the check, so concurrent requests can't all slip in
+    under the limit; a rejected hit is taken back out.
+    """
+
+    def __init__(self, limit: int, window: float, prefix: str = 'ad-reward-rate:'):
+        self.limit = limit
+        self.window = window
+        self.prefix = prefix
+
+    def _key(self, key: Hashable, index: int) -> str:
+        return f"{self.prefix}{':'.join(str(part) for part in key)}:{index}"
+
+    def allow(self, key: Hashable) -> bool:
+        now = time.time()
+        index, offset = divmod(now, self.window)
+        current_key = self._key(key, int(index))
+        previous = cache.get(self._key(key, int(index) - 1), 0)
+        timeout = int(self.window * 2) + 1
+        cache.add(current_key, 0, timeout)
+        try:
+            current = cache.incr(current_key)
+        except ValueError:
+            # expired or evicted between add() and incr()
+            cache.set(current_key, 1, timeout)
+            current = 1
+        if previous * (1 - offset / self.window) + current > self.limit:
+            try:
+                cache.decr(current_key)
+            except ValueError:
+                pass
+            return False
+        return True
+
+
+class _PendingReward:
+    __slots__ = ('reward', 'written', 'error')
+
+    def __init__(self, reward: Reward):
+        self.reward = reward
+        self.written = False
+        self.error: Optional[BaseException] = None
+
+
+class AdRewardBuffer:
+    """
+    Group commit for ad rewards: save() returns only once the reward is
+    committed, but rewards submitted while another request is writing are
+    inserted together with one bulk_create (see bulk_create_rewards, which
+    also credits PointsBalance) by whichever request takes the write lock
+    next. Nothing is held only in memory after it has been acknowledged.
+    If a batch fails, its rewards are retried one by one so a bad row only
+    fails its own request.
+    """
+
+    def __init__(self, max_batch: int = 500):
+        self.max_batch = max_batch
+        self._pending: List[_PendingReward] = []
+        self._lock = threading.Lock()
+        self._write_lock = threading.Lock()
+
+    def save(self, reward: Reward) -> None:
+        entry = _PendingReward(reward)
+        with self._lock:
+            self._pending.append(entry)
+        while True:
+            with self._write_lock:
+                if not entry.written:
+                    self._write_batch()
+            if entry.written:
+                break
+        if entry.error is not None:
+            raise entry.error
+
+    def _write_batch(self) -> None:
+        with self._lock:
+            batch, self._pending = self._pending[:self.max_batch], self._pending[self.max_batch:]
+        if not batch:
+            return
+        try:
+            bulk_create_rewards([entry.reward for entry in batch])
+        except Exception as e:
+            logger.error(f"Error writing {len(batch)} ad rewards as a batch, retrying one by one: {e}")
+            for entry in batch:
+                try:
+                    bulk_create_rewards([entry.reward])
+                except Exception as row_error:
+                    entry.error = row_error
+        for entry in batch:
+            entry.written = True
+
+
+_limiter: Optional[SlidingWindowLimiter] = None
+_buffer: Optional[AdRewardBuffer] = None
+_lock = threading.Lock()
+
+
+def get_ad_reward_limiter() -> SlidingWindowLimiter:
+    global _limiter
+    if _limiter is None:
+        with _lock:
+            if _limiter is None:
+                config = settings.AD_REWARDS
+                # BURST rewards per window, which works out at PER_HOUR rewards an hour
+                burst = config.get('BURST', 3)
+                _limiter = SlidingWindowLimiter(limit=burst, window=burst * 3600 / config.get('PER_HOUR', 30))
+    return _limiter
+
+
+def get_ad_reward_buffer() -> AdRewardBuffer:
+    global _buffer
+    if _buffer is None:
+        with _lock:
+            if _buffer is None:
+                config = settings.AD_REWARDS
+                _buffer = AdRewardBuffer(max_batch=config.get('MAX_BATCH', 500))
+    return _buffer
@@ -0,0 +1,177 @@
+# services/bitlabs_callbacks.py
+
+import json
+import logging
+from decimal import Decimal, InvalidOperation
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import F, Min
+from django.db.models.functions import Mod
+from django.utils import timezone
+from typing import Dict, List
+
+from core.models import CallbackInbox, ProcessedCallback, SurveyCompletion, SurveyTransaction, UserProfile
+from core.services.dashboard_cache import invalidate_dashboard
+from core.services.leaderboard import record_earnings
+
+logger = logging.getLogger(__name__)
+
+
+def callback_queue_enabled() -> bool:
+    return settings.BITLABS_CONFIG.get('CALLBACK_MODE', 'sync') == 'queue'
+
+
+class InvalidCallback(ValueError):
+    """A signed callback whose payload can never be applied; retrying it won't help"""
+
+
+def parse_reward(data) -> Decimal:
+    """
+    The callback's reward as a Decimal. Raises InvalidCallback for a payload
+    that isn't a JSON object or a reward that isn't a finite, non-negative
+    number.
+    """
+    if not isinstance(data, dict):
+        raise InvalidCallback('Callback payload must be a JSON object')
+    try:
+        reward = Decimal(str(data.get('reward', 0) or 0))
+    except InvalidOperation:
+        raise InvalidCallback(f"Invalid reward {data.get('reward')!r}")
+    if not reward.is_finite() or reward < 0:
+        raise InvalidCallback(f"Invalid reward {data.get('reward')!r}")
+    return reward
+
+
+def process_callback(data):
+    """Process the callback data and update user rewards"""
+    reward = parse_reward(data)
+    event_type = data.get('type')
+    user_id = data.get('uid')
+    survey_id = data.get('survey_id')
+    click_id = data.get('click_id')
+
+    if event_type not in ('survey_completed', 'survey_rejected'):
+        logger.info(f"Ignoring BitLabs callback of type {event_type}")
+        return
+
+    try:
+        with transaction.atomic():
+            # Idempotency receipt: a replayed callback fails this insert and
+            # returns before touching any balances
+            try:
+                with transaction.atomic():
+                    ProcessedCallback.objects.create(
+                        idempotency_key=f"{click_id}:{event_type}",
+                        event_type=event_type,
+                        click_id=click_id,
+                    )
+            except IntegrityError:
+                logger.info(f"Duplicate BitLabs callback ignored: {event_type} for click ID {click_id}")
+                return
+
+            user_profile = UserProfile.objects.only('id', 'user_id').get(bitlabs_user_id=user_id)
+            survey_completion = SurveyCompletion.objects.select_for_update().get(
+                user_profile=user_profile,
+                click_id=click_id
+            )
+            invalidate_dashboard(user_profile.user_id)
+
+            if event_type == 'survey_completed':
+                if survey_completion.status == 'completed':
+                    logger.info(f"Survey completion already credited for click ID: {click_id}")
+                    return
+                survey_completion.status = 'completed'
+                survey_completion.reward_amount = reward
+                survey_completion.completed_at = timezone.now()
+                survey_completion.save(update_fields=['status', 'reward_amount', 'completed_at'])
+
+                # Update user balance in place so concurrent credits can't be lost
+                UserProfile.objects.filter(pk=user_profile.pk).update(
+                    available_balance=F('available_balance') + reward,
+                    total_earnings=F('total_earnings') + reward,
+                )
+
+                # Create transaction record
+                reward_transaction = SurveyTransaction.objects.create(
+                    user_profile=user_profile,
+                    transaction_type='survey_reward',
+                    amount=reward,
+                    description=f'Survey {survey_id} completion reward',
+                    survey_completion=survey_completion
+                )
+                record_earnings(user_profile.user_id, reward, reward_transaction.created_at)
+
+                logger.info(f"Processed survey completion for user {user_id}: ${reward}")
+
+            elif event_type == 'survey_rejected':
+                survey_completion.status = 'rejected'
+                survey_completion.save(update_fields=['status'])
+
+                logger.info(f"Survey rejected for user {user_id}")
+
+    except UserProfile.DoesNotExist:
+        logger.error(f"User profile not found for BitLabs user ID: {user_id}")
+    except SurveyCompletion.DoesNotExist:
+        logger.error(f"Survey completion not found for click ID: {click_id}")
+    except Exception as e:
+        # transient failure: let the caller retry (HTTP 500 or inbox retry)
+        logger.error(f"Error processing callback for user {user_id}: {e}")
+        raise
+
+
+def drain_inbox_batch(batch_size: int = 100, workers: int = 1, worker_index: int = 0,
+                      max_attempts: int = 5) -> int:
+    """
+    Apply up to ``batch_size`` pending inbox callbacks in one transaction.
+
+    Workers split the inbox by ``id % workers`` so they never pick up the same
+    rows. Each callback runs in its own savepoint; one that fails is counted
+    against ``max_attempts`` and left pending, without undoing the others.
+    Returns the number of rows taken from the inbox.
+    """
+    pending = CallbackInbox.objects.filter(processed_at__isnull=True)
+    if workers > 1:
+        pending = pending.annotate(shard=Mod('id', workers)).filter(shard=worker_index)
+    rows = list(pending.order_by('id').values_list('id', 'payload', 'attempts')[:batch_size])
+    if not rows:
+        return 0
+
+    done: List[int] = []
+    failed: Dict[int, str] = {}
+    with transaction.atomic():
+        for inbox_id, payload, attempts in rows:
+            try:
+                with transaction.atomic():
+                    process_callback(json.loads(payload))
+                done.append(inbox_id)
+            except json.JSONDecodeError:
+                logger.error(f"Invalid JSON in queued callback {inbox_id}")
+                failed[inbox_id] = 'Invalid JSON'
+                done.append(inbox_id)
+            except InvalidCallback as e:
+                # poison row: keep it for inspection, never retry it
+                logger.error(f"Invalid queued callback {inbox_id}: {e}")
+                failed[inbox_id] = str(e)
+                done.append(inbox_id)
+            except Exception as e:
+                failed[inbox_id] = str(e)
+                if attempts + 1 >= max_attempts:
+                    # give up: keep the row for inspection but stop retrying it
+                    done.append(inbox_id)
+
+        now = timezone.now()
+        CallbackInbox.objects.filter(id__in=done).update(processed_at=now)
+        for inbox_id, error in failed.items():
+            CallbackInbox.objects.filter(id=inbox_id).update(attempts=F('attempts') + 1, last_error=error)
+    return len(rows)
+
+
+def inbox_lag() -> Dict:
+    """Backlog size and age of the oldest unprocessed callback, in seconds"""
+    stats = CallbackInbox.objects.filter(processed_at__isnull=True).aggregate(oldest=Min('received_at'))
+    backlog = CallbackInbox.objects.filter(processed_at__isnull=True).count()
+    oldest = stats['oldest']
+    return {
+        'backlog': backlog,
+        'oldest_age_seconds': (timezone.now() - oldest).total_seconds() if oldest else 0.0,
+    }
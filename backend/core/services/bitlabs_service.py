@@ -1,25 +1,125 @@
 # services/bitlabs_service.py
 
+import asyncio
+import httpx
+import random
 import requests
 import hashlib
 import hmac
 import logging
+import threading
+import time
+import weakref
 from django.conf import settings
+from requests.adapters import HTTPAdapter
 from typing import Dict, Optional
+from urllib3.exceptions import MaxRetryError, ResponseError
+from urllib3.util.retry import Retry
+
+from core.services.circuit_breaker import CircuitBreaker, CircuitOpenError
+from core.services.metrics import record_upstream
 
 logger = logging.getLogger(__name__)
 
+RETRY_STATUS_CODES = (429, 500, 502, 503, 504)
+
+
+class BitLabsUnavailable(requests.RequestException):
+    """Raised instead of calling BitLabs while the circuit breaker is open"""
+
+
+class CappedRetry(Retry):
+    """
+    Retry that honours Retry-After only up to ``max_retry_after`` seconds.
+    A longer wait gives up instead, so the response goes back to the caller
+    rather than parking the request.
+    """
+
+    def __init__(self, *args, max_retry_after: float = 5.0, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.max_retry_after = max_retry_after
+
+    def new(self, **kw) -> 'CappedRetry':
+        kw.setdefault('max_retry_after', self.max_retry_after)
+        return super().new(**kw)
+
+    def increment(self, method=None, url=None, response=None, error=None, _pool=None, _stacktrace=None):
+        retry_after = self.get_retry_after(response) if response is not None else None
+        if retry_after is not None and retry_after > self.max_retry_after:
+            # with raise_on_status=False urllib3 returns the response
+            raise MaxRetryError(_pool, url, ResponseError(f"Retry-After {retry_after:g}s is too long"))
+        return super().increment(method, url, response, error, _pool, _stacktrace)
+
+
+def record_outcome(breaker: CircuitBreaker, response, elapsed: float) -> None:
+    """
+    Report a finished call to the breaker and metrics. ``response`` is None
+    when the call raised, whatever the exception (cancellation included), so
+    every call let through, the half-open trial among them, reports back.
+    """
+    record_upstream('bitlabs', elapsed, ok=response is not None and response.status_code < 400)
+    if response is None or response.status_code in RETRY_STATUS_CODES:
+        breaker.record_failure()
+    else:
+        breaker.record_success()
+
+
 class BitLabsService:
-    def __init__(self):
-        self.config = settings.BITLABS_CONFIG
+    def __init__(self, config: Optional[Dict] = None):
+        self.config = config if config is not None else settings.BITLABS_CONFIG
         self.base_url = self.config['BASE_URL']
         self.app_token = self.config['APP_TOKEN']
-        self.app_secret = self.config['APP_SECRET'] 
+        self.app_secret = self.config['APP_SECRET']
         self.s2s_secret = self.config['S2S_SECRET']
-        
-        logger.info(f"BitLabs Service initialized with base_url: {self.base_url}{self.app_token}")
-        print(f"BitLabs Service initialized with base_url: {self.base_url} and api token: {self.app_token}")
-    
+        self.timeout = (
+            self.config.get('CONNECT_TIMEOUT', 3.05),
+            self.config.get('READ_TIMEOUT', 30),
+        )
+        self.session = self._build_session()
+        self.breaker = CircuitBreaker(
+            'bitlabs',
+            failure_threshold=self.config.get('BREAKER_FAILURE_THRESHOLD', 5),
+            reset_timeout=self.config.get('BREAKER_RESET_TIMEOUT', 30),
+        )
+
+        logger.info(f"BitLabs Service initialized with base_url: {self.base_url}")
+
+    def _build_session(self) -> requests.Session:
+        """Create a keep-alive session with a bounded connection pool and retries"""
+        retry = CappedRetry(
+            total=self.config.get('MAX_RETRIES', 2),
+            backoff_factor=self.config.get('BACKOFF_FACTOR', 0.3),
+            backoff_jitter=self.config.get('BACKOFF_JITTER', 0.3),
+            status_forcelist=RETRY_STATUS_CODES,
+            respect_retry_after_header=True,
+            raise_on_status=False,
+            max_retry_after=self.config.get('MAX_RETRY_AFTER', 5),
+        )
+        adapter = HTTPAdapter(
+            pool_connections=self.config.get('POOL_CONNECTIONS', 4),
+            pool_maxsize=self.config.get('POOL_MAXSIZE', 32),
+            max_retries=retry,
+        )
+        session = requests.Session()
+        session.mount('https://', adapter)
+        session.mount('http://', adapter)
+        return session
+
+    def _request(self, method: str, url: str, **kwargs) -> requests.Response:
+        """Send a request through the pooled session, guarded by the circuit breaker"""
+        try:
+            self.breaker.before_call()
+        except CircuitOpenError as e:
+            raise BitLabsUnavailable(str(e))
+        kwargs.setdefault('timeout', self.timeout)
+        start = time.perf_counter()
+        response = None
+        try:
+            response = self.session.request(method, url, **kwargs)
+            return response
+        finally:
+            record_outcome(self.breaker, response, time.perf_counter() - start)
+
     def _get_headers(self, user_id: str) -> Dict[str, str]:
         """Get headers for BitLabs API requests"""
         headers = {
@@ -28,7 +128,7 @@ class BitLabsService:
             'Content-Type': 'application/json',
         }
         return headers
-    
+
     def get_surveys(self, user_id: str, platform: str = 'MOBILE', os: str = 'ANDROID') -> Optional[Dict]:
         """Fetch available surveys for a user"""
         url = f"{self.base_url}/v2/client/surveys"
@@ -37,9 +137,9 @@ class BitLabsService:
             'os': os,
         }
         headers = self._get_headers(user_id)
-        
+
         try:
-            response = requests.get(url, params=params, headers=headers, timeout=30)
+            response = self._request('GET', url, params=params, headers=headers)
             response.raise_for_status()
             return response.json()
         except requests.RequestException as e:
@@ -56,7 +156,7 @@ class BitLabsService:
         }
 
         try:
-            response = requests.post(url, json=payload, headers=headers, timeout=30)
+            response = self._request('POST', url, json=payload, headers=headers)
             response.raise_for_status()
             data = response.json()
             return data.get("link")  # API returns 'link' field
@@ -66,7 +166,7 @@ class BitLabsService:
                 logger.error(f"Response content: {e.response.text}")
             return None
 
-        
+
     def verify_callback_signature(self, payload: str, signature: str) -> bool:
         """Verify S2S callback signature using S2S secret"""
         expected_signature = hmac.new(
@@ -75,16 +175,157 @@ class BitLabsService:
             hashlib.sha256
         ).hexdigest()
         return hmac.compare_digest(signature, expected_signature)
-    
+
     def get_user_rewards(self, user_id: str) -> Optional[Dict]:
         """Get user's reward information"""
         # Correct endpoint: /v2/client/users/{user_id}
         url = f"{self.base_url}/v2/client/users/{user_id}"
-        
+
+        try:
+            response = self._request('GET', url, headers=self._get_headers(user_id))
+            response.raise_for_status()
+            return response.json()
+        except requests.RequestException as e:
+            logger.error(f"Error fetching user rewards: {e}")
+            return None
+
+
+class AsyncBitLabsService:
+    """
+    Non-blocking BitLabs client for the async survey views.
+
+    Uses one pooled httpx.AsyncClient per event loop and shares the circuit
+    breaker of the synchronous client, since both talk to the same upstream.
+    """
+
+    def __init__(self, config: Optional[Dict] = None, breaker: Optional[CircuitBreaker] = None):
+        sync_service = get_bitlabs_service()
+        self.config = config if config is not None else sync_service.config
+        self.base_url = self.config['BASE_URL']
+        self.app_token = self.config['APP_TOKEN']
+        self.breaker = breaker if breaker is not None else sync_service.breaker
+        self.max_retries = self.config.get('MAX_RETRIES', 2)
+        self.backoff_factor = self.config.get('BACKOFF_FACTOR', 0.3)
+        self.backoff_jitter = self.config.get('BACKOFF_JITTER', 0.3)
+        self.max_retry_after = self.config.get('MAX_RETRY_AFTER', 5)
+        self._clients: 'weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, httpx.AsyncClient]' = weakref.WeakKeyDictionary()
+
+    def _get_client(self) -> httpx.AsyncClient:
+        """Return the client bound to the running event loop"""
+        loop = asyncio.get_running_loop()
+        client = self._clients.get(loop)
+        if client is None or client.is_closed:
+            pool_size = self.config.get('ASYNC_POOL_MAXSIZE', 256)
+            client = httpx.AsyncClient(
+                timeout=httpx.Timeout(
+                    self.config.get('READ_TIMEOUT', 30),
+                    connect=self.config.get('CONNECT_TIMEOUT', 3.05),
+                ),
+                limits=httpx.Limits(max_connections=pool_size, max_keepalive_connections=pool_size),
+            )
+            self._clients[loop] = client
+        return client
+
+    def _get_headers(self, user_id: str) -> Dict[str, str]:
+        """Get headers for BitLabs API requests"""
+        return {
+            'X-Api-Token': self.app_token,
+            'X-User-Id': user_id,
+            'Content-Type': 'application/json',
+        }
+
+    def _backoff(self, attempt: int, response: Optional[httpx.Response]) -> Optional[float]:
+        """Seconds to wait before the next attempt, or None if Retry-After asks for more than MAX_RETRY_AFTER"""
+        retry_after = response.headers.get('Retry-After') if response is not None else None
+        if retry_after and retry_after.isdigit():
+            return float(retry_after) if float(retry_after) <= self.max_retry_after else None
+        return self.backoff_factor * (2 ** attempt) + random.uniform(0, self.backoff_jitter)
+
+    async def _request(self, method: str, url: str, **kwargs) -> httpx.Response:
+        """Send a request with retries on 429/5xx, guarded by the circuit breaker"""
+        try:
+            self.breaker.before_call()
+        except CircuitOpenError as e:
+            raise BitLabsUnavailable(str(e))
+        client = self._get_client()
+        start = time.perf_counter()
+        response = None
+        try:
+            response = await self._send_with_retries(client, method, url, **kwargs)
+            return response
+        finally:
+            record_outcome(self.breaker, response, time.perf_counter() - start)
+
+    async def _send_with_retries(self, client: httpx.AsyncClient, method: str, url: str, **kwargs) -> httpx.Response:
+        attempt = 0
+        while True:
+            response = None
+            try:
+                response = await client.request(method, url, **kwargs)
+            except httpx.TransportError:
+                if attempt >= self.max_retries:
+                    raise
+            else:
+                if response.status_code not in RETRY_STATUS_CODES or attempt >= self.max_retries:
+                    return response
+            delay = self._backoff(attempt, response)
+            if delay is None:
+                return response
+            await asyncio.sleep(delay)
+            attempt += 1
+
+    async def _get_json(self, url: str, user_id: str, **kwargs) -> Dict:
         try:
-            response = requests.get(url, headers=self._get_headers(user_id), timeout=30)
+            response = await self._request('GET', url, headers=self._get_headers(user_id), **kwargs)
             response.raise_for_status()
             return response.json()
+        except httpx.HTTPError as e:
+            raise requests.RequestException(str(e))
+
+    async def get_surveys(self, user_id: str, platform: str = 'MOBILE', os: str = 'ANDROID') -> Optional[Dict]:
+        """Fetch available surveys for a user"""
+        url = f"{self.base_url}/v2/client/surveys"
+        try:
+            return await self._get_json(url, user_id, params={'platform': platform, 'os': os})
+        except requests.RequestException as e:
+            logger.error(f"Error fetching surveys for user {user_id}: {e}")
+            return None
+
+    async def get_user_rewards(self, user_id: str) -> Optional[Dict]:
+        """Get user's reward information"""
+        url = f"{self.base_url}/v2/client/users/{user_id}"
+        try:
+            return await self._get_json(url, user_id)
         except requests.RequestException as e:
             logger.error(f"Error fetching user rewards: {e}")
             return None
+
+
+_bitlabs_service: Optional[BitLabsService] = None
+_bitlabs_service_lock = threading.Lock()
+
+
+def get_bitlabs_service() -> BitLabsService:
+    """Return the process-wide BitLabs client, creating it on first use"""
+    global _bitlabs_service
+    if _bitlabs_service is None:
+        with _bitlabs_service_lock:
+            if _bitlabs_service is None:
+                _bitlabs_service = BitLabsService()
+    return _bitlabs_service
+
+
+_async_bitlabs_service: Optional[AsyncBitLabsService] = None
+
+
+def get_async_bitlabs_service() -> AsyncBitLabsService:
+    """Return the process-wide async BitLabs client, creating it on first use"""
+    global _async_bitlabs_service
+    if _async_bitlabs_service is None:
+        # the async client shares the sync one's breaker; create that first,
+        # outside the lock, since get_bitlabs_service() takes the same lock
+        get_bitlabs_service()
+        with _bitlabs_service_lock:
+            if _async_bitlabs_service is None:
+                _async_bitlabs_service = AsyncBitLabsService()
+    return _async_bitlabs_service
@@ -0,0 +1,119 @@
+# services/catalogue_cache.py
+
+import threading
+import time
+import logging
+from collections import OrderedDict
+from django.conf import settings
+from django.core.cache import cache
+from typing import Hashable, Optional
+
+from core.utils.shared_cache import bounded_timeout
+
+logger = logging.getLogger(__name__)
+
+VERSION_KEY = 'video-catalogue:version'
+
+
+def get_catalogue_version() -> int:
+    """
+    Current video catalogue version, shared by all processes through the
+    cache. With a per-process cache the version key expires after
+    PROCESS_LOCAL_CACHE_TTL, so a bump made by another worker is picked up
+    (as a fresh version) within that time.
+    """
+    version = cache.get(VERSION_KEY)
+    if version is None:
+        # start from a timestamp so a cache flush can't reuse an old version number
+        cache.add(VERSION_KEY, int(time.time() * 1000), timeout=bounded_timeout(None))
+        version = cache.get(VERSION_KEY)
+    return version
+
+
+def bump_catalogue_version() -> None:
+    """Invalidate every cached catalogue page and video detail"""
+    try:
+        cache.incr(VERSION_KEY)
+    except ValueError:
+        cache.set(VERSION_KEY, int(time.time() * 1000), timeout=bounded_timeout(None))
+
+
+class CatalogueCache:
+    """
+    Per-process LRU of serialized catalogue responses (list pages and video
+    details) held as ready-to-send JSON bytes.
+
+    Entries belong to a catalogue version; when the version moves on (any
+    VideoTask or QuizQuestion write, see core.signals) the whole cache is
+    dropped on the next lookup, and bodies built from an older version are
+    never stored. Memory is bounded by both ``max_entries`` and
+    ``max_bytes`` of stored bodies, evicting least recently used entries first.
+    """
+
+    def __init__(self, max_entries: int = 2000, max_bytes: int = 32 * 1024 * 1024):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._entries: 'OrderedDict[Hashable, bytes]' = OrderedDict()
+        self._size = 0
+        self._version: Optional[int] = None
+        self._lock = threading.Lock()
+
+    def get(self, version: int, key: Hashable) -> Optional[bytes]:
+        """Return the cached body for ``key`` at catalogue ``version``, if any"""
+        with self._lock:
+            if version != self._version:
+                self._entries.clear()
+                self._size = 0
+                self._version = version
+                return None
+            body = self._entries.get(key)
+            if body is not None:
+                self._entries.move_to_end(key)
+            return body
+
+    def set(self, version: int, key: Hashable, body: bytes) -> None:
+        """Store a body built from catalogue ``version``"""
+        if len(body) > self.max_bytes:
+            return
+        with self._lock:
+            if version != self._version:
+                return  # built from an older catalogue; don't keep it
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self._size -= len(previous)
+            self._entries[key] = body
+            self._size += len(body)
+            while len(self._entries) > self.max_entries or self._size > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self._size -= len(evicted)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._size = 0
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {'entries': len(self._entries), 'bytes': self._size, 'version': self._version}
+
+
+_catalogue_cache: Optional[CatalogueCache] = None
+_catalogue_cache_lock = threading.Lock()
+
+
+def catalogue_cache_enabled() -> bool:
+    return settings.VIDEO_CATALOGUE_CACHE.get('ENABLED', True)
+
+
+def get_catalogue_cache() -> CatalogueCache:
+    """Return the process-wide catalogue cache, creating it on first use"""
+    global _catalogue_cache
+    if _catalogue_cache is None:
+        with _catalogue_cache_lock:
+            if _catalogue_cache is None:
+                config = settings.VIDEO_CATALOGUE_CACHE
+                _catalogue_cache = CatalogueCache(
+                    max_entries=config.get('MAX_ENTRIES', 2000),
+                    max_bytes=config.get('MAX_BYTES', 32 * 1024 * 1024),
+                )
+    return _catalogue_cache
@@ -0,0 +1,70 @@
+# services/circuit_breaker.py
+
+import threading
+import time
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class CircuitOpenError(Exception):
+    """Raised when a call is short-circuited because the upstream is marked unhealthy"""
+
+
+class CircuitBreaker:
+    """
+    Minimal thread-safe circuit breaker.
+
+    After ``failure_threshold`` consecutive failures the circuit opens and
+    calls fail fast for ``reset_timeout`` seconds. The first call after that
+    is let through as a trial: success closes the circuit, failure re-opens it.
+    A trial that never reports back lapses after another ``reset_timeout``,
+    and the next call becomes the trial instead.
+    """
+
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half_open'
+
+    def __init__(self, name: str, failure_threshold: int = 5, reset_timeout: float = 30):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._state = self.CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            return self._state
+
+    def before_call(self) -> None:
+        """Raise CircuitOpenError if the call must not reach the upstream"""
+        with self._lock:
+            if self._state == self.CLOSED:
+                return
+            now = time.monotonic()
+            # while half open, _opened_at is when the current trial started
+            if now - self._opened_at >= self.reset_timeout:
+                self._state = self.HALF_OPEN
+                self._opened_at = now
+                return
+            raise CircuitOpenError(f"Circuit '{self.name}' is open")
+
+    def record_success(self) -> None:
+        with self._lock:
+            if self._state != self.CLOSED:
+                logger.info(f"Circuit '{self.name}' closed")
+            self._state = self.CLOSED
+            self._failures = 0
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self._failures += 1
+            if self._state == self.HALF_OPEN or self._failures >= self.failure_threshold:
+                if self._state != self.OPEN:
+                    logger.warning(f"Circuit '{self.name}' opened after {self._failures} failures")
+                self._state = self.OPEN
+                self._opened_at = time.monotonic()
@@ -0,0 +1,121 @@
+# services/dashboard_cache.py
+
+import logging
+import time
+from django.core.cache import cache
+from django.db import transaction
+from typing import Dict, Optional
+
+from core.models import SurveyCompletion, SurveyTransaction, UserProfile
+from core.utils.shared_cache import bounded_timeout
+
+logger = logging.getLogger(__name__)
+
+DASHBOARD_VERSION_KEY = 'user-dashboard:version:{user_id}'
+DASHBOARD_KEY = 'user-dashboard:{user_id}:{version}'
+# safety net only on a shared cache, where every balance or survey change
+# invalidates the entry; on a per-process cache bounded_timeout() caps it
+DASHBOARD_TIMEOUT = 10 * 60
+RECENT_LIMIT = 10
+
+
+def build_dashboard(user) -> Optional[Dict]:
+    """
+    Assemble the dashboard payload with narrow values() projections: one query
+    for the profile and points balance, one each for the recent completions
+    and transactions. Returns None when the user has no UserProfile.
+    """
+    profile = UserProfile.objects.filter(user_id=user.id).values(
+        'id', 'available_balance', 'total_earnings', 'user__points_balance__total_points'
+    ).first()
+    if profile is None:
+        return None
+
+    completions = SurveyCompletion.objects.filter(user_profile_id=profile['id']).order_by('-started_at').values(
+        'survey_id', 'status', 'reward_amount', 'started_at', 'completed_at'
+    )[:RECENT_LIMIT]
+    transactions = SurveyTransaction.objects.filter(user_profile_id=profile['id']).order_by('-created_at').values(
+        'transaction_type', 'amount', 'description', 'created_at'
+    )[:RECENT_LIMIT]
+
+    return {
+        'user_profile': {
+            'username': user.username,
+            'available_balance': float(profile['available_balance']),
+            'total_earnings': float(profile['total_earnings']),
+            'total_points': profile['user__points_balance__total_points'] or 0,
+        },
+        'recent_completions': [
+            {
+                'survey_id': c['survey_id'],
+                'status': c['status'],
+                'reward_amount': float(c['reward_amount']) if c['reward_amount'] else 0,
+                'started_at': c['started_at'].isoformat(),
+                'completed_at': c['completed_at'].isoformat() if c['completed_at'] else None,
+            }
+            for c in completions
+        ],
+        'recent_transactions': [
+            {
+                'type': t['transaction_type'],
+                'amount': float(t['amount']),
+                'description': t['description'],
+                'created_at': t['created_at'].isoformat(),
+            }
+            for t in transactions
+        ],
+    }
+
+
+def get_dashboard_version(user_id) -> int:
+    """
+    Current version of a user's dashboard. Like the placement version it
+    starts from a timestamp, so an expired or flushed key never brings an
+    old version (and its entry) back.
+    """
+    key = DASHBOARD_VERSION_KEY.format(user_id=user_id)
+    version = cache.get(key)
+    if version is None:
+        cache.add(key, int(time.time() * 1000), timeout=bounded_timeout(DASHBOARD_TIMEOUT))
+        version = cache.get(key)
+    return version
+
+
+def bump_dashboard_version(user_id) -> None:
+    key = DASHBOARD_VERSION_KEY.format(user_id=user_id)
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.set(key, int(time.time() * 1000), timeout=bounded_timeout(DASHBOARD_TIMEOUT))
+
+
+def get_dashboard(user) -> Optional[Dict]:
+    """
+    Return the cached dashboard for a user, building it on a miss (three
+    queries). The entry is keyed by the dashboard version read before the
+    build, so a build that raced a credit is stored under a version nobody
+    reads any more instead of overwriting the invalidation. Invalidations
+    made by other processes, such as the callback queue worker, never reach
+    a per-process cache, so there the entry lives no longer than
+    PROCESS_LOCAL_CACHE_TTL.
+    """
+    key = DASHBOARD_KEY.format(user_id=user.id, version=get_dashboard_version(user.id))
+    dashboard = cache.get(key)
+    if dashboard is None:
+        dashboard = build_dashboard(user)
+        if dashboard is not None:
+            cache.set(key, dashboard, bounded_timeout(DASHBOARD_TIMEOUT))
+    return dashboard
+
+
+def invalidate_dashboard(user_id) -> None:
+    """Move a user's dashboard to a new version once the current transaction commits"""
+    transaction.on_commit(lambda: bump_dashboard_version(user_id))
+
+
+async def ainvalidate_dashboard(user_id) -> None:
+    key = DASHBOARD_VERSION_KEY.format(user_id=user_id)
+    try:
+        await cache.aincr(key)
+    except ValueError:
+        await cache.aset(key, int(time.time() * 1000), timeout=bounded_timeout(DASHBOARD_TIMEOUT))
@@ -0,0 +1,171 @@
+# services/heartbeat_buffer.py
+
+import atexit
+import threading
+import logging
+from collections import OrderedDict
+from django.conf import settings
+from django.db import connection, transaction
+from typing import Dict, Iterable, Optional
+
+from core.models import VideoWatchSession
+
+logger = logging.getLogger(__name__)
+
+
+class _Progress:
+    """Highest progress seen for one session since the last flush"""
+    __slots__ = ('user_id', 'watch_duration', 'percent_viewed')
+
+    def __init__(self, user_id: int):
+        self.user_id = user_id
+        self.watch_duration: Optional[int] = None
+        self.percent_viewed: Optional[float] = None
+
+    def merge(self, watch_duration: Optional[int], percent_viewed: Optional[float]) -> None:
+        if watch_duration is not None:
+            self.watch_duration = max(self.watch_duration or 0, watch_duration)
+        if percent_viewed is not None:
+            self.percent_viewed = max(self.percent_viewed or 0.0, percent_viewed)
+
+
+class HeartbeatBuffer:
+    """
+    Coalesces watch-progress heartbeats in memory and writes them in batches.
+
+    A heartbeat costs no query once its session's owner is known. Each
+    session keeps only its maximum watch_duration / percent_viewed, and a
+    flush writes one GREATEST() UPDATE per session, so out-of-order or
+    cross-process flushes can never move progress backwards. Pending progress
+    is flushed on an interval, when a session is completed or its quiz
+    submitted, when the buffer grows past ``max_pending`` and at interpreter
+    exit. Entries that fail to write are merged back and retried on the next
+    flush.
+
+    Heartbeats carry cumulative progress, so a worker that dies loses at
+    most ``flush_interval`` seconds of it, and the client's next heartbeat
+    restores it. Progress buffered by another worker lands within one
+    interval of completion; completing only writes the completion fields.
+    """
+
+    def __init__(self, flush_interval: float = 5.0, max_pending: int = 10000, max_known_sessions: int = 100000):
+        self.flush_interval = flush_interval
+        self.max_pending = max_pending
+        self.max_known_sessions = max_known_sessions
+        self._pending: Dict[int, _Progress] = {}
+        self._owners: 'OrderedDict[int, int]' = OrderedDict()
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._stopped = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def remember_session(self, session_id: int, user_id: int) -> None:
+        """Record who owns a session so heartbeats can be acknowledged without a query"""
+        with self._lock:
+            self._owners[session_id] = user_id
+            self._owners.move_to_end(session_id)
+            while len(self._owners) > self.max_known_sessions:
+                self._owners.popitem(last=False)
+
+    def owns_session(self, session_id: int, user_id: int) -> bool:
+        with self._lock:
+            owner = self._owners.get(session_id)
+        if owner is None:
+            if not VideoWatchSession.objects.filter(id=session_id, user_id=user_id).exists():
+                return False
+            self.remember_session(session_id, user_id)
+            return True
+        return owner == user_id
+
+    def record(self, session_id: int, user_id: int, watch_duration: Optional[int],
+               percent_viewed: Optional[float]) -> None:
+        self._ensure_started()
+        with self._lock:
+            progress = self._pending.get(session_id)
+            if progress is None:
+                progress = self._pending[session_id] = _Progress(user_id)
+            progress.merge(watch_duration, percent_viewed)
+            overflow = len(self._pending) >= self.max_pending
+        if overflow:
+            try:
+                self.flush()
+            except Exception:
+                pass  # already logged; entries were requeued
+
+    def flush(self, session_ids: Optional[Iterable[int]] = None) -> int:
+        """Write pending progress (all of it, or only ``session_ids``); returns rows written"""
+        with self._flush_lock:
+            with self._lock:
+                if session_ids is None:
+                    batch, self._pending = self._pending, {}
+                else:
+                    batch = {sid: self._pending.pop(sid) for sid in session_ids if sid in self._pending}
+            if not batch:
+                return 0
+            try:
+                with transaction.atomic():
+                    for session_id, progress in batch.items():
+                        VideoWatchSession.objects.filter(
+                            id=session_id, user_id=progress.user_id
+                        ).advance_progress(progress.watch_duration, progress.percent_viewed)
+            except Exception as e:
+                logger.error(f"Error flushing {len(batch)} watch progress heartbeats: {e}")
+                self._requeue(batch)
+                raise
+            return len(batch)
+
+    def _requeue(self, batch: Dict[int, _Progress]) -> None:
+        with self._lock:
+            for session_id, progress in batch.items():
+                pending = self._pending.get(session_id)
+                if pending is None:
+                    self._pending[session_id] = progress
+                else:
+                    pending.merge(progress.watch_duration, progress.percent_viewed)
+
+    def _ensure_started(self) -> None:
+        if self._thread is not None:
+            return
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='heartbeat-flusher', daemon=True)
+                self._thread.start()
+                atexit.register(self.stop)
+
+    def _run(self) -> None:
+        while not self._stopped.wait(self.flush_interval):
+            try:
+                self.flush()
+            except Exception:
+                pass  # already logged; entries were requeued
+            finally:
+                connection.close_if_unusable_or_obsolete()
+
+    def stop(self) -> None:
+        self._stopped.set()
+        try:
+            self.flush()
+        except Exception:
+            pass
+
+
+_heartbeat_buffer: Optional[HeartbeatBuffer] = None
+_heartbeat_buffer_lock = threading.Lock()
+
+
+def heartbeat_buffering_enabled() -> bool:
+    return settings.HEARTBEAT_BUFFER.get('ENABLED', False)
+
+
+def get_heartbeat_buffer() -> HeartbeatBuffer:
+    """Return the process-wide heartbeat buffer, creating it on first use"""
+    global _heartbeat_buffer
+    if _heartbeat_buffer is None:
+        with _heartbeat_buffer_lock:
+            if _heartbeat_buffer is None:
+                config = settings.HEARTBEAT_BUFFER
+                _heartbeat_buffer = HeartbeatBuffer(
+                    flush_interval=config.get('FLUSH_INTERVAL', 5.0),
+                    max_pending=config.get('MAX_PENDING', 10000),
+                )
+    return _heartbeat_buffer
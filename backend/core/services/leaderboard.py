@@ -0,0 +1,313 @@
+# services/leaderboard.py
+
+import atexit
+import os
+import pickle
+import tempfile
+import threading
+import time
+import logging
+from datetime import datetime, timedelta
+from decimal import Decimal
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import Sum
+from django.utils import timezone
+from typing import Dict, List, Optional, Tuple
+
+from core.models import PointsBalance, Reward, SurveyTransaction, UserProfile
+from core.utils.ranked_scores import RankedScores
+
+logger = logging.getLogger(__name__)
+
+# points: Reward points; earnings: survey earnings in cents
+BOARDS = ('points', 'earnings')
+WINDOWS = ('daily', 'weekly', 'all')
+SNAPSHOT_FORMAT = 1
+
+
+def period_key(window: str, now: datetime) -> str:
+    """Identifies the current daily / weekly period; a new key starts an empty board"""
+    if window == 'daily':
+        return now.date().isoformat()
+    if window == 'weekly':
+        year, week, _ = now.isocalendar()
+        return f'{year}-W{week:02d}'
+    return 'all'
+
+
+def window_start(window: str, now: datetime) -> Optional[datetime]:
+    day = now.replace(hour=0, minute=0, second=0, microsecond=0)
+    if window == 'daily':
+        return day
+    if window == 'weekly':
+        return day - timedelta(days=now.weekday())
+    return None
+
+
+def to_cents(amount) -> int:
+    return int((Decimal(str(amount)) * 100).to_integral_value())
+
+
+class Leaderboard:
+    """
+    Ranked points and earnings boards for the daily, weekly and all-time
+    windows, held in memory as RankedScores.
+
+    Credits are applied incrementally through record(); rebuild() recomputes
+    every board from the database, which also folds in credits applied by
+    other processes, and replays the credits recorded after each board was
+    read. Boards are snapshotted to ``store_path`` so a restart can load them;
+    without a usable snapshot the first build runs on the background thread
+    and ``loaded`` stays False until it finishes. A daily or weekly board is
+    replaced by an empty one when its period rolls over.
+    """
+
+    def __init__(self, store_path: Optional[str] = None, snapshot_interval: float = 60.0,
+                 snapshot_max_age: float = 600.0, refresh_interval: float = 0.0):
+        self.store_path = store_path
+        self.snapshot_interval = snapshot_interval
+        self.snapshot_max_age = snapshot_max_age
+        self.refresh_interval = refresh_interval
+        self._boards: Dict[Tuple[str, str], Tuple[str, RankedScores]] = {}
+        self._lock = threading.Lock()
+        self._rebuild_lock = threading.Lock()
+        # credits recorded while a rebuild is reading the database
+        self._journal: Optional[List[Tuple[str, int, int, datetime]]] = None
+        self._dirty = False
+        self._loaded = False
+        self._last_refresh = 0.0
+        self._stopped = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def loaded(self) -> bool:
+        return self._loaded
+
+    def record(self, board: str, member: int, delta: int, earned_at: Optional[datetime] = None,
+               now: Optional[datetime] = None) -> None:
+        """
+        Credit ``delta`` to a member on the all-time window of ``board``, and
+        on the daily / weekly windows only if ``earned_at`` (default: now)
+        falls in their current period: deleting or editing last week's reward
+        must not move this week's board.
+        """
+        if not delta:
+            return
+        now = now or timezone.now()
+        earned_at = earned_at or now
+        with self._lock:
+            for window in WINDOWS:
+                if period_key(window, earned_at) == period_key(window, now):
+                    self._current(board, window, now).add(member, delta)
+            if self._journal is not None:
+                self._journal.append((board, member, delta, earned_at))
+            self._dirty = True
+
+    def top(self, board: str, window: str, offset: int = 0, limit: int = 20) -> Tuple[str, int, List[Tuple[int, int, int]]]:
+        """``(period, total members, [(rank, member, score), ...])`` for one page of a board"""
+        now = timezone.now()
+        with self._lock:
+            scores = self._current(board, window, now)
+            return period_key(window, now), len(scores), scores.page(offset, limit)
+
+    def rank(self, board: str, window: str, member: int) -> Optional[Tuple[int, int]]:
+        """``(rank, score)`` of a member, or None if they have no score in the window"""
+        with self._lock:
+            scores = self._current(board, window, timezone.now())
+            rank = scores.rank(member)
+            return None if rank is None else (rank, scores.score(member))
+
+    def _current(self, board: str, window: str, now: datetime) -> RankedScores:
+        period = period_key(window, now)
+        current = self._boards.get((board, window))
+        if current is None or current[0] != period:
+            current = self._boards[(board, window)] = (period, RankedScores())
+        return current[1]
+
+    def rebuild(self) -> None:
+        """
+        Recompute every board from the database and swap them in. Credits
+        recorded after a board's query started are not in what it read, so
+        they are replayed onto the new board before the swap.
+        """
+        readers = {'points': self._points_from_db, 'earnings': self._earnings_from_db}
+        with self._rebuild_lock:
+            now = timezone.now()
+            boards, marks = {}, {}
+            with self._lock:
+                self._journal = []
+            try:
+                for window in WINDOWS:
+                    start = window_start(window, now)
+                    for board in BOARDS:
+                        with self._lock:
+                            marks[(board, window)] = len(self._journal)
+                        boards[(board, window)] = (period_key(window, now), readers[board](start))
+                with self._lock:
+                    for (board, window), (period, scores) in boards.items():
+                        for credited, member, delta, at in self._journal[marks[(board, window)]:]:
+                            if credited == board and period_key(window, at) == period:
+                                scores.add(member, delta)
+                    self._boards = boards
+                    self._dirty = True
+                    self._loaded = True
+                    self._last_refresh = time.monotonic()
+            finally:
+                with self._lock:
+                    self._journal = None
+
+    def _points_from_db(self, start: Optional[datetime]) -> RankedScores:
+        scores = RankedScores()
+        if start is None:
+            rows = PointsBalance.objects.exclude(total_points=0).values_list('user_id', 'total_points')
+        else:
+            rows = Reward.objects.filter(created_at__gte=start).values('user_id').annotate(
+                total=Sum('points')
+            ).exclude(total=0).values_list('user_id', 'total')
+        scores.load_scores(rows.iterator(chunk_size=10000))
+        return scores
+
+    def _earnings_from_db(self, start: Optional[datetime]) -> RankedScores:
+        scores = RankedScores()
+        if start is None:
+            rows = UserProfile.objects.exclude(total_earnings=0).values_list('user_id', 'total_earnings')
+        else:
+            rows = SurveyTransaction.objects.filter(
+                transaction_type='survey_reward', created_at__gte=start
+            ).values('user_profile__user_id').annotate(total=Sum('amount')).values_list(
+                'user_profile__user_id', 'total'
+            )
+        scores.load_scores((user_id, to_cents(total)) for user_id, total in rows.iterator(chunk_size=10000) if total)
+        return scores
+
+    def save(self) -> bool:
+        """Write a snapshot to ``store_path`` if anything changed; returns whether one was written"""
+        if not self.store_path:
+            return False
+        with self._lock:
+            if not self._dirty:
+                return False
+            # copy under the lock, pack outside it so credits aren't held up
+            frozen = {key: (period, scores.copy()) for key, (period, scores) in self._boards.items()}
+            self._dirty = False
+        boards = {key: (period, *scores.to_arrays()) for key, (period, scores) in frozen.items()}
+        directory, name = os.path.split(os.path.abspath(self.store_path))
+        tmp_path = None
+        try:
+            # every worker saves to the same store_path, so each writes its own temporary file
+            with tempfile.NamedTemporaryFile(dir=directory, prefix=f'{name}.', suffix='.tmp', delete=False) as f:
+                tmp_path = f.name
+                pickle.dump({'format': SNAPSHOT_FORMAT, 'boards': boards}, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp_path, self.store_path)
+        except OSError as e:
+            logger.error(f"Error writing leaderboard snapshot {self.store_path}: {e}")
+            if tmp_path and os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            self._dirty = True
+            return False
+        return True
+
+    def load(self, max_age: Optional[float] = None) -> bool:
+        """Load the snapshot at ``store_path`` unless it is missing, unreadable or older than ``max_age`` seconds"""
+        if not self.store_path or not os.path.exists(self.store_path):
+            return False
+        if max_age and time.time() - os.path.getmtime(self.store_path) > max_age:
+            return False
+        try:
+            with open(self.store_path, 'rb') as f:
+                snapshot = pickle.load(f)
+        except Exception as e:
+            logger.warning(f"Ignoring unreadable leaderboard snapshot {self.store_path}: {e}")
+            return False
+        if snapshot.get('format') != SNAPSHOT_FORMAT:
+            return False
+        boards = {
+            key: (period, RankedScores.from_arrays(members, scores))
+            for key, (period, members, scores) in snapshot['boards'].items()
+        }
+        with self._lock:
+            self._boards = boards
+            self._loaded = True
+            self._last_refresh = time.monotonic()
+        return True
+
+    def ensure_loaded(self) -> None:
+        """
+        Load a fresh-enough snapshot and start the background thread, once per
+        process. Without a snapshot the thread builds the boards from the
+        database; run rebuild_leaderboard beforehand to avoid the wait.
+        """
+        if not self._loaded:
+            self.load(max_age=self.snapshot_max_age)
+        self._ensure_started()
+
+    def _ensure_started(self) -> None:
+        if self._thread is not None:
+            return
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='leaderboard-snapshot', daemon=True)
+                self._thread.start()
+                atexit.register(self.stop)
+
+    def _run(self) -> None:
+        wait = self.snapshot_interval if self._loaded else 0
+        while not self._stopped.wait(wait):
+            wait = self.snapshot_interval
+            try:
+                stale = self.refresh_interval and time.monotonic() - self._last_refresh >= self.refresh_interval
+                if not self._loaded or stale:
+                    self.rebuild()
+                self.save()
+            except Exception as e:
+                logger.error(f"Error refreshing leaderboard: {e}")
+            finally:
+                connection.close_if_unusable_or_obsolete()
+
+    def stop(self) -> None:
+        self._stopped.set()
+        self.save()
+
+
+_leaderboard: Optional[Leaderboard] = None
+_leaderboard_lock = threading.Lock()
+
+
+def leaderboard_enabled() -> bool:
+    return settings.LEADERBOARD.get('ENABLED', True)
+
+
+def get_leaderboard() -> Leaderboard:
+    """Return the process-wide leaderboard, loading its snapshot on first use"""
+    global _leaderboard
+    if _leaderboard is None:
+        with _leaderboard_lock:
+            if _leaderboard is None:
+                config = settings.LEADERBOARD
+                leaderboard = Leaderboard(
+                    store_path=config.get('STORE_PATH'),
+                    snapshot_interval=config.get('SNAPSHOT_INTERVAL', 60.0),
+                    snapshot_max_age=config.get('SNAPSHOT_MAX_AGE', 600.0),
+                    refresh_interval=config.get('REFRESH_INTERVAL', 0.0),
+                )
+                leaderboard.ensure_loaded()
+                _leaderboard = leaderboard
+    return _leaderboard
+
+
+def _record_after_commit(board: str, user_id: int, delta: int, earned_at: Optional[datetime]) -> None:
+    # a process that hasn't loaded the boards yet picks the credit up from the database
+    if not delta or _leaderboard is None or not leaderboard_enabled():
+        return
+    transaction.on_commit(lambda: _leaderboard.record(board, user_id, delta, earned_at))
+
+
+def record_points(user_id: int, points: int, earned_at: Optional[datetime] = None) -> None:
+    """``earned_at`` is the Reward's created_at, which decides the daily / weekly period"""
+    _record_after_commit('points', user_id, points, earned_at)
+
+
+def record_earnings(user_id: int, amount, earned_at: Optional[datetime] = None) -> None:
+    """``earned_at`` is the SurveyTransaction's created_at, which decides the daily / weekly period"""
+    _record_after_commit('earnings', user_id, to_cents(amount), earned_at)
@@ -0,0 +1,238 @@
+# services/metrics.py
+
+import threading
+import time
+import logging
+from contextvars import ContextVar
+from django.conf import settings
+from typing import Dict, Iterable, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+QUANTILES = (0.5, 0.9, 0.99)
+
+
+class Histogram:
+    """
+    HDR-style log-linear histogram of non-negative integers.
+
+    Values below 2**(sub_bucket_bits + 1) are counted exactly; above that
+    every power of two is split into 2**sub_bucket_bits equal buckets, so a
+    recorded value is off by at most 1 / 2**sub_bucket_bits (about 3% with
+    the default) while memory stays bounded by the value range, not the
+    number of samples. Not thread-safe; MetricsRegistry locks around it.
+    """
+
+    __slots__ = ('sub_bucket_bits', 'counts', 'count', 'total', 'max')
+
+    def __init__(self, sub_bucket_bits: int = 5):
+        self.sub_bucket_bits = sub_bucket_bits
+        self.counts: Dict[int, int] = {}
+        self.count = 0
+        self.total = 0
+        self.max = 0
+
+    def _index(self, value: int) -> int:
+        shift = value.bit_length() - self.sub_bucket_bits - 1
+        if shift <= 0:
+            return value
+        return (shift << self.sub_bucket_bits) + (value >> shift)
+
+    def _upper_bound(self, index: int) -> int:
+        shift = (index >> self.sub_bucket_bits) - 1
+        if shift <= 0:
+            return index
+        top = index - (shift << self.sub_bucket_bits)
+        return ((top + 1) << shift) - 1
+
+    def record(self, value) -> None:
+        value = max(0, int(value))
+        index = self._index(value)
+        self.counts[index] = self.counts.get(index, 0) + 1
+        self.count += 1
+        self.total += value
+        if value > self.max:
+            self.max = value
+
+    def percentile(self, pct: float) -> int:
+        """Upper bound of the bucket holding the ``pct`` percentile (capped at the max seen)"""
+        if not self.count:
+            return 0
+        target = max(1, round(pct / 100 * self.count))
+        seen = 0
+        for index in sorted(self.counts):
+            seen += self.counts[index]
+            if seen >= target:
+                return min(self._upper_bound(index), self.max)
+        return self.max
+
+
+class RequestMetrics:
+    """What one request spent, filled in by the query wrapper and record_upstream()"""
+
+    __slots__ = ('queries', 'db_time', 'upstream_calls', 'upstream_time')
+
+    def __init__(self):
+        self.queries = 0
+        self.db_time = 0.0
+        self.upstream_calls = 0
+        self.upstream_time = 0.0
+
+
+_current_request: ContextVar[Optional[RequestMetrics]] = ContextVar('current_request_metrics', default=None)
+
+
+def begin_request() -> Tuple[RequestMetrics, object]:
+    state = RequestMetrics()
+    return state, _current_request.set(state)
+
+
+def end_request(token) -> None:
+    _current_request.reset(token)
+
+
+def count_query(execute, sql, params, many, context):
+    """connection.execute_wrapper that adds each query's count and time to the current request"""
+    state = _current_request.get()
+    if state is None:
+        return execute(sql, params, many, context)
+    start = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        state.queries += 1
+        state.db_time += time.perf_counter() - start
+
+
+# per-request series: (metric name, RequestMetrics attribute or None, scale to base unit)
+_REQUEST_SERIES = (
+    ('request_duration_seconds', None, 1e6),
+    ('request_db_queries', 'queries', 1),
+    ('request_db_duration_seconds', 'db_time', 1e6),
+    ('request_upstream_calls', 'upstream_calls', 1),
+    ('request_upstream_duration_seconds', 'upstream_time', 1e6),
+    ('response_size_bytes', None, 1),
+)
+
+
+class MetricsRegistry:
+    """
+    In-process per-endpoint metrics: a Histogram per (endpoint, method) for
+    each request series, request counts by status, and upstream call
+    latency. Rendered in the Prometheus text format, with histograms exposed
+    as summaries (quantiles, _sum and _count).
+    """
+
+    def __init__(self, prefix: str = 'teebal', sub_bucket_bits: int = 5):
+        self.prefix = prefix
+        self.sub_bucket_bits = sub_bucket_bits
+        self._lock = threading.Lock()
+        self._requests: Dict[Tuple[str, str], Dict[str, Histogram]] = {}
+        self._statuses: Dict[Tuple[str, str, int], int] = {}
+        self._upstreams: Dict[Tuple[str, str], Histogram] = {}
+
+    def observe_request(self, endpoint: str, method: str, status: int, duration: float,
+                        state: RequestMetrics, response_bytes: int) -> None:
+        values = {
+            'request_duration_seconds': duration * 1e6,
+            'request_db_queries': state.queries,
+            'request_db_duration_seconds': state.db_time * 1e6,
+            'request_upstream_calls': state.upstream_calls,
+            'request_upstream_duration_seconds': state.upstream_time * 1e6,
+            'response_size_bytes': response_bytes,
+        }
+        with self._lock:
+            series = self._requests.get((endpoint, method))
+            if series is None:
+                series = self._requests[(endpoint, method)] = {
+                    name: Histogram(self.sub_bucket_bits) for name, _, _ in _REQUEST_SERIES
+                }
+            for name, value in values.items():
+                series[name].record(value)
+            key = (endpoint, method, status)
+            self._statuses[key] = self._statuses.get(key, 0) + 1
+
+    def observe_upstream(self, upstream: str, outcome: str, duration: float) -> None:
+        with self._lock:
+            histogram = self._upstreams.get((upstream, outcome))
+            if histogram is None:
+                histogram = self._upstreams[(upstream, outcome)] = Histogram(self.sub_bucket_bits)
+            histogram.record(duration * 1e6)
+
+    def snapshot(self, endpoint: str, method: str) -> Optional[Dict[str, Dict[str, float]]]:
+        """count / p50 / p99 / max per series for one endpoint, in recorded units"""
+        with self._lock:
+            series = self._requests.get((endpoint, method))
+            if series is None:
+                return None
+            return {
+                name: {'count': h.count, 'p50': h.percentile(50), 'p99': h.percentile(99), 'max': h.max}
+                for name, h in series.items()
+            }
+
+    def reset(self) -> None:
+        with self._lock:
+            self._requests.clear()
+            self._statuses.clear()
+            self._upstreams.clear()
+
+    def render_prometheus(self) -> str:
+        lines = []
+        with self._lock:
+            for name, _, scale in _REQUEST_SERIES:
+                metric = f'{self.prefix}_{name}'
+                lines.append(f'# TYPE {metric} summary')
+                for (endpoint, method), series in sorted(self._requests.items()):
+                    labels = f'endpoint="{_escape(endpoint)}",method="{method}"'
+                    lines.extend(_summary_lines(metric, labels, series[name], scale))
+
+            metric = f'{self.prefix}_requests_total'
+            lines.append(f'# TYPE {metric} counter')
+            for (endpoint, method, status), count in sorted(self._statuses.items()):
+                lines.append(f'{metric}{{endpoint="{_escape(endpoint)}",method="{method}",status="{status}"}} {count}')
+
+            metric = f'{self.prefix}_upstream_request_duration_seconds'
+            lines.append(f'# TYPE {metric} summary')
+            for (upstream, outcome), histogram in sorted(self._upstreams.items()):
+                labels = f'upstream="{upstream}",outcome="{outcome}"'
+                lines.extend(_summary_lines(metric, labels, histogram, 1e6))
+        return '\n'.join(lines) + '\n'
+
+
+def _escape(value: str) -> str:
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _summary_lines(metric: str, labels: str, histogram: Histogram, scale: float) -> Iterable[str]:
+    for quantile in QUANTILES:
+        yield f'{metric}{{{labels},quantile="{quantile}"}} {histogram.percentile(quantile * 100) / scale:g}'
+    yield f'{metric}_sum{{{labels}}} {histogram.total / scale:g}'
+    yield f'{metric}_count{{{labels}}} {histogram.count}'
+
+
+_registry: Optional[MetricsRegistry] = None
+_registry_lock = threading.Lock()
+
+
+def metrics_enabled() -> bool:
+    return settings.METRICS.get('ENABLED', True)
+
+
+def get_metrics_registry() -> MetricsRegistry:
+    """Return the process-wide metrics registry, creating it on first use"""
+    global _registry
+    if _registry is None:
+        with _registry_lock:
+            if _registry is None:
+                _registry = MetricsRegistry()
+    return _registry
+
+
+def record_upstream(upstream: str, duration: float, ok: bool = True) -> None:
+    """Count an upstream call against the current request and the upstream's latency histogram"""
+    state = _current_request.get()
+    if state is not None:
+        state.upstream_calls += 1
+        state.upstream_time += duration
+    if metrics_enabled():
+        get_metrics_registry().observe_upstream(upstream, 'ok' if ok else 'error', duration)
@@ -0,0 +1,83 @@
+# services/placement_cache.py
+
+import hashlib
+import json
+import threading
+import time
+import logging
+from django.core.cache import cache
+from typing import Dict
+
+from core.models import AdPlacement
+from core.serializers import AdPlacementSerializer
+from core.utils.shared_cache import bounded_timeout
+
+logger = logging.getLogger(__name__)
+
+VERSION_KEY = 'ad-placements:version'
+PAYLOAD_KEY = 'ad-placements:payload:{version}'
+PAYLOAD_TIMEOUT = 24 * 60 * 60
+
+_local_payloads: Dict[int, Dict] = {}
+_local_lock = threading.Lock()
+
+
+def get_placements_version() -> int:
+    """
+    Current placement config version, shared by all processes through the
+    cache. With a per-process cache the version key expires after
+    PROCESS_LOCAL_CACHE_TTL, so a bump made by another worker is picked up
+    (as a fresh version) within that time.
+    """
+    version = cache.get(VERSION_KEY)
+    if version is None:
+        # start from a timestamp so a cache flush can't reuse an old version number
+        cache.add(VERSION_KEY, int(time.time() * 1000), timeout=bounded_timeout(None))
+        version = cache.get(VERSION_KEY)
+    return version
+
+
+def bump_placements_version() -> None:
+    """Invalidate every cached copy of the placement map"""
+    try:
+        cache.incr(VERSION_KEY)
+    except ValueError:
+        cache.set(VERSION_KEY, int(time.time() * 1000), timeout=bounded_timeout(None))
+
+
+def build_placements_payload(version: int) -> Dict:
+    """Serialize enabled placements keyed by placement_key, as data and as JSON bytes with a strong ETag"""
+    placements = AdPlacement.objects.filter(is_enabled=True)
+    data = {
+        p.placement_key: AdPlacementSerializer(p).data
+        for p in placements
+    }
+    body = json.dumps(data, separators=(',', ':'), sort_keys=True).encode('utf-8')
+    return {
+        'version': version,
+        'data': data,
+        'body': body,
+        'etag': f'"{hashlib.sha256(body).hexdigest()[:32]}"',
+    }
+
+
+def get_placements_payload() -> Dict:
+    """
+    Return the serialized placement map for the current version, from this
+    process first, then the shared cache, building it only on a miss.
+    """
+    version = get_placements_version()
+    payload = _local_payloads.get(version)
+    if payload is not None:
+        return payload
+
+    shared_key = PAYLOAD_KEY.format(version=version)
+    payload = cache.get(shared_key)
+    if payload is None:
+        payload = build_placements_payload(version)
+        cache.set(shared_key, payload, PAYLOAD_TIMEOUT)
+
+    with _local_lock:
+        _local_payloads.clear()
+        _local_payloads[version] = payload
+    return payload
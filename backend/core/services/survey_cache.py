@@ -0,0 +1,205 @@
+# services/survey_cache.py
+
+import asyncio
+import threading
+import time
+import logging
+from collections import OrderedDict
+from django.conf import settings
+from typing import Awaitable, Callable, Dict, Optional
+
+from core.services.bitlabs_service import get_async_bitlabs_service, get_bitlabs_service
+
+logger = logging.getLogger(__name__)
+
+
+class _FeedEntry:
+    """A fetched survey feed plus an id -> survey index built once per fetch"""
+    __slots__ = ('payload', 'index', 'fetched_at')
+
+    def __init__(self, payload: Dict, fetched_at: float):
+        self.payload = payload
+        self.fetched_at = fetched_at
+        surveys = (payload.get('data') or {}).get('surveys', [])
+        self.index = {survey.get('id'): survey for survey in surveys}
+
+
+class _Flight:
+    """An upstream fetch in progress that other callers can wait on"""
+    __slots__ = ('done', 'entry')
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.entry: Optional[_FeedEntry] = None
+
+
+class SurveyFeedCache:
+    """
+    Per-user cache of the BitLabs survey feed.
+
+    Entries younger than ``ttl`` are served directly. Entries older than
+    ``ttl`` but younger than ``ttl + stale_ttl`` are served as-is while a
+    background refresh runs. Concurrent misses for the same user share a
+    single upstream fetch. The ``aget_*`` variants do the same on the running
+    event loop using ``async_fetcher`` and share the cached entries.
+    """
+
+    def __init__(self, fetcher: Callable[[str], Optional[Dict]],
+                 async_fetcher: Optional[Callable[[str], Awaitable[Optional[Dict]]]] = None,
+                 ttl: float = 60, stale_ttl: float = 240, max_users: int = 10000,
+                 wait_timeout: float = 35):
+        self._fetcher = fetcher
+        self._async_fetcher = async_fetcher
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self.max_users = max_users
+        self.wait_timeout = wait_timeout
+        self._entries: 'OrderedDict[str, _FeedEntry]' = OrderedDict()
+        self._inflight: Dict[str, _Flight] = {}
+        self._async_inflight: Dict[str, asyncio.Task] = {}
+        self._lock = threading.Lock()
+
+    def get_feed(self, user_id: str) -> Optional[Dict]:
+        """Return the raw survey feed for a user, or None if BitLabs is unavailable"""
+        entry = self._get_entry(user_id)
+        return entry.payload if entry else None
+
+    def get_survey(self, user_id: str, survey_id) -> Optional[Dict]:
+        """Return a single survey from the user's feed, or None if it is not listed"""
+        entry = self._get_entry(user_id)
+        if entry is None:
+            return None
+        return entry.index.get(survey_id)
+
+    async def aget_feed(self, user_id: str) -> Optional[Dict]:
+        entry = await self._aget_entry(user_id)
+        return entry.payload if entry else None
+
+    async def aget_survey(self, user_id: str, survey_id) -> Optional[Dict]:
+        entry = await self._aget_entry(user_id)
+        if entry is None:
+            return None
+        return entry.index.get(survey_id)
+
+    def invalidate(self, user_id: str) -> None:
+        with self._lock:
+            self._entries.pop(user_id, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def _get_entry(self, user_id: str) -> Optional[_FeedEntry]:
+        with self._lock:
+            entry = self._entries.get(user_id)
+        if entry is not None:
+            age = time.monotonic() - entry.fetched_at
+            if age < self.ttl:
+                return entry
+            if age < self.ttl + self.stale_ttl:
+                self._refresh_in_background(user_id)
+                return entry
+        return self._fetch(user_id)
+
+    def _refresh_in_background(self, user_id: str) -> None:
+        with self._lock:
+            if user_id in self._inflight:
+                return
+        thread = threading.Thread(target=self._fetch, args=(user_id,), daemon=True)
+        thread.start()
+
+    def _fetch(self, user_id: str) -> Optional[_FeedEntry]:
+        with self._lock:
+            flight = self._inflight.get(user_id)
+            leader = flight is None
+            if leader:
+                flight = self._inflight[user_id] = _Flight()
+
+        if not leader:
+            flight.done.wait(self.wait_timeout)
+            return flight.entry
+
+        try:
+            payload = self._fetcher(user_id)
+            if payload is not None:
+                flight.entry = self._store(user_id, payload)
+        except Exception as e:
+            logger.error(f"Error refreshing survey feed for user {user_id}: {e}")
+        finally:
+            with self._lock:
+                self._inflight.pop(user_id, None)
+            flight.done.set()
+        return flight.entry
+
+    async def _aget_entry(self, user_id: str) -> Optional[_FeedEntry]:
+        with self._lock:
+            entry = self._entries.get(user_id)
+        if entry is not None:
+            age = time.monotonic() - entry.fetched_at
+            if age < self.ttl:
+                return entry
+            if age < self.ttl + self.stale_ttl:
+                self._get_async_flight(user_id)
+                return entry
+        return await asyncio.shield(self._get_async_flight(user_id))
+
+    def _get_async_flight(self, user_id: str) -> asyncio.Task:
+        """Return the fetch task for the user on this event loop, starting one if needed"""
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            task = self._async_inflight.get(user_id)
+            if task is None or task.done() or task.get_loop() is not loop:
+                task = loop.create_task(self._afetch(user_id))
+                self._async_inflight[user_id] = task
+        return task
+
+    async def _afetch(self, user_id: str) -> Optional[_FeedEntry]:
+        try:
+            payload = await self._async_fetcher(user_id)
+            if payload is not None:
+                return self._store(user_id, payload)
+        except Exception as e:
+            logger.error(f"Error refreshing survey feed for user {user_id}: {e}")
+        finally:
+            with self._lock:
+                if self._async_inflight.get(user_id) is asyncio.current_task():
+                    del self._async_inflight[user_id]
+        return None
+
+    def _store(self, user_id: str, payload: Dict) -> _FeedEntry:
+        entry = _FeedEntry(payload, time.monotonic())
+        with self._lock:
+            self._entries[user_id] = entry
+            self._entries.move_to_end(user_id)
+            while len(self._entries) > self.max_users:
+                self._entries.popitem(last=False)
+        return entry
+
+
+_survey_cache: Optional[SurveyFeedCache] = None
+_survey_cache_lock = threading.Lock()
+
+
+def _fetch_from_bitlabs(user_id: str) -> Optional[Dict]:
+    return get_bitlabs_service().get_surveys(user_id)
+
+
+async def _afetch_from_bitlabs(user_id: str) -> Optional[Dict]:
+    return await get_async_bitlabs_service().get_surveys(user_id)
+
+
+def get_survey_cache() -> SurveyFeedCache:
+    """Return the process-wide survey feed cache, creating it on first use"""
+    global _survey_cache
+    if _survey_cache is None:
+        with _survey_cache_lock:
+            if _survey_cache is None:
+                config = settings.BITLABS_CONFIG
+                _survey_cache = SurveyFeedCache(
+                    fetcher=_fetch_from_bitlabs,
+                    async_fetcher=_afetch_from_bitlabs,
+                    ttl=config.get('SURVEY_CACHE_TTL', 60),
+                    stale_ttl=config.get('SURVEY_CACHE_STALE_TTL', 240),
+                    max_users=config.get('SURVEY_CACHE_MAX_USERS', 10000),
+                )
+    return _survey_cache
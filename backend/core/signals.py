@@ -0,0 +1,83 @@
+from django.contrib.auth.models import User
+from django.db.backends.signals import connection_created
+from django.db.models.signals import post_delete, post_migrate, post_save, pre_save
+from django.dispatch import receiver
+
+from core.authentication import get_user_cache
+from core.models import AdPlacement, QuizQuestion, Reward, UserProfile, VideoTask
+from core.services.catalogue_cache import bump_catalogue_version
+from core.services.dashboard_cache import invalidate_dashboard
+from core.services.metrics import count_query
+from core.services.placement_cache import bump_placements_version
+from core.utils.user_points import backfill_points_balances, credit_points
+
+
+@receiver(pre_save, sender=Reward)
+def remember_previous_points(sender, instance, **kwargs):
+    if instance.pk and not instance._state.adding:
+        instance._previous = (
+            Reward.objects.filter(pk=instance.pk).values_list('user_id', 'points', 'created_at').first()
+        )
+
+
+@receiver(post_save, sender=Reward)
+def credit_reward_points(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    previous = None if created else getattr(instance, '_previous', None)
+    if previous is None:
+        credit_points(instance.user_id, instance.points, earned_at=instance.created_at)
+        return
+    previous_user_id, previous_points, previous_created_at = previous
+    if previous_user_id != instance.user_id or previous_created_at != instance.created_at:
+        # reassigned or backdated (e.g. in the admin): move the points between balances / periods
+        credit_points(previous_user_id, -previous_points, create=False, earned_at=previous_created_at)
+        credit_points(instance.user_id, instance.points, earned_at=instance.created_at)
+    else:
+        credit_points(instance.user_id, instance.points - previous_points, earned_at=instance.created_at)
+
+
+@receiver(post_delete, sender=Reward)
+def debit_reward_points(sender, instance, **kwargs):
+    # no balance row to fix up when the user itself is being deleted
+    credit_points(instance.user_id, -instance.points, create=False, earned_at=instance.created_at)
+
+
+@receiver(post_migrate)
+def backfill_balances_after_migrate(sender, using, **kwargs):
+    # rewards granted before PointsBalance existed would otherwise start at 0
+    if sender.name == 'core':
+        backfill_points_balances(using)
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def invalidate_cached_user(sender, instance, **kwargs):
+    get_user_cache().invalidate(instance.pk)
+
+
+@receiver(post_save, sender=AdPlacement)
+@receiver(post_delete, sender=AdPlacement)
+def invalidate_ad_placements(sender, **kwargs):
+    bump_placements_version()
+
+
+@receiver(post_save, sender=VideoTask)
+@receiver(post_delete, sender=VideoTask)
+@receiver(post_save, sender=QuizQuestion)
+@receiver(post_delete, sender=QuizQuestion)
+def invalidate_video_catalogue(sender, **kwargs):
+    bump_catalogue_version()
+
+
+@receiver(post_save, sender=UserProfile)
+def invalidate_profile_dashboard(sender, instance, **kwargs):
+    # balances edited outside process_callback, e.g. in the admin
+    invalidate_dashboard(instance.user_id)
+
+
+@receiver(connection_created)
+def install_query_counter(sender, connection, **kwargs):
+    # per-request query metrics; a reconnect reuses the same wrapper list
+    if count_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(count_query)
@@ -0,0 +1,114 @@
+"""
+Local stand-in for the BitLabs client API, served from a background thread
+so tests exercise the real HTTP client (pooling, retries, circuit breaker)
+without leaving the machine.
+"""
+
+import hashlib
+import hmac
+import json
+import threading
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit
+
+
+def make_survey(survey_id, value='50', cpi='0.50', category='General'):
+    return {
+        'id': survey_id,
+        'value': value,
+        'loi': 10,
+        'rating': 4,
+        'click_url': f'https://surveys.example/{survey_id}',
+        'cpi': cpi,
+        'category': {'name': category},
+        'country': 'US',
+        'language': 'en',
+    }
+
+
+def sign_callback(payload, secret):
+    """``(body, signature)`` for an S2S callback, signed the way BitLabs signs them"""
+    body = json.dumps(payload)
+    return body, hmac.new(secret.encode('utf-8'), body.encode('utf-8'), hashlib.sha256).hexdigest()
+
+
+class _Handler(BaseHTTPRequestHandler):
+    server: 'BitLabsStubServer'
+
+    def do_GET(self):
+        path = urlsplit(self.path).path
+        self.server.record(path)
+        if self.server.retry_after is not None:
+            self._send(429, {'error': 'rate limited'}, {'Retry-After': str(self.server.retry_after)})
+        elif path == '/v2/client/surveys':
+            self._send(200, {'data': {'surveys': self.server.surveys}})
+        elif path.startswith('/v2/client/users/'):
+            self._send(200, {'data': {'balance': '0.00', 'user_id': path.rsplit('/', 1)[-1]}})
+        else:
+            self._send(404, {'error': 'not found'})
+
+    def do_POST(self):
+        path = urlsplit(self.path).path
+        self.server.record(path)
+        length = int(self.headers.get('Content-Length') or 0)
+        body = json.loads(self.rfile.read(length) or b'{}')
+        if path == '/v2/client/surveys/start':
+            self._send(200, {'link': f"https://surveys.example/{body.get('survey_id')}?click={body.get('click_id')}"})
+        else:
+            self._send(404, {'error': 'not found'})
+
+    def _send(self, status, payload, headers=None):
+        body = json.dumps(payload).encode('utf-8')
+        self.send_response(status)
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class BitLabsStubServer(ThreadingHTTPServer):
+    """
+    BitLabs API stub on a free localhost port. ``surveys`` is the feed every
+    user gets; ``calls`` counts requests per path. Setting ``retry_after``
+    answers every GET with 429 and that Retry-After.
+    """
+
+    daemon_threads = True
+
+    def __init__(self, surveys=None):
+        super().__init__(('127.0.0.1', 0), _Handler)
+        self.surveys = surveys if surveys is not None else [make_survey(f's{n}') for n in range(1, 26)]
+        self.calls = Counter()
+        self.retry_after = None
+        self._calls_lock = threading.Lock()
+        self._thread = None
+
+    @property
+    def url(self):
+        host, port = self.server_address[:2]
+        return f'http://{host}:{port}'
+
+    def record(self, path):
+        with self._calls_lock:
+            self.calls[path] += 1
+
+    def reset_calls(self):
+        with self._calls_lock:
+            self.calls.clear()
+
+    def start(self):
+        self._thread = threading.Thread(target=self.serve_forever, name='bitlabs-stub', daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+        if self._thread is not None:
+            self._thread.join()
@@ -0,0 +1,76 @@
+"""
+Query-budget assertions.
+
+assertQueryBudget() fails when a block runs more queries than its budget,
+or runs the same statement (literals stripped) more times than
+``max_repeats``, which is how an N+1 shows up. The failure lists every
+captured query so the new one is easy to spot. Savepoint statements are not
+counted: how many there are depends on whether the test case already holds
+a transaction, not on the view.
+"""
+
+import re
+from collections import Counter
+from contextlib import contextmanager
+
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+
+from core.services import catalogue_cache, placement_cache
+
+_STRING_LITERAL = re.compile(r"'(?:[^']|'')*'")
+_NUMBER_LITERAL = re.compile(r'\b\d+(?:\.\d+)?\b')
+_IN_LIST = re.compile(r'\(\s*\?(?:\s*,\s*\?)*\s*\)')
+_TRANSACTION_CONTROL = ('SAVEPOINT', 'RELEASE SAVEPOINT', 'ROLLBACK TO SAVEPOINT')
+
+
+def query_shape(sql):
+    """SQL with literals and IN lists replaced, so repeats of one statement compare equal"""
+    sql = _STRING_LITERAL.sub('?', sql)
+    sql = _NUMBER_LITERAL.sub('?', sql)
+    return _IN_LIST.sub('(?)', sql)
+
+
+class QueryBudgetTestCase(TestCase):
+    """
+    TestCase for per-endpoint query budgets. Shared caches are emptied before
+    every test so each one starts cold; ``self.client`` is an APIClient.
+    """
+
+    client_class = APIClient
+
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+        catalogue_cache.get_catalogue_cache().clear()
+        placement_cache._local_payloads.clear()
+
+    @contextmanager
+    def assertQueryBudget(self, budget, max_repeats=1, using=DEFAULT_DB_ALIAS):
+        with CaptureQueriesContext(connections[using]) as context:
+            yield context
+        queries = [q['sql'] for q in context.captured_queries if not q['sql'].startswith(_TRANSACTION_CONTROL)]
+        repeated = {
+            shape: count for shape, count in Counter(map(query_shape, queries)).items() if count > max_repeats
+        }
+        problems = []
+        if len(queries) > budget:
+            problems.append(f'{len(queries)} queries, budget is {budget}')
+        for shape, count in repeated.items():
+            problems.append(f'statement repeated {count} times (limit {max_repeats}): {shape}')
+        if problems:
+            listing = '\n'.join(f'{n}. {sql}' for n, sql in enumerate(queries, start=1))
+            self.fail('\n'.join(problems) + '\nCaptured queries:\n' + listing)
+
+    def assertConstantQueries(self, request, sizes):
+        """``request(size)`` runs the same number of queries for every size"""
+        counts = {}
+        for size in sizes:
+            with CaptureQueriesContext(connections[DEFAULT_DB_ALIAS]) as context:
+                request(size)
+            counts[size] = sum(1 for q in context.captured_queries if not q['sql'].startswith(_TRANSACTION_CONTROL))
+        if len(set(counts.values())) > 1:
+            self.fail(f'query count grows with the result size: {counts}')
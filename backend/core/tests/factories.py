@@ -0,0 +1,127 @@
+"""
+Bulk seeding of realistic data volumes for query-budget tests. Rows are
+written with bulk_create, so save() and signals are skipped; anything they
+would maintain (answer keys, PointsBalance) is filled in here directly.
+"""
+
+import random
+import uuid
+from datetime import timedelta
+from decimal import Decimal
+
+from django.contrib.auth.models import User
+from django.utils import timezone
+
+from core.models import (
+    AdPlacement, PointsBalance, QuizQuestion, Reward, SurveyCompletion, SurveyTransaction,
+    UserProfile, VideoTask, VideoWatchSession,
+)
+from core.utils.answer_matching import get_matcher
+
+BATCH_SIZE = 1000
+
+
+def seed_catalogue(videos=2000, questions_per_video=5, seed=0):
+    """``videos`` videos, newest first by created_at, each with ``questions_per_video`` questions"""
+    rng = random.Random(seed)
+    now = timezone.now()
+    VideoTask.objects.bulk_create(
+        [
+            VideoTask(
+                title=f'Video {n}',
+                description='Watch and answer the quiz. ' * rng.randint(1, 8),
+                youtube_url=f'https://www.youtube.com/watch?v=vid{n:07d}',
+                yt_video_id=f'vid{n:07d}',
+                created_at=now - timedelta(minutes=n),
+            )
+            for n in range(videos)
+        ],
+        batch_size=BATCH_SIZE,
+    )
+    matcher = get_matcher('exact')
+    questions = []
+    for video_id in VideoTask.objects.values_list('id', flat=True):
+        for n in range(questions_per_video):
+            answer = f'answer {video_id}-{n}'
+            questions.append(QuizQuestion(
+                video_id=video_id,
+                question_text=f'Question {n} about video {video_id}?',
+                correct_answer=answer,
+                answer_keys=matcher.build_keys([answer]),
+                answer_keys_token=uuid.uuid4().hex,
+                points=rng.randint(1, 5),
+            ))
+    QuizQuestion.objects.bulk_create(questions, batch_size=BATCH_SIZE)
+
+
+def seed_placements():
+    AdPlacement.objects.bulk_create([
+        AdPlacement(placement_key='home_screen_rewarded', ad_format='REWARDED', points_reward=5,
+                    ad_unit_id='ca-app-pub-test/rewarded'),
+        AdPlacement(placement_key='home_screen_banner', ad_format='BANNER', ad_unit_id='ca-app-pub-test/banner'),
+        AdPlacement(placement_key='quiz_interstitial', ad_format='INTERSTITIAL', ad_unit_id='ca-app-pub-test/inter'),
+        AdPlacement(placement_key='legacy_rewarded', ad_format='REWARDED', points_reward=1, is_enabled=False,
+                    ad_unit_id='ca-app-pub-test/legacy'),
+    ])
+
+
+def seed_user(username, rewards=5000, surveys=1000, transactions=3000, seed=0):
+    """
+    A user with a profile and a long history: ``rewards`` Reward rows,
+    ``surveys`` SurveyCompletion rows and ``transactions`` SurveyTransaction
+    rows spread over the past year, plus a matching PointsBalance.
+    """
+    rng = random.Random(seed)
+    now = timezone.now()
+    user = User.objects.create_user(username=username, password=username)
+    profile = UserProfile.objects.create(
+        user=user,
+        bitlabs_user_id=f'bl-{username}',
+        total_earnings=Decimal('125.50'),
+        available_balance=Decimal('42.25'),
+    )
+
+    reward_rows = [
+        Reward(user=user, points=rng.randint(1, 20), created_at=now - timedelta(minutes=rng.randint(0, 525600)))
+        for _ in range(rewards)
+    ]
+    Reward.objects.bulk_create(reward_rows, batch_size=BATCH_SIZE)
+    PointsBalance.objects.create(user=user, total_points=sum(r.points for r in reward_rows))
+
+    SurveyCompletion.objects.bulk_create(
+        [
+            SurveyCompletion(
+                user_profile=profile,
+                survey_id=f'hist-{n}',
+                click_id=f'{username}-hist-{n}',
+                status=rng.choice(['completed', 'rejected', 'quota_full']),
+                reward_amount=Decimal(rng.randint(10, 300)) / 100,
+            )
+            for n in range(surveys)
+        ],
+        batch_size=BATCH_SIZE,
+    )
+    completion_ids = list(SurveyCompletion.objects.filter(user_profile=profile).values_list('id', flat=True))
+    SurveyTransaction.objects.bulk_create(
+        [
+            SurveyTransaction(
+                user_profile=profile,
+                transaction_type='survey_reward',
+                amount=Decimal(rng.randint(10, 300)) / 100,
+                description=f'Survey hist-{n} completion reward',
+                survey_completion_id=rng.choice(completion_ids) if completion_ids else None,
+            )
+            for n in range(transactions)
+        ],
+        batch_size=BATCH_SIZE,
+    )
+    return user
+
+
+def seed_watch_sessions(user, videos, completed=True):
+    """One watch session per video for ``user``"""
+    VideoWatchSession.objects.bulk_create(
+        [VideoWatchSession(user=user, video=video, completed=completed, percent_viewed=100.0 if completed else 0.0)
+         for video in videos],
+        batch_size=BATCH_SIZE,
+    )
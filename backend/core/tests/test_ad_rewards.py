@@ -0,0 +1,138 @@
+import threading
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.test import SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from core.models import Reward
+from core.services import ad_rewards
+from core.services.ad_rewards import AdRewardBuffer, SlidingWindowLimiter
+from core.tests.factories import seed_placements
+from core.utils.user_points import get_user_total_points
+
+
+class SlidingWindowLimiterTests(SimpleTestCase):
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+        self.limiter = SlidingWindowLimiter(limit=3, window=360)
+        self.clock = self.enterContext(mock.patch('core.services.ad_rewards.time.time', return_value=3600.0))
+
+    def test_limit_per_window(self):
+        self.assertEqual([self.limiter.allow((1, 'home')) for _ in range(4)], [True, True, True, False])
+        self.assertTrue(self.limiter.allow((2, 'home')))
+        self.assertTrue(self.limiter.allow((1, 'quiz')))
+
+    def test_previous_window_counts_while_it_overlaps(self):
+        for _ in range(3):
+            self.limiter.allow((1, 'home'))
+        # a third of the way into the next window, two thirds of the old hits still count
+        self.clock.return_value = 3600.0 + 360 + 120
+        self.assertEqual([self.limiter.allow((1, 'home')) for _ in range(2)], [True, False])
+        self.clock.return_value = 3600.0 + 2 * 360
+        self.assertTrue(self.limiter.allow((1, 'home')))
+
+    def test_rejected_hits_are_not_counted(self):
+        for _ in range(10):
+            self.limiter.allow((1, 'home'))
+        self.clock.return_value = 3600.0 + 360 + 359
+        self.assertTrue(self.limiter.allow((1, 'home')))
+
+
+class AdRewardBufferTests(TransactionTestCase):
+    def setUp(self):
+        self.users = [User.objects.create(username=f'viewer{n}') for n in range(8)]
+
+    def test_save_returns_after_commit(self):
+        buffer = AdRewardBuffer()
+        buffer.save(Reward(user=self.users[0], points=5))
+        self.assertEqual(Reward.objects.filter(user=self.users[0]).count(), 1)
+        self.assertEqual(get_user_total_points(self.users[0].id), 5)
+
+    def test_concurrent_saves_share_batches(self):
+        buffer = AdRewardBuffer()
+        batches = []
+        write = ad_rewards.bulk_create_rewards
+
+        def record_batch(rewards):
+            batches.append(len(rewards))
+            return write(rewards)
+
+        barrier = threading.Barrier(len(self.users))
+
+        def submit(user):
+            barrier.wait()
+            buffer.save(Reward(user=user, points=1))
+
+        with mock.patch.object(ad_rewards, 'bulk_create_rewards', side_effect=record_batch):
+            threads = [threading.Thread(target=submit, args=(user,)) for user in self.users]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+
+        self.assertEqual(Reward.objects.count(), len(self.users))
+        self.assertEqual(sum(batches), len(self.users))
+
+    def test_bad_reward_fails_only_its_own_request(self):
+        buffer = AdRewardBuffer()
+        good = _PendingSave(buffer, Reward(user=self.users[0], points=5))
+        bad = _PendingSave(buffer, Reward(user_id=999999, points=5))
+        with buffer._write_lock:
+            good.start()
+            bad.start()
+            while len(buffer._pending) < 2:
+                pass
+        good.join()
+        bad.join()
+        self.assertIsNone(good.error)
+        self.assertIsNotNone(bad.error)
+        self.assertEqual(list(Reward.objects.values_list('user_id', flat=True)), [self.users[0].id])
+
+
+class _PendingSave(threading.Thread):
+    def __init__(self, buffer, reward):
+        super().__init__()
+        self.buffer = buffer
+        self.reward = reward
+        self.error = None
+
+    def run(self):
+        try:
+            self.buffer.save(self.reward)
+        except Exception as e:
+            self.error = e
+
+
+@override_settings(AD_REWARDS={'BURST': 2, 'PER_HOUR': 30, 'BATCH_ENABLED': True})
+class AwardAdPointsViewTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        seed_placements()
+        cls.user = User.objects.create_user(username='viewer', password='pw')
+
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+        self.enterContext(mock.patch.object(ad_rewards, '_limiter', None))
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def award(self, placement_key='home_screen_rewarded'):
+        return self.client.post(reverse('award-ad-points'), {'placement_key': placement_key}, format='json')
+
+    def test_award_is_saved_before_the_response(self):
+        self.assertEqual(self.award().status_code, 200)
+        self.assertEqual(Reward.objects.filter(user=self.user).count(), 1)
+        self.assertEqual(get_user_total_points(self.user.id), 5)
+
+    def test_rate_limited(self):
+        self.assertEqual([self.award().status_code for _ in range(3)], [200, 200, 429])
+        self.assertEqual(Reward.objects.filter(user=self.user).count(), 2)
+
+    def test_rejects_placements_that_are_not_rewarded(self):
+        self.assertEqual(self.award('home_screen_banner').status_code, 400)
+        self.assertEqual(self.award('legacy_rewarded').status_code, 400)
@@ -0,0 +1,119 @@
+from unittest import mock
+
+from django.core.exceptions import ValidationError
+from django.test import SimpleTestCase, TestCase
+
+from core.models import QuizQuestion, VideoTask
+from core.utils.answer_matching import MATCHERS, answer_key_sets, fold_answer, get_matcher, within_edit_distance
+
+
+class AnswerFoldingTests(SimpleTestCase):
+    def test_fold_answer(self):
+        self.assertEqual(fold_answer('  The  Red-Planet! '), 'the red planet')
+        self.assertEqual(fold_answer('STRASSE'), fold_answer('straße'))
+        self.assertEqual(fold_answer('?!'), '')
+
+    def test_exact_only_trims_and_lowercases(self):
+        matcher = get_matcher('exact')
+        keys = frozenset(matcher.build_keys(['Mars']))
+        self.assertTrue(matcher.matches(keys, '  MARS '))
+        self.assertFalse(matcher.matches(keys, 'Mars.'))
+
+    def test_folded_ignores_punctuation_and_spacing(self):
+        matcher = get_matcher('folded')
+        keys = frozenset(matcher.build_keys(['New York']))
+        self.assertTrue(matcher.matches(keys, 'new   york!'))
+        self.assertFalse(matcher.matches(keys, 'new yrok'))
+
+    def test_build_keys_skips_blank_and_duplicate_answers(self):
+        self.assertEqual(get_matcher('folded').build_keys(['Mars', 'mars!', '', None, 'Red planet']),
+                         ['mars', 'red planet'])
+
+    def test_unknown_matcher(self):
+        self.assertNotIn('nope', MATCHERS)
+        with self.assertRaisesMessage(ValueError, 'Unknown answer matcher: nope'):
+            get_matcher('nope')
+
+
+class EditDistanceTests(SimpleTestCase):
+    def test_within_edit_distance(self):
+        self.assertTrue(within_edit_distance('kitten', 'kitten', 0))
+        self.assertTrue(within_edit_distance('kitten', 'sitting', 3))
+        self.assertFalse(within_edit_distance('kitten', 'sitting', 2))
+        self.assertTrue(within_edit_distance('', 'ab', 2))
+        self.assertFalse(within_edit_distance('a', 'abcd', 2))
+
+    def test_fuzzy_bound_scales_with_key_length(self):
+        matcher = get_matcher('fuzzy')
+        # up to len // 4 edits, capped at 2
+        keys = frozenset(matcher.build_keys(['photosynthesis', 'jupiter', 'sun']))
+        self.assertTrue(matcher.matches(keys, 'fotosynthesis'))
+        self.assertFalse(matcher.matches(keys, 'fotosynthesys'))
+        self.assertTrue(matcher.matches(keys, 'jupyter'))
+        self.assertFalse(matcher.matches(keys, 'jupyterr'))
+        # keys under four characters must match exactly
+        self.assertTrue(matcher.matches(keys, 'Sun!'))
+        self.assertFalse(matcher.matches(keys, 'son'))
+
+
+class AcceptedAnswerTests(SimpleTestCase):
+    def question(self, **kwargs):
+        question = QuizQuestion(correct_answer='Mars', **kwargs)
+        question.build_answer_keys()
+        return question
+
+    def test_accepted_alternatives(self):
+        question = self.question(accepted_answers=['The Red Planet', 'Planet Mars'], match_mode='folded')
+        self.assertEqual(question.answer_keys, ['mars', 'the red planet', 'planet mars'])
+        self.assertTrue(question.is_correct_answer('the red planet.'))
+        self.assertTrue(question.is_correct_answer('PLANET MARS'))
+        self.assertFalse(question.is_correct_answer('Venus'))
+
+    def test_keys_rebuilt_when_answers_change(self):
+        question = self.question(accepted_answers=['Red planet'])
+        self.assertTrue(question.is_correct_answer('red planet'))
+        question.accepted_answers = []
+        question.build_answer_keys()
+        self.assertFalse(question.is_correct_answer('red planet'))
+
+    def test_rows_without_keys_build_them_on_first_use(self):
+        question = QuizQuestion(correct_answer='Mars', accepted_answers=['Ares'])
+        self.assertEqual(question.answer_keys, [])
+        self.assertTrue(question.is_correct_answer('ares'))
+
+
+class GradingLoadTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.video = VideoTask.objects.create(title='planets', youtube_url='https://youtu.be/planets')
+        cls.question = QuizQuestion.objects.create(
+            video=cls.video, question_text='Red planet?', correct_answer='Mars',
+            accepted_answers=[f'alternative {n}' for n in range(500)],
+        )
+
+    def grade(self, answer):
+        return QuizQuestion.objects.for_grading([self.question.id])[self.question.id].is_correct_answer(answer)
+
+    def test_fresh_loads_reuse_the_key_set(self):
+        answer_key_sets.clear()
+        with self.assertNumQueries(2):
+            self.assertTrue(self.grade('alternative 7'))
+        # one query per fresh load, and no set is rebuilt
+        with self.assertNumQueries(2), mock.patch('core.models.frozenset', side_effect=AssertionError, create=True):
+            self.assertTrue(self.grade('alternative 7'))
+            self.assertFalse(self.grade('Venus'))
+
+    def test_edited_answers_take_effect(self):
+        self.assertTrue(self.grade('alternative 7'))
+        question = QuizQuestion.objects.get(id=self.question.id)
+        question.accepted_answers = ['Ares']
+        question.save()
+        self.assertFalse(self.grade('alternative 7'))
+        self.assertTrue(self.grade('ares'))
+
+    def test_unknown_match_mode_is_rejected(self):
+        question = QuizQuestion(video=self.video, question_text='?', correct_answer='Mars', match_mode='nope')
+        with self.assertRaises(ValidationError) as raised:
+            question.full_clean()
+        self.assertIn('match_mode', raised.exception.message_dict)
@@ -0,0 +1,134 @@
+import tempfile
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+from rest_framework_simplejwt.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.tokens import AccessToken
+
+from core import authentication
+from core.authentication import SHARED_CACHE_PREFIX, CachedJWTAuthentication, UserCache, get_user_cache
+from core.utils.request_user import get_dev_fallback_user, reset_dev_fallback_user
+from core.utils.shared_cache import cache_is_shared
+
+
+class UserCacheTests(SimpleTestCase):
+    def setUp(self):
+        self.enterContext(mock.patch.object(authentication, '_user_cache', None))
+        self.addCleanup(cache.clear)
+
+    def test_shared_level_skipped_for_a_process_local_cache(self):
+        self.assertFalse(cache_is_shared())
+        user_cache = get_user_cache()
+        self.assertEqual(user_cache.shared_ttl, 0)
+        user_cache.set(1, 'user')
+        self.assertIsNone(cache.get(f'{SHARED_CACHE_PREFIX}1'))
+
+    def test_shared_level_used_for_a_shared_cache(self):
+        location = self.enterContext(tempfile.TemporaryDirectory())
+        shared = {'default': {'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+                              'LOCATION': location}}
+        with override_settings(CACHES=shared):
+            self.assertTrue(cache_is_shared())
+            self.assertEqual(get_user_cache().shared_ttl, 300)
+
+    def test_local_entries_expire(self):
+        user_cache = UserCache(ttl=5, shared_ttl=0)
+        with mock.patch('core.authentication.time.monotonic', return_value=100.0):
+            user_cache.set('7', 'user')
+            self.assertEqual(user_cache.get(7), 'user')
+        with mock.patch('core.authentication.time.monotonic', return_value=105.0):
+            self.assertIsNone(user_cache.get(7))
+
+
+class CachedJWTAuthenticationTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='jwt', password='old-password')
+
+    def setUp(self):
+        location = self.enterContext(tempfile.TemporaryDirectory())
+        self.enterContext(override_settings(CACHES={'default': {
+            'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache', 'LOCATION': location,
+        }}))
+        self.enterContext(mock.patch.object(authentication, '_user_cache', None))
+        self.enterContext(mock.patch.object(api_settings, 'CHECK_REVOKE_TOKEN', True))
+        self.key = f'{SHARED_CACHE_PREFIX}{self.user.id}'
+
+    def authenticate(self, token=None):
+        backend = CachedJWTAuthentication()
+        return backend.get_user(backend.get_validated_token(str(token or AccessToken.for_user(self.user))))
+
+    def test_shared_entry_holds_no_password_hash(self):
+        self.authenticate()
+        entry = cache.get(self.key)
+        self.assertEqual(
+            {name: entry[name] for name in ('id', 'username', 'is_active', 'is_staff')},
+            {'id': self.user.id, 'username': 'jwt', 'is_active': True, 'is_staff': False},
+        )
+        self.assertNotIn('password', entry)
+        self.assertNotIn(self.user.password, entry.values())
+
+    def test_cached_user_saves_only_cached_fields(self):
+        self.authenticate()
+        get_user_cache().clear()  # served from the shared level
+        with self.assertNumQueries(0):
+            user = self.authenticate()
+        self.assertEqual((user.id, user.username), (self.user.id, 'jwt'))
+        user.save()
+        self.user.refresh_from_db()
+        self.assertTrue(self.user.check_password('old-password'))
+
+    def test_deactivation_invalidates(self):
+        token = AccessToken.for_user(self.user)
+        self.authenticate(token)
+        self.user.is_active = False
+        self.user.save()
+        self.assertIsNone(cache.get(self.key))
+        with self.assertRaises(AuthenticationFailed):
+            self.authenticate(token)
+
+    def test_password_change_invalidates(self):
+        token = AccessToken.for_user(self.user)
+        self.authenticate(token)
+        self.user.set_password('new-password')
+        self.user.save()
+        self.assertIsNone(cache.get(self.key))
+        with self.assertRaises(AuthenticationFailed):
+            self.authenticate(token)
+        # and the new hash's digest is what gets cached next
+        self.authenticate()
+        with self.assertRaises(AuthenticationFailed):
+            self.authenticate(token)
+
+
+@override_settings(DEV_FALLBACK_USERNAME='dev')
+class DevFallbackUserTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='dev', password='dev')
+
+    def setUp(self):
+        reset_dev_fallback_user()
+        self.addCleanup(reset_dev_fallback_user)
+
+    @override_settings(DEBUG=True)
+    def test_used_in_debug(self):
+        self.assertEqual(get_dev_fallback_user(), self.user)
+
+    @override_settings(DEBUG=False)
+    def test_anonymous_requests_rejected_outside_debug(self):
+        for name in ('user_dashboard', 'get_surveys', 'get_surveys_async'):
+            with self.subTest(name=name):
+                self.assertIn(self.client.get(reverse(name)).status_code, (401, 403))
+
+    def test_cached_user_not_served_once_debug_is_off(self):
+        with override_settings(DEBUG=True):
+            get_dev_fallback_user()
+        with override_settings(DEBUG=False):
+            self.assertIn(self.client.get(reverse('get_surveys_async')).status_code, (401, 403))
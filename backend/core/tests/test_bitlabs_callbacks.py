@@ -0,0 +1,47 @@
+import json
+
+from django.conf import settings
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from core.models import CallbackInbox
+from core.services.bitlabs_callbacks import drain_inbox_batch
+from core.tests.bitlabs_stub import sign_callback
+
+MALFORMED = [
+    {'type': 'survey_completed', 'uid': 'bl-user', 'click_id': 'click-1', 'reward': 'abc'},
+    {'type': 'survey_completed', 'uid': 'bl-user', 'click_id': 'click-1', 'reward': 'NaN'},
+    {'type': 'survey_completed', 'uid': 'bl-user', 'click_id': 'click-1', 'reward': '-5'},
+    ['not', 'an', 'object'],
+]
+
+
+class MalformedCallbackTests(TestCase):
+
+    def post_callback(self, payload):
+        body, signature = sign_callback(payload, settings.BITLABS_CONFIG['S2S_SECRET'])
+        return self.client.generic(
+            'POST', reverse('bitlabs_callback'), body,
+            content_type='application/json', HTTP_X_BITLABS_SIGNATURE=signature,
+        )
+
+    def test_rejected_with_400(self):
+        for payload in MALFORMED:
+            with self.subTest(payload=payload):
+                self.assertEqual(self.post_callback(payload).status_code, 400)
+
+    @override_settings(BITLABS_CONFIG={**settings.BITLABS_CONFIG, 'CALLBACK_MODE': 'queue'})
+    def test_not_queued(self):
+        for payload in MALFORMED:
+            with self.subTest(payload=payload):
+                self.assertEqual(self.post_callback(payload).status_code, 400)
+        self.assertFalse(CallbackInbox.objects.exists())
+
+    def test_queued_row_is_not_retried(self):
+        # queued before payloads were validated on arrival
+        row = CallbackInbox.objects.create(payload=json.dumps(MALFORMED[0]))
+        self.assertEqual(drain_inbox_batch(), 1)
+        row.refresh_from_db()
+        self.assertIsNotNone(row.processed_at)
+        self.assertEqual(row.attempts, 1)
+        self.assertIn('Invalid reward', row.last_error)
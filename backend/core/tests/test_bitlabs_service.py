@@ -0,0 +1,64 @@
+import asyncio
+import threading
+import time
+from unittest import mock
+
+from django.conf import settings
+from django.test import SimpleTestCase
+
+from core.services import bitlabs_service
+from core.services.bitlabs_service import AsyncBitLabsService, BitLabsService
+from core.tests.bitlabs_stub import BitLabsStubServer
+
+
+class BitLabsServiceSingletonTests(SimpleTestCase):
+    def setUp(self):
+        self.enterContext(mock.patch.object(bitlabs_service, '_bitlabs_service', None))
+        self.enterContext(mock.patch.object(bitlabs_service, '_async_bitlabs_service', None))
+
+    def test_async_service_in_fresh_process(self):
+        # run in a thread so a deadlock fails the test instead of hanging the run
+        result = {}
+        worker = threading.Thread(
+            target=lambda: result.setdefault('service', bitlabs_service.get_async_bitlabs_service()),
+            daemon=True,
+        )
+        worker.start()
+        worker.join(timeout=5)
+        self.assertFalse(worker.is_alive(), 'get_async_bitlabs_service() deadlocked')
+
+        service = result['service']
+        self.assertIs(service, bitlabs_service.get_async_bitlabs_service())
+        self.assertIs(service.breaker, bitlabs_service.get_bitlabs_service().breaker)
+
+
+class RetryAfterTests(SimpleTestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.stub = BitLabsStubServer().start()
+        cls.addClassCleanup(cls.stub.stop)
+
+    def setUp(self):
+        self.stub.reset_calls()
+        self.addCleanup(setattr, self.stub, 'retry_after', None)
+        self.config = {**settings.BITLABS_CONFIG, 'BASE_URL': self.stub.url, 'MAX_RETRIES': 2, 'MAX_RETRY_AFTER': 1}
+        self.sync_service = BitLabsService(self.config)
+        self.async_service = AsyncBitLabsService(self.config, breaker=self.sync_service.breaker)
+
+    def fetch_both(self):
+        started = time.monotonic()
+        self.assertIsNone(self.sync_service.get_surveys('user-1'))
+        self.assertIsNone(asyncio.run(self.async_service.get_surveys('user-1')))
+        return time.monotonic() - started
+
+    def test_long_retry_after_is_not_waited_for(self):
+        self.stub.retry_after = 3600
+        self.assertLess(self.fetch_both(), 2)
+        self.assertEqual(self.stub.calls['/v2/client/surveys'], 2)
+
+    def test_short_retry_after_is_honoured(self):
+        self.stub.retry_after = 0
+        self.fetch_both()
+        # the first attempt plus MAX_RETRIES retries, for each client
+        self.assertEqual(self.stub.calls['/v2/client/surveys'], 6)
@@ -0,0 +1,94 @@
+import asyncio
+from unittest import mock
+
+import httpx
+from django.test import SimpleTestCase
+
+from core.services.bitlabs_service import AsyncBitLabsService, BitLabsUnavailable
+from core.services.circuit_breaker import CircuitBreaker, CircuitOpenError
+
+
+class CircuitBreakerTests(SimpleTestCase):
+    def setUp(self):
+        self.clock = self.enterContext(mock.patch('core.services.circuit_breaker.time.monotonic', return_value=100.0))
+        self.breaker = CircuitBreaker('test', failure_threshold=2, reset_timeout=30)
+
+    def trip(self):
+        for _ in range(2):
+            self.breaker.record_failure()
+
+    def test_opens_after_consecutive_failures(self):
+        self.breaker.record_failure()
+        self.breaker.record_success()
+        self.breaker.record_failure()
+        self.assertEqual(self.breaker.state, CircuitBreaker.CLOSED)
+        self.trip()
+        self.assertEqual(self.breaker.state, CircuitBreaker.OPEN)
+        with self.assertRaises(CircuitOpenError):
+            self.breaker.before_call()
+
+    def test_one_trial_after_the_reset_timeout(self):
+        self.trip()
+        self.clock.return_value = 130.0
+        self.breaker.before_call()
+        self.assertEqual(self.breaker.state, CircuitBreaker.HALF_OPEN)
+        with self.assertRaises(CircuitOpenError):
+            self.breaker.before_call()
+        self.breaker.record_success()
+        self.assertEqual(self.breaker.state, CircuitBreaker.CLOSED)
+        self.breaker.before_call()
+
+    def test_failed_trial_reopens(self):
+        self.trip()
+        self.clock.return_value = 130.0
+        self.breaker.before_call()
+        self.breaker.record_failure()
+        self.assertEqual(self.breaker.state, CircuitBreaker.OPEN)
+        self.clock.return_value = 159.0
+        with self.assertRaises(CircuitOpenError):
+            self.breaker.before_call()
+
+    def test_trial_that_never_reports_back_lapses(self):
+        self.trip()
+        self.clock.return_value = 130.0
+        self.breaker.before_call()
+        self.clock.return_value = 159.0
+        with self.assertRaises(CircuitOpenError):
+            self.breaker.before_call()
+        self.clock.return_value = 160.0
+        self.breaker.before_call()
+        self.assertEqual(self.breaker.state, CircuitBreaker.HALF_OPEN)
+
+
+class AsyncBreakerReportingTests(SimpleTestCase):
+    def setUp(self):
+        self.breaker = CircuitBreaker('test', failure_threshold=1, reset_timeout=30)
+        self.service = AsyncBitLabsService(breaker=self.breaker)
+        self.service.max_retries = 0
+        self.client = mock.Mock(spec=httpx.AsyncClient)
+        self.enterContext(mock.patch.object(self.service, '_get_client', return_value=self.client))
+
+    def test_cancelled_call_counts_as_failure(self):
+        async def cancel_midway():
+            started = asyncio.Event()
+
+            async def hang(*args, **kwargs):
+                started.set()
+                await asyncio.sleep(60)
+
+            self.client.request.side_effect = hang
+            task = asyncio.ensure_future(self.service.get_user_rewards('user-1'))
+            await started.wait()
+            task.cancel()
+            with self.assertRaises(asyncio.CancelledError):
+                await task
+
+        asyncio.run(cancel_midway())
+        self.assertEqual(self.breaker.state, CircuitBreaker.OPEN)
+
+    def test_unexpected_error_counts_as_failure(self):
+        self.client.request.side_effect = httpx.DecodingError('bad body')
+        self.assertIsNone(asyncio.run(self.service.get_user_rewards('user-1')))
+        self.assertEqual(self.breaker.state, CircuitBreaker.OPEN)
+        with self.assertRaises(BitLabsUnavailable):
+            asyncio.run(self.service._request('GET', 'https://bitlabs.example/'))
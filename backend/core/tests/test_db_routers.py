@@ -0,0 +1,45 @@
+from unittest import mock
+
+from django.conf import settings
+from django.db import connections
+from django.test import SimpleTestCase, override_settings
+
+from core.db_routers import REPLICA_ALIAS, ReadReplicaRouter, replica_reads
+from core.models import VideoTask
+
+WITH_REPLICA = {**settings.DATABASES, REPLICA_ALIAS: {**settings.DATABASES['default'], 'TEST': {'MIRROR': 'default'}}}
+
+
+class ReadReplicaRouterTests(SimpleTestCase):
+    router = ReadReplicaRouter()
+
+    def test_reads_use_default_without_replica(self):
+        with replica_reads():
+            self.assertIsNone(self.router.db_for_read(VideoTask))
+
+    @override_settings(DATABASES=WITH_REPLICA)
+    def test_replica_only_inside_replica_reads(self):
+        self.assertIsNone(self.router.db_for_read(VideoTask))
+        with replica_reads():
+            self.assertEqual(self.router.db_for_read(VideoTask), REPLICA_ALIAS)
+        self.assertIsNone(self.router.db_for_read(VideoTask))
+
+    @override_settings(DATABASES=WITH_REPLICA)
+    def test_transactions_read_their_own_writes(self):
+        with replica_reads(), mock.patch.object(connections['default'], 'in_atomic_block', True):
+            self.assertIsNone(self.router.db_for_read(VideoTask))
+
+    @override_settings(DATABASES=WITH_REPLICA)
+    def test_decorated_view(self):
+        @replica_reads()
+        def view():
+            return self.router.db_for_read(VideoTask)
+
+        self.assertEqual(view(), REPLICA_ALIAS)
+        self.assertIsNone(self.router.db_for_read(VideoTask))
+
+    def test_writes_and_migrations_stay_on_default(self):
+        with replica_reads():
+            self.assertEqual(self.router.db_for_write(VideoTask), 'default')
+        self.assertFalse(self.router.allow_migrate(REPLICA_ALIAS, 'core'))
+        self.assertTrue(self.router.allow_migrate('default', 'core'))
@@ -0,0 +1,93 @@
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from core.models import VideoTask, VideoWatchSession
+from core.services import heartbeat_buffer
+from core.services.heartbeat_buffer import HeartbeatBuffer
+
+
+class HeartbeatBufferTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='watcher', password='pw')
+        cls.videos = [
+            VideoTask.objects.create(title=f'video {n}', youtube_url=f'https://youtu.be/{n}') for n in range(2)
+        ]
+
+    def setUp(self):
+        self.sessions = [VideoWatchSession.objects.create(user=self.user, video=video) for video in self.videos]
+        self.buffer = HeartbeatBuffer(max_pending=3)
+        self.buffer._ensure_started = lambda: None  # flushed explicitly below
+
+    def record(self, session, watch_duration, percent_viewed):
+        self.buffer.record(session.id, self.user.id, watch_duration, percent_viewed)
+
+    def test_heartbeats_cost_no_queries_until_the_flush(self):
+        session = self.sessions[0]
+        with self.assertNumQueries(0):
+            for beat in range(1, 11):
+                self.record(session, beat * 10, beat * 9.5)
+        session.refresh_from_db()
+        self.assertEqual(session.watch_duration, 0)
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(self.buffer.flush(), 1)
+        # one UPDATE for all ten heartbeats
+        self.assertEqual([q['sql'].split()[0] for q in queries if 'SAVEPOINT' not in q['sql']], ['UPDATE'])
+        session.refresh_from_db()
+        self.assertEqual((session.watch_duration, session.percent_viewed), (100, 95.0))
+
+    def test_coalesces_to_the_highest_progress(self):
+        session = self.sessions[0]
+        self.record(session, 30, 40.0)
+        self.record(session, 20, 55.0)
+        self.record(session, None, None)
+        self.buffer.flush()
+        session.refresh_from_db()
+        self.assertEqual((session.watch_duration, session.percent_viewed), (30, 55.0))
+
+    def test_flush_never_lowers_progress(self):
+        session = self.sessions[0]
+        VideoWatchSession.objects.filter(id=session.id).update(watch_duration=100, percent_viewed=90.0)
+        self.record(session, 50, 10.0)
+        self.buffer.flush()
+        session.refresh_from_db()
+        self.assertEqual((session.watch_duration, session.percent_viewed), (100, 90.0))
+
+    def test_failed_flush_keeps_progress(self):
+        session = self.sessions[0]
+        self.record(session, 30, None)
+        with mock.patch.object(VideoWatchSession.objects, 'filter', side_effect=RuntimeError('db down')):
+            with self.assertRaises(RuntimeError):
+                self.buffer.flush()
+        self.record(session, 20, None)
+        self.assertEqual(self.buffer.flush(), 1)
+        session.refresh_from_db()
+        self.assertEqual(session.watch_duration, 30)
+
+    def test_flush_selected_sessions(self):
+        first, second = self.sessions
+        self.record(first, 10, None)
+        self.record(second, 20, None)
+        self.assertEqual(self.buffer.flush([first.id]), 1)
+        second.refresh_from_db()
+        self.assertEqual(second.watch_duration, 0)
+        self.assertEqual(self.buffer.flush(), 1)
+
+    def test_complete_applies_buffered_heartbeats(self):
+        session = self.sessions[0]
+        client = APIClient()
+        client.force_authenticate(self.user)
+        with self.settings(HEARTBEAT_BUFFER={'ENABLED': True}), \
+                mock.patch.object(heartbeat_buffer, '_heartbeat_buffer', self.buffer):
+            response = client.put(reverse('update-watch-progress', args=[session.id]),
+                                  {'watch_duration': 42, 'percent_viewed': 97.5}, format='json')
+            self.assertEqual(response.status_code, 200)
+            client.post(reverse('complete-video-session', args=[session.id]))
+        session.refresh_from_db()
+        self.assertEqual((session.watch_duration, session.percent_viewed, session.completed), (42, 97.5, True))
@@ -0,0 +1,126 @@
+import os
+import tempfile
+import threading
+from datetime import timedelta
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.test import SimpleTestCase, TestCase
+from django.utils import timezone
+
+from core.models import Reward
+from core.services import leaderboard as leaderboard_module
+from core.services.leaderboard import Leaderboard
+from core.utils.user_points import bulk_create_rewards
+
+
+class LeaderboardRebuildTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create(username='earner')
+        Reward.objects.create(user=cls.user, points=10)
+
+    def test_credits_recorded_during_a_rebuild_are_kept(self):
+        leaderboard = Leaderboard()
+        read_points = leaderboard._points_from_db
+        credited = []
+
+        def read_then_credit(start):
+            scores = read_points(start)
+            if not credited:
+                # committed by another request after the first board was read
+                Reward.objects.create(user=self.user, points=7)
+                leaderboard.record('points', self.user.id, 7)
+                credited.append(7)
+            return scores
+
+        with mock.patch.object(leaderboard, '_points_from_db', side_effect=read_then_credit):
+            leaderboard.rebuild()
+        for window in ('daily', 'weekly', 'all'):
+            self.assertEqual(leaderboard.rank('points', window, self.user.id), (1, 17))
+
+    def test_credits_from_before_a_rebuild_are_not_counted_twice(self):
+        leaderboard = Leaderboard()
+        leaderboard.record('points', self.user.id, 10)
+        leaderboard.rebuild()
+        self.assertEqual(leaderboard.rank('points', 'all', self.user.id), (1, 10))
+
+
+class LeaderboardCreditPeriodTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create(username='earner')
+        cls.old = Reward.objects.create(user=cls.user, points=50, created_at=timezone.now() - timedelta(days=30))
+        Reward.objects.create(user=cls.user, points=10)
+
+    def setUp(self):
+        self.leaderboard = Leaderboard()
+        self.leaderboard.rebuild()
+        self.enterContext(mock.patch.object(leaderboard_module, '_leaderboard', self.leaderboard))
+
+    def scores(self):
+        return {window: self.leaderboard.rank('points', window, self.user.id) for window in ('daily', 'weekly', 'all')}
+
+    def test_deleting_an_old_reward_leaves_todays_board_alone(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.old.delete()
+        self.assertEqual(self.scores(), {'daily': (1, 10), 'weekly': (1, 10), 'all': (1, 10)})
+
+    def test_editing_an_old_reward_leaves_todays_board_alone(self):
+        self.old.points = 20
+        with self.captureOnCommitCallbacks(execute=True):
+            self.old.save()
+        self.assertEqual(self.scores(), {'daily': (1, 10), 'weekly': (1, 10), 'all': (1, 30)})
+
+    def test_bulk_credits_follow_each_rewards_date(self):
+        backdated = timezone.now() - timedelta(days=30)
+        with self.captureOnCommitCallbacks(execute=True):
+            bulk_create_rewards([Reward(user=self.user, points=5), Reward(user=self.user, points=7, created_at=backdated)])
+        self.assertEqual(self.scores(), {'daily': (1, 15), 'weekly': (1, 15), 'all': (1, 72)})
+
+
+class LeaderboardStartupTests(SimpleTestCase):
+
+    def setUp(self):
+        self.directory = self.enterContext(tempfile.TemporaryDirectory())
+        self.store_path = os.path.join(self.directory, 'leaderboard.snapshot')
+
+    def test_first_build_runs_in_the_background(self):
+        leaderboard = Leaderboard(store_path=self.store_path, snapshot_interval=0.01)
+        release, built = threading.Event(), threading.Event()
+
+        def rebuild():
+            release.wait(5)
+            leaderboard._loaded = True
+            built.set()
+
+        with mock.patch.object(leaderboard, 'rebuild', side_effect=rebuild):
+            leaderboard.ensure_loaded()
+            self.assertFalse(leaderboard.loaded)
+            release.set()
+            self.assertTrue(built.wait(5))
+        leaderboard.stop()
+        self.assertTrue(leaderboard.loaded)
+
+    def test_concurrent_saves_do_not_share_a_temporary_file(self):
+        workers = [Leaderboard(store_path=self.store_path) for _ in range(4)]
+        errors = []
+
+        def save(leaderboard):
+            for member in range(50):
+                leaderboard.record('points', member + 1, 1)
+                if not leaderboard.save():
+                    errors.append(member)
+
+        threads = [threading.Thread(target=save, args=(leaderboard,)) for leaderboard in workers]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(errors, [])
+        self.assertEqual(os.listdir(self.directory), ['leaderboard.snapshot'])
+        restored = Leaderboard(store_path=self.store_path)
+        self.assertTrue(restored.load())
+        self.assertEqual(restored.top('points', 'all', 0, 0)[1], 50)
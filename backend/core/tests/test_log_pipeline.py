@@ -0,0 +1,34 @@
+import logging
+from unittest import mock
+
+from django.test import SimpleTestCase
+
+from core.utils.log_pipeline import RateLimitFilter
+
+
+def make_record(level, lineno=10):
+    return logging.LogRecord('core.services.bitlabs_callbacks', level, __file__, lineno, 'credited', None, None)
+
+
+class RateLimitFilterTests(SimpleTestCase):
+
+    def test_configured_filter_passes_info_under_load(self):
+        filters = [f for handler in logging.getLogger().handlers for f in handler.filters
+                   if isinstance(f, RateLimitFilter)]
+        self.assertTrue(filters)
+        record = make_record(logging.INFO)
+        with mock.patch('core.utils.log_pipeline.time') as clock:
+            clock.monotonic.return_value = 100.0
+            for rate_limit in filters:
+                passed = sum(rate_limit.filter(record) for _ in range(rate_limit.burst * 10))
+                self.assertEqual(passed, rate_limit.burst * 10)
+
+    def test_debug_lines_are_limited_per_call_site(self):
+        rate_limit = RateLimitFilter(rate=1, burst=5)
+        with mock.patch('core.utils.log_pipeline.time') as clock:
+            clock.monotonic.return_value = 100.0
+            self.assertEqual(sum(rate_limit.filter(make_record(logging.DEBUG)) for _ in range(50)), 5)
+            self.assertTrue(rate_limit.filter(make_record(logging.DEBUG, lineno=20)))
+            clock.monotonic.return_value = 102.0
+            self.assertEqual(sum(rate_limit.filter(make_record(logging.DEBUG)) for _ in range(50)), 2)
+        self.assertEqual(rate_limit.suppressed, 93)
@@ -0,0 +1,48 @@
+import random
+
+from django.test import SimpleTestCase, override_settings
+from django.urls import reverse
+
+from core.services.metrics import Histogram
+
+
+class HistogramTests(SimpleTestCase):
+    def test_small_values_are_exact(self):
+        histogram = Histogram()
+        for value in range(1, 51):
+            histogram.record(value)
+        self.assertEqual(histogram.percentile(50), 25)
+        self.assertEqual(histogram.percentile(100), 50)
+
+    def test_percentiles_within_relative_error(self):
+        rng = random.Random(7)
+        values = sorted(rng.randint(0, 5_000_000) for _ in range(5000))
+        histogram = Histogram()
+        for value in values:
+            histogram.record(value)
+        for pct in (50, 90, 99):
+            exact = values[round(pct / 100 * len(values)) - 1]
+            self.assertLessEqual(abs(histogram.percentile(pct) - exact), exact / 2 ** histogram.sub_bucket_bits)
+        self.assertEqual(histogram.percentile(100), values[-1])
+
+
+@override_settings(METRICS={'ENABLED': True, 'TOKEN': '', 'ALLOWED_IPS': ['127.0.0.1']})
+class MetricsViewTests(SimpleTestCase):
+
+    def scrape(self, **extra):
+        return self.client.get(reverse('metrics'), **extra)
+
+    def test_local_scraper(self):
+        self.assertEqual(self.scrape().status_code, 200)
+        self.assertEqual(self.scrape(REMOTE_ADDR='10.0.0.5').status_code, 404)
+
+    def test_proxied_requests_are_not_local(self):
+        self.assertEqual(self.scrape(HTTP_X_FORWARDED_FOR='203.0.113.9').status_code, 404)
+        self.assertEqual(self.scrape(HTTP_X_REAL_IP='203.0.113.9').status_code, 404)
+
+    @override_settings(METRICS={'ENABLED': True, 'TOKEN': 's3cret', 'ALLOWED_IPS': ['127.0.0.1']})
+    def test_token_required_when_set(self):
+        self.assertEqual(self.scrape().status_code, 404)
+        self.assertEqual(self.scrape(HTTP_AUTHORIZATION='Bearer wrong').status_code, 404)
+        response = self.scrape(HTTP_AUTHORIZATION='Bearer s3cret', HTTP_X_FORWARDED_FOR='203.0.113.9')
+        self.assertEqual(response.status_code, 200)
@@ -0,0 +1,177 @@
+from datetime import timedelta
+from io import StringIO
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.db import IntegrityError, connection, transaction
+from django.test import TestCase, TransactionTestCase
+from django.utils import timezone
+
+from core.models import (
+    PointsBalance, Reward, SurveyCompletion, SurveyTransaction, UserProfile, VideoTask, VideoWatchSession
+)
+from core.utils.user_points import backfill_points_balances, get_user_total_points, reward_totals
+
+
+class QueryPlanTests(TestCase):
+    """The queries the views run on every request must be served by an index"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='plan', password='plan')
+        cls.video = VideoTask.objects.create(title='plan', youtube_url='https://youtu.be/plan')
+        cls.profile = UserProfile.objects.create(user=cls.user, bitlabs_user_id='plan-user')
+
+    def setUp(self):
+        if connection.vendor == 'postgresql':
+            # tiny test tables would otherwise always be read with a sequential scan
+            with connection.cursor() as cursor:
+                cursor.execute('SET LOCAL enable_seqscan = off')
+
+    def assertUsesIndex(self, queryset, index_name):
+        plan = queryset.explain()
+        self.assertIn(index_name, plan, f"expected {index_name} in plan:\n{plan}")
+        # sqlite sorts the result itself when the index can't provide the order
+        self.assertNotIn('TEMP B-TREE', plan, f"expected no sort step in plan:\n{plan}")
+
+    def test_open_session_lookup(self):
+        queryset = VideoWatchSession.objects.filter(user=self.user, video=self.video, completed=False)
+        plan = queryset.explain()
+        # either index answers this lookup; the planner picks one
+        self.assertTrue(
+            'watch_session_user_video_idx' in plan or 'watch_session_one_open_per_video' in plan,
+            f"expected a watch session index in plan:\n{plan}",
+        )
+
+    def test_dashboard_recent_completions(self):
+        queryset = SurveyCompletion.objects.filter(user_profile=self.profile).order_by('-started_at')[:10]
+        self.assertUsesIndex(queryset, 'survey_completion_recent_idx')
+
+    def test_dashboard_recent_transactions(self):
+        queryset = SurveyTransaction.objects.filter(user_profile=self.profile).order_by('-created_at')[:10]
+        self.assertUsesIndex(queryset, 'survey_transaction_recent_idx')
+
+    def test_rewards_by_user_and_time(self):
+        since = timezone.now() - timedelta(days=7)
+        queryset = Reward.objects.filter(user=self.user, created_at__gte=since).order_by('created_at')
+        self.assertUsesIndex(queryset, 'reward_user_created_idx')
+
+    def test_callback_completion_lookup(self):
+        plan = SurveyCompletion.objects.filter(user_profile=self.profile, click_id='click').explain()
+        if connection.vendor == 'sqlite':
+            self.assertIn('(click_id=?)', plan)
+        else:
+            self.assertRegex(plan, r'Index (Only )?Scan')
+
+    def test_catalogue_page(self):
+        self.assertUsesIndex(VideoTask.objects.order_by('-created_at', '-id')[:20], 'videotask_created_idx')
+
+
+class WatchSessionConstraintTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='viewer', password='viewer')
+        cls.video = VideoTask.objects.create(title='video', youtube_url='https://youtu.be/video')
+
+    def test_one_open_session_per_user_and_video(self):
+        VideoWatchSession.objects.create(user=self.user, video=self.video)
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            VideoWatchSession.objects.create(user=self.user, video=self.video)
+
+    def test_completed_sessions_do_not_count(self):
+        VideoWatchSession.objects.create(user=self.user, video=self.video, completed=True)
+        VideoWatchSession.objects.create(user=self.user, video=self.video, completed=True)
+        VideoWatchSession.objects.create(user=self.user, video=self.video)
+        self.assertEqual(VideoWatchSession.objects.filter(user=self.user, video=self.video).count(), 3)
+
+    def test_start_returns_the_open_session(self):
+        session, created = VideoWatchSession.objects.start(self.user, self.video.id)
+        again, created_again = VideoWatchSession.objects.start(self.user, self.video.id)
+        self.assertTrue(created)
+        self.assertFalse(created_again)
+        self.assertEqual(again.id, session.id)
+
+    def test_start_replays_idempotency_key(self):
+        session, _ = VideoWatchSession.objects.start(self.user, self.video.id, idempotency_key='play-1')
+        VideoWatchSession.objects.filter(id=session.id).update(completed=True)
+        replayed, created = VideoWatchSession.objects.start(self.user, self.video.id, idempotency_key='play-1')
+        self.assertFalse(created)
+        self.assertEqual(replayed.id, session.id)
+        fresh, created = VideoWatchSession.objects.start(self.user, self.video.id, idempotency_key='play-2')
+        self.assertTrue(created)
+        self.assertNotEqual(fresh.id, session.id)
+
+
+class WatchSessionStartQueryTests(TransactionTestCase):
+    """Outside a transaction, as in the views, start() lets the constraints do the lookups"""
+
+    def setUp(self):
+        self.user = User.objects.create(username='viewer')
+        self.video = VideoTask.objects.create(title='video', youtube_url='https://youtu.be/video')
+
+    def test_new_start_is_one_insert(self):
+        with self.assertNumQueries(1):
+            _, created = VideoWatchSession.objects.start(self.user, self.video.id)
+        self.assertTrue(created)
+        with self.assertNumQueries(2):
+            _, created = VideoWatchSession.objects.start(self.user, self.video.id)
+        self.assertFalse(created)
+
+    def test_unknown_video(self):
+        with self.assertRaises(VideoTask.DoesNotExist):
+            VideoWatchSession.objects.start(self.user, self.video.id + 1)
+        self.assertFalse(VideoWatchSession.objects.exists())
+
+
+class PointsBalanceTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.alice = User.objects.create_user(username='alice', password='alice')
+        cls.bob = User.objects.create_user(username='bob', password='bob')
+
+    def test_balance_follows_reward_changes(self):
+        reward = Reward.objects.create(user=self.alice, points=10)
+        reward.points = 25
+        reward.save()
+        self.assertEqual(get_user_total_points(self.alice.id), 25)
+        reward.delete()
+        self.assertEqual(get_user_total_points(self.alice.id), 0)
+
+    def test_reassigned_reward_moves_its_points(self):
+        Reward.objects.create(user=self.alice, points=5)
+        reward = Reward.objects.create(user=self.alice, points=10)
+        reward.user = self.bob
+        reward.points = 12
+        reward.save()
+        self.assertEqual(get_user_total_points(self.alice.id), 5)
+        self.assertEqual(get_user_total_points(self.bob.id), 12)
+
+    def test_backfill_creates_missing_balances_only(self):
+        Reward.objects.create(user=self.alice, points=10)
+        Reward.objects.create(user=self.bob, points=7)
+        Reward.objects.create(user=self.bob, points=3)
+        PointsBalance.objects.filter(user=self.bob).delete()
+        PointsBalance.objects.filter(user=self.alice).update(total_points=99)
+
+        self.assertEqual(backfill_points_balances(), 1)
+        self.assertEqual(get_user_total_points(self.bob.id), 10)
+        # existing balances are reconcile_points' job
+        self.assertEqual(get_user_total_points(self.alice.id), 99)
+        self.assertEqual(backfill_points_balances(), 0)
+
+    def test_reconcile_keeps_credits_made_while_it_runs(self):
+        Reward.objects.create(user=self.alice, points=10)
+        PointsBalance.objects.filter(user=self.alice).update(total_points=99)
+
+        def totals_then_credit(*args, **kwargs):
+            totals = reward_totals(*args, **kwargs)
+            # a reward earned between the check and the fix
+            Reward.objects.create(user=self.alice, points=5)
+            return totals
+
+        with mock.patch('core.management.commands.reconcile_points.reward_totals', side_effect=totals_then_credit):
+            call_command('reconcile_points', '--fix', stdout=StringIO())
+        self.assertEqual(get_user_total_points(self.alice.id), 15)
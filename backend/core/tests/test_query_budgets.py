@@ -0,0 +1,278 @@
+"""
+Per-endpoint query budgets against realistic data volumes.
+
+The budgets are exact: an endpoint that starts running one more query, or
+the same query once per row, fails here. When a change legitimately needs
+another query, raise the budget in the same commit and say why.
+"""
+
+import json
+from unittest import mock
+
+from django.conf import settings
+from django.test import override_settings
+from django.urls import reverse
+
+from core.models import QuizQuestion, SurveyCompletion, VideoTask, VideoWatchSession
+from core.services import bitlabs_service, survey_cache
+from core.services.bitlabs_service import BitLabsService
+from core.tests.bitlabs_stub import BitLabsStubServer, sign_callback
+from core.tests.budgets import QueryBudgetTestCase
+from core.tests.factories import seed_catalogue, seed_placements, seed_user, seed_watch_sessions
+from core.utils.answer_matching import answer_key_sets
+
+VIDEOS = 2000
+QUESTIONS_PER_VIDEO = 5
+
+
+class QueryBudgetAssertionTests(QueryBudgetTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        seed_catalogue(videos=10, questions_per_video=2)
+
+    def test_over_budget_fails(self):
+        with self.assertRaisesMessage(AssertionError, '2 queries, budget is 1'):
+            with self.assertQueryBudget(1):
+                VideoTask.objects.count()
+                QuizQuestion.objects.count()
+
+    def test_n_plus_one_fails(self):
+        with self.assertRaisesMessage(AssertionError, 'statement repeated 9 times'):
+            with self.assertQueryBudget(20):
+                for video in VideoTask.objects.all()[:9]:
+                    list(video.questions.all())
+
+
+class VideoCatalogueBudgetTests(QueryBudgetTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        seed_catalogue(VIDEOS, QUESTIONS_PER_VIDEO)
+        cls.user = seed_user('viewer', rewards=0, surveys=0, transactions=0)
+        cls.video = VideoTask.objects.order_by('-created_at', '-id').first()
+
+    def setUp(self):
+        super().setUp()
+        self.client.force_authenticate(self.user)
+
+    def list_page(self, **params):
+        return self.client.get(reverse('video-tasks-list'), params)
+
+    @override_settings(VIDEO_CATALOGUE_CACHE={'ENABLED': False})
+    def test_list(self):
+        with self.assertQueryBudget(1):
+            response = self.list_page()
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.data['results']), 20)
+        self.assertEqual(response.data['results'][0]['question_count'], QUESTIONS_PER_VIDEO)
+
+    @override_settings(VIDEO_CATALOGUE_CACHE={'ENABLED': False})
+    def test_list_deep_page(self):
+        response = self.list_page(page_size=100)
+        for _ in range(5):
+            response = self.client.get(response.data['next'])
+        with self.assertQueryBudget(1):
+            response = self.client.get(response.data['next'])
+        self.assertEqual(len(response.data['results']), 100)
+
+    @override_settings(VIDEO_CATALOGUE_CACHE={'ENABLED': False})
+    def test_list_does_not_grow_with_page_size(self):
+        self.assertConstantQueries(lambda size: self.list_page(page_size=size), [1, 20, 100])
+
+    def test_list_from_cache(self):
+        self.list_page()
+        with self.assertQueryBudget(0):
+            response = self.list_page()
+        self.assertEqual(response.status_code, 200)
+
+    @override_settings(VIDEO_CATALOGUE_CACHE={'ENABLED': False})
+    def test_detail(self):
+        with self.assertQueryBudget(2):
+            response = self.client.get(reverse('video-tasks-detail', args=[self.video.id]))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.data['questions']), QUESTIONS_PER_VIDEO)
+
+    def test_detail_from_cache(self):
+        url = reverse('video-tasks-detail', args=[self.video.id])
+        self.client.get(url)
+        with self.assertQueryBudget(0):
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+
+
+class VideoSessionBudgetTests(QueryBudgetTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        seed_catalogue(VIDEOS, QUESTIONS_PER_VIDEO)
+        cls.user = seed_user('viewer')
+        videos = list(VideoTask.objects.order_by('id'))
+        # a long watch history on other videos
+        seed_watch_sessions(cls.user, videos[1:501])
+        cls.video = videos[0]
+        cls.questions = list(QuizQuestion.objects.filter(video=cls.video))
+
+    def setUp(self):
+        super().setUp()
+        self.client.force_authenticate(self.user)
+        self.session = VideoWatchSession.objects.create(user=self.user, video=self.video)
+
+    def test_update_watch_progress(self):
+        url = reverse('update-watch-progress', args=[self.session.id])
+        with self.assertQueryBudget(1):
+            response = self.client.put(url, {'watch_duration': 42, 'percent_viewed': 55.5}, format='json')
+        self.assertEqual(response.status_code, 200)
+
+    def submit_quiz(self, budget):
+        responses = [
+            {'question': q.id, 'user_answer': q.correct_answer if n % 2 else 'wrong'}
+            for n, q in enumerate(self.questions)
+        ]
+        with self.assertQueryBudget(budget):
+            response = self.client.post(
+                reverse('submit-quiz-responses'),
+                {'session_id': self.session.id, 'responses': responses},
+                format='json',
+            )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['total_questions'], QUESTIONS_PER_VIDEO)
+        self.assertEqual(response.data['correct_answers'], QUESTIONS_PER_VIDEO // 2)
+
+    def test_submit_quiz_responses(self):
+        for question in QuizQuestion.objects.for_grading([q.id for q in self.questions]).values():
+            question.answer_key_set
+        self.submit_quiz(6)
+
+    def test_submit_quiz_responses_with_cold_answer_keys(self):
+        # the first grading in a process loads every question's keys in one more query
+        answer_key_sets.clear()
+        self.submit_quiz(7)
+
+
+class DashboardAndPlacementBudgetTests(QueryBudgetTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        seed_placements()
+        cls.user = seed_user('earner')
+        for n in range(20):
+            seed_user(f'other{n}', rewards=200, surveys=50, transactions=100, seed=n)
+
+    def setUp(self):
+        super().setUp()
+        self.client.force_authenticate(self.user)
+
+    def test_dashboard(self):
+        with self.assertQueryBudget(3):
+            response = self.client.get(reverse('user_dashboard'))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.data['recent_completions']), 10)
+        self.assertEqual(len(response.data['recent_transactions']), 10)
+
+    def test_dashboard_from_cache(self):
+        self.client.get(reverse('user_dashboard'))
+        with self.assertQueryBudget(0):
+            response = self.client.get(reverse('user_dashboard'))
+        self.assertEqual(response.status_code, 200)
+
+    def test_placements(self):
+        with self.assertQueryBudget(1):
+            response = self.client.get(reverse('ad-placements'))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(json.loads(response.content)), 3)
+
+    def test_placements_from_cache(self):
+        etag = self.client.get(reverse('ad-placements'))['ETag']
+        with self.assertQueryBudget(0):
+            response = self.client.get(reverse('ad-placements'))
+            not_modified = self.client.get(reverse('ad-placements'), HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(not_modified.status_code, 304)
+
+
+class BitLabsBudgetTests(QueryBudgetTestCase):
+    """Survey endpoints and callbacks, with BitLabs replaced by a local stub server"""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.stub = BitLabsStubServer().start()
+        cls.addClassCleanup(cls.stub.stop)
+        config = {**settings.BITLABS_CONFIG, 'BASE_URL': cls.stub.url, 'MAX_RETRIES': 0}
+        cls.enterClassContext(override_settings(BITLABS_CONFIG=config))
+        cls.enterClassContext(mock.patch.object(bitlabs_service, '_bitlabs_service', BitLabsService(config)))
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = seed_user('surveyor')
+        cls.profile = cls.user.userprofile
+
+    def setUp(self):
+        super().setUp()
+        # a fresh feed cache per test, so each one starts with a BitLabs fetch
+        self.enterContext(mock.patch.object(survey_cache, '_survey_cache', None))
+        self.stub.reset_calls()
+        self.client.force_authenticate(self.user)
+
+    def assertUpstreamCalls(self, expected):
+        self.assertEqual(sum(self.stub.calls.values()), expected, dict(self.stub.calls))
+
+    def post_callback(self, payload):
+        body, signature = sign_callback(payload, settings.BITLABS_CONFIG['S2S_SECRET'])
+        return self.client.generic(
+            'POST', reverse('bitlabs_callback'), body,
+            content_type='application/json', HTTP_X_BITLABS_SIGNATURE=signature,
+        )
+
+    def test_get_surveys(self):
+        with self.assertQueryBudget(1):
+            response = self.client.get(reverse('get_surveys'))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.data['surveys']), len(self.stub.surveys))
+        self.assertUpstreamCalls(1)
+
+    def test_get_surveys_from_feed_cache(self):
+        self.client.get(reverse('get_surveys'))
+        self.stub.reset_calls()
+        with self.assertQueryBudget(1):
+            response = self.client.get(reverse('get_surveys'))
+        self.assertEqual(response.status_code, 200)
+        self.assertUpstreamCalls(0)
+
+    def test_start_survey(self):
+        with self.assertQueryBudget(3):
+            response = self.client.post(reverse('start_survey'), {'survey_id': 's1'}, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertUpstreamCalls(1)
+
+    def test_callback_completed(self):
+        SurveyCompletion.objects.create(user_profile=self.profile, survey_id='s1', click_id='click-1')
+        payload = {'type': 'survey_completed', 'uid': self.profile.bitlabs_user_id,
+                   'survey_id': 's1', 'click_id': 'click-1', 'reward': '1.25'}
+        with self.assertQueryBudget(6):
+            response = self.post_callback(payload)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(json.loads(response.content), {'status': 'success'})
+        self.assertUpstreamCalls(0)
+
+    def test_callback_replay(self):
+        SurveyCompletion.objects.create(user_profile=self.profile, survey_id='s1', click_id='click-1')
+        payload = {'type': 'survey_completed', 'uid': self.profile.bitlabs_user_id,
+                   'survey_id': 's1', 'click_id': 'click-1', 'reward': '1.25'}
+        self.post_callback(payload)
+        with self.assertQueryBudget(1):
+            response = self.post_callback(payload)
+        self.assertEqual(response.status_code, 200)
+
+    def test_callback_rejected(self):
+        SurveyCompletion.objects.create(user_profile=self.profile, survey_id='s2', click_id='click-2')
+        payload = {'type': 'survey_rejected', 'uid': self.profile.bitlabs_user_id,
+                   'survey_id': 's2', 'click_id': 'click-2'}
+        with self.assertQueryBudget(4):
+            response = self.post_callback(payload)
+        self.assertEqual(response.status_code, 200)
+
+    @override_settings(BITLABS_CONFIG={**settings.BITLABS_CONFIG, 'CALLBACK_MODE': 'queue'})
+    def test_callback_queued(self):
+        payload = {'type': 'survey_completed', 'uid': self.profile.bitlabs_user_id,
+                   'survey_id': 's3', 'click_id': 'click-3', 'reward': '0.75'}
+        with self.assertQueryBudget(1):
+            response = self.post_callback(payload)
+        self.assertEqual(json.loads(response.content), {'status': 'queued'})
@@ -0,0 +1,36 @@
+import random
+
+from django.test import SimpleTestCase
+
+from core.utils.ranked_scores import RankedScores
+
+
+class RankedScoresTests(SimpleTestCase):
+
+    def test_matches_a_full_sort(self):
+        rng = random.Random(7)
+        # a small bucket size so splits and bucket removal are exercised
+        ranked, expected = RankedScores(load=4), {}
+        for step in range(3000):
+            member = rng.randint(1, 150)
+            if rng.random() < 0.1:
+                ranked.discard(member)
+                expected.pop(member, None)
+            else:
+                delta = rng.randint(-20, 50)
+                ranked.add(member, delta)
+                expected[member] = expected.get(member, 0) + delta
+            if step % 300 == 0:
+                order = sorted(expected.items(), key=lambda item: (-item[1], item[0]))
+                rows = [(rank, member, score) for rank, (member, score) in enumerate(order, 1)]
+                self.assertEqual(ranked.page(0, len(rows) + 1), rows)
+                self.assertEqual(ranked.page(17, 5), rows[17:22])
+                for rank, member, _ in rows:
+                    self.assertEqual(ranked.rank(member), rank)
+
+    def test_round_trips_through_arrays(self):
+        ranked = RankedScores()
+        ranked.load_scores([(1, 5), (2, 9), (3, 5), (4, -1)])
+        restored = RankedScores.from_arrays(*ranked.to_arrays())
+        self.assertEqual(restored.page(0, 10), [(1, 2, 9), (2, 1, 5), (3, 3, 5), (4, 4, -1)])
+        self.assertIsNone(restored.rank(5))
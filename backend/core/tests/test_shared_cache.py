@@ -0,0 +1,88 @@
+import time
+from unittest import mock
+
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+
+from core.models import AdPlacement, UserProfile
+from core.services.catalogue_cache import bump_catalogue_version, get_catalogue_version
+from core.services import dashboard_cache
+from core.services.dashboard_cache import get_dashboard, invalidate_dashboard
+from core.services.placement_cache import get_placements_payload, get_placements_version
+from core.tests.factories import seed_user
+from core.utils.shared_cache import bounded_timeout
+
+SHARED_CACHE = {'default': {'BACKEND': 'django.core.cache.backends.db.DatabaseCache', 'LOCATION': 'cache'}}
+
+
+@override_settings(PROCESS_LOCAL_CACHE_TTL=30)
+class ProcessLocalCacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+
+    def test_bounded_timeout(self):
+        self.assertEqual(bounded_timeout(None), 30)
+        self.assertEqual(bounded_timeout(600), 30)
+        self.assertEqual(bounded_timeout(10), 10)
+        with override_settings(CACHES=SHARED_CACHE):
+            self.assertIsNone(bounded_timeout(None))
+            self.assertEqual(bounded_timeout(600), 600)
+
+    def test_other_workers_pick_up_placement_changes(self):
+        AdPlacement.objects.create(placement_key='home', ad_unit_id='unit-1')
+        now = time.time()
+        with mock.patch('time.time', return_value=now):
+            version = get_placements_version()
+            before = get_placements_payload()
+            # a change made by another worker: its version bump never reaches this cache
+            with mock.patch('core.signals.bump_placements_version'):
+                AdPlacement.objects.filter(placement_key='home').update(ad_unit_id='unit-2')
+                AdPlacement.objects.create(placement_key='quiz', ad_unit_id='unit-3')
+            self.assertEqual(get_placements_payload(), before)
+        with mock.patch('time.time', return_value=now + 31):
+            self.assertNotEqual(get_placements_version(), version)
+            self.assertEqual(sorted(get_placements_payload()['data']), ['home', 'quiz'])
+
+    def test_catalogue_version_moves_on_in_other_workers(self):
+        now = time.time()
+        with mock.patch('time.time', return_value=now):
+            version = get_catalogue_version()
+            bump_catalogue_version()
+            self.assertEqual(get_catalogue_version(), version + 1)
+        # a worker that never saw the bump still gets a fresh version once the key expires
+        with mock.patch('time.time', return_value=now + 31):
+            self.assertNotIn(get_catalogue_version(), (version, version + 1))
+
+    def test_dashboard_credited_by_another_process(self):
+        user = seed_user('earner', rewards=3, surveys=2, transactions=2)
+        now = time.time()
+        with mock.patch('time.time', return_value=now):
+            before = get_dashboard(user)
+            # a credit applied by the callback queue worker: its invalidation stays in that process
+            UserProfile.objects.filter(user=user).update(available_balance=999)
+            self.assertEqual(get_dashboard(user), before)
+        with mock.patch('time.time', return_value=now + 31):
+            self.assertEqual(get_dashboard(user)['user_profile']['available_balance'], 999)
+
+
+class DashboardCacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+
+    def test_build_racing_a_credit_is_not_served(self):
+        user = seed_user('earner', rewards=3, surveys=2, transactions=2)
+        build = dashboard_cache.build_dashboard
+
+        def build_then_credit(user):
+            dashboard = build(user)
+            # committed by another request after this one read the profile
+            with self.captureOnCommitCallbacks(execute=True):
+                UserProfile.objects.filter(user=user).update(available_balance=999)
+                invalidate_dashboard(user.id)
+            return dashboard
+
+        with mock.patch.object(dashboard_cache, 'build_dashboard', side_effect=build_then_credit):
+            self.assertNotEqual(get_dashboard(user)['user_profile']['available_balance'], 999)
+        self.assertEqual(get_dashboard(user)['user_profile']['available_balance'], 999)
@@ -0,0 +1,74 @@
+import asyncio
+import threading
+from unittest import mock
+
+from django.test import SimpleTestCase
+
+from core.services.survey_cache import SurveyFeedCache
+
+
+def feed(version):
+    return {'data': {'surveys': [{'id': 's1', 'version': version}]}}
+
+
+class SurveyFeedCacheTests(SimpleTestCase):
+    def setUp(self):
+        # only the cache's clock: the event loop needs the real one
+        self.clock = self.enterContext(mock.patch('core.services.survey_cache.time')).monotonic
+        self.clock.return_value = 1000.0
+        self.calls = 0
+        self.release = threading.Event()
+        self.release.set()
+        self.fetched = threading.Event()
+        self.fetch_lock = threading.Lock()
+
+        def fetcher(user_id):
+            with self.fetch_lock:
+                self.calls += 1
+            self.release.wait(5)
+            self.fetched.set()
+            return feed(self.calls)
+
+        async def async_fetcher(user_id):
+            self.calls += 1
+            await asyncio.sleep(0.01)
+            return feed(self.calls)
+
+        self.cache = SurveyFeedCache(fetcher, async_fetcher, ttl=60, stale_ttl=240)
+
+    def test_concurrent_misses_share_one_fetch(self):
+        self.release.clear()
+        results = []
+        threads = [threading.Thread(target=lambda: results.append(self.cache.get_feed('u1'))) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        self.release.set()
+        for thread in threads:
+            thread.join(5)
+        self.assertEqual(self.calls, 1)
+        self.assertEqual(results, [feed(1)] * 8)
+
+    def test_stale_entry_served_while_refreshing(self):
+        self.assertEqual(self.cache.get_survey('u1', 's1')['version'], 1)
+        self.clock.return_value = 1000.0 + 61
+        self.fetched.clear()
+        # served from the stale entry; the refresh runs in the background
+        self.assertEqual(self.cache.get_survey('u1', 's1')['version'], 1)
+        self.assertTrue(self.fetched.wait(5))
+        for _ in range(100):
+            if self.cache.get_survey('u1', 's1')['version'] == 2:
+                break
+            threading.Event().wait(0.01)
+        self.assertEqual(self.cache.get_survey('u1', 's1')['version'], 2)
+
+    def test_expired_entry_is_fetched_synchronously(self):
+        self.cache.get_feed('u1')
+        self.clock.return_value = 1000.0 + 60 + 240
+        self.assertEqual(self.cache.get_feed('u1'), feed(2))
+
+    def test_async_misses_share_one_fetch(self):
+        async def misses():
+            return await asyncio.gather(*(self.cache.aget_feed('u1') for _ in range(8)))
+
+        self.assertEqual(asyncio.run(misses()), [feed(1)] * 8)
+        self.assertEqual(self.calls, 1)
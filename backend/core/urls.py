@@ -3,7 +3,8 @@ from rest_framework_simplejwt.views import TokenObtainPairView, TokenRefreshView
 from rest_framework.routers import DefaultRouter
 from .views import (
     VideoTaskViewSet, award_ad_points_view, get_placements_view, start_video_session, update_watch_progress,
-    complete_video_session, submit_quiz_responses, get_surveys, start_survey, user_dashboard, BitLabsCallbackView
+    complete_video_session, submit_quiz_responses, get_surveys, start_survey, user_dashboard, BitLabsCallbackView,
+    get_surveys_async, start_survey_async, get_user_rewards_async, leaderboard_view, metrics_view
 )
 
 router = DefaultRouter()
@@ -11,8 +12,8 @@ router.register(r'api/video-tasks', VideoTaskViewSet, basename='video-tasks')
 
 urlpatterns = [
     path('', include(router.urls)),
-    # path('api/token/', TokenObtainPairView.as_view(), name='token_obtain_pair'),
-    # path('api/token/refresh/', TokenRefreshView.as_view(), name='token_refresh'),
+    path('api/token/', TokenObtainPairView.as_view(), name='token_obtain_pair'),
+    path('api/token/refresh/', TokenRefreshView.as_view(), name='token_refresh'),
 
     # Youtube Video Integration
     path('api/start-video-session/', start_video_session, name='start-video-session'),
@@ -27,5 +28,12 @@ urlpatterns = [
     path('api/surveys/', get_surveys, name='get_surveys'),
     path('api/surveys/start/', start_survey, name='start_survey'),
     path('api/dashboard/', user_dashboard, name='user_dashboard'),
+    path('api/leaderboard/', leaderboard_view, name='leaderboard'),
     path('api/bitlabs/callback/', BitLabsCallbackView.as_view(), name='bitlabs_callback'),
+    # Async variants for ASGI deployments
+    path('api/async/surveys/', get_surveys_async, name='get_surveys_async'),
+    path('api/async/surveys/start/', start_survey_async, name='start_survey_async'),
+    path('api/async/rewards/', get_user_rewards_async, name='get_user_rewards_async'),
+    # Prometheus scrape endpoint (local addresses only)
+    path('metrics/', metrics_view, name='metrics'),
 ]
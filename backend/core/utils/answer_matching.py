@@ -0,0 +1,134 @@
+import re
+import threading
+from collections import OrderedDict
+from typing import Callable, Dict, FrozenSet, Iterable, List, Optional, Tuple
+
+_PUNCTUATION = re.compile(r'[^\w\s]')
+_WHITESPACE = re.compile(r'\s+')
+
+
+def normalize_answer(text: str) -> str:
+    """Case-insensitive, trimmed form of an answer (the original grading rule)"""
+    return text.strip().lower()
+
+
+def fold_answer(text: str) -> str:
+    """Normalize an answer and fold away punctuation and repeated whitespace"""
+    text = _PUNCTUATION.sub(' ', text.casefold())
+    return _WHITESPACE.sub(' ', text).strip()
+
+
+def within_edit_distance(a: str, b: str, max_distance: int) -> bool:
+    """Levenshtein distance check that gives up as soon as max_distance is exceeded"""
+    if abs(len(a) - len(b)) > max_distance:
+        return False
+    if len(a) > len(b):
+        a, b = b, a
+    previous = list(range(len(a) + 1))
+    for i, char_b in enumerate(b, start=1):
+        current = [i]
+        row_min = i
+        for j, char_a in enumerate(a, start=1):
+            cost = 0 if char_a == char_b else 1
+            value = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + cost)
+            current.append(value)
+            row_min = min(row_min, value)
+        if row_min > max_distance:
+            return False
+        previous = current
+    return previous[-1] <= max_distance
+
+
+class AnswerMatcher:
+    """
+    Grades an answer against precomputed answer keys.
+
+    ``normalize`` turns both stored answers and user input into keys, so an
+    exact hit is a single set lookup. With ``max_distance`` set, a miss falls
+    back to a bounded edit-distance scan over the keys; the allowed distance
+    also shrinks for short keys so very short answers must match exactly.
+    """
+
+    def __init__(self, normalize: Callable[[str], str], max_distance: int = 0):
+        self.normalize = normalize
+        self.max_distance = max_distance
+
+    def build_keys(self, answers: Iterable[str]) -> List[str]:
+        keys = []
+        seen = set()
+        for answer in answers:
+            key = self.normalize(answer or '')
+            if key and key not in seen:
+                seen.add(key)
+                keys.append(key)
+        return keys
+
+    def matches(self, keys: FrozenSet[str], answer: str) -> bool:
+        key = self.normalize(answer)
+        if key in keys:
+            return True
+        if self.max_distance:
+            for k in keys:
+                distance = min(self.max_distance, len(k) // 4)
+                if distance and within_edit_distance(key, k, distance):
+                    return True
+        return False
+
+
+MATCHERS: Dict[str, AnswerMatcher] = {}
+
+
+def register_matcher(name: str, matcher: AnswerMatcher) -> None:
+    MATCHERS[name] = matcher
+
+
+def get_matcher(name: str) -> AnswerMatcher:
+    try:
+        return MATCHERS[name]
+    except KeyError:
+        raise ValueError(f"Unknown answer matcher: {name}")
+
+
+def matcher_choices() -> List[Tuple[str, str]]:
+    """Model field choices for the registered matchers"""
+    return [(name, name) for name in sorted(MATCHERS)]
+
+
+class AnswerKeySetCache:
+    """
+    Process-wide LRU of answer key sets by the token a question gets each
+    time its keys are rebuilt, so grading a freshly loaded question doesn't
+    rebuild a set whose size grows with its accepted alternatives. A new
+    token on every rebuild means entries never need invalidating.
+    """
+
+    def __init__(self, max_entries: int = 10000):
+        self.max_entries = max_entries
+        self._entries: 'OrderedDict[str, FrozenSet[str]]' = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, token: str) -> Optional[FrozenSet[str]]:
+        with self._lock:
+            keys = self._entries.get(token)
+            if keys is not None:
+                self._entries.move_to_end(token)
+            return keys
+
+    def set(self, token: str, keys: FrozenSet[str]) -> None:
+        with self._lock:
+            self._entries[token] = keys
+            self._entries.move_to_end(token)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+
+answer_key_sets = AnswerKeySetCache()
+
+
+register_matcher('exact', AnswerMatcher(normalize_answer))
+register_matcher('folded', AnswerMatcher(fold_answer))
+register_matcher('fuzzy', AnswerMatcher(fold_answer, max_distance=2))
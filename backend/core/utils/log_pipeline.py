@@ -0,0 +1,183 @@
+"""
+Non-blocking logging pieces wired up in settings.LOGGING.
+
+Request threads only format the message and put the record on a bounded
+queue (BoundedQueueHandler); a QueueListener thread does the JSON formatting
+and the file I/O. Nothing here may import Django models: it is loaded while
+settings are being configured.
+"""
+
+import atexit
+import json
+import logging
+import os
+import queue
+import threading
+import time
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener
+from typing import Dict, Tuple
+
+# attributes every LogRecord has; anything else came in through extra={...}
+_RECORD_ATTRS = frozenset(vars(logging.LogRecord('', 0, '', 0, '', (), None))) | {'message', 'asctime', 'taskName'}
+
+
+class JsonFormatter(logging.Formatter):
+    """One compact JSON object per line: ts, level, logger, msg, any extra fields and exc"""
+
+    def format(self, record):
+        entry = {
+            'ts': datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec='milliseconds'),
+            'level': record.levelname,
+            'logger': record.name,
+            'msg': record.getMessage(),
+        }
+        for key, value in vars(record).items():
+            if key not in _RECORD_ATTRS and not key.startswith('_'):
+                entry[key] = value
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            entry['exc'] = record.exc_text
+        if record.stack_info:
+            entry['stack'] = record.stack_info
+        return json.dumps(entry, separators=(',', ':'), default=str)
+
+
+class RateLimitFilter(logging.Filter):
+    """
+    Token bucket per log call site (file + line) for records at or below
+    ``max_level``, so a debug line inside a hot request path can't flood the
+    queue. Records above ``max_level`` always pass; INFO stays above it by
+    default because credits and payouts are audited at INFO.
+    """
+
+    def __init__(self, rate: float = 20.0, burst: int = 100, max_level='DEBUG', max_sites: int = 10000):
+        super().__init__()
+        self.rate = rate
+        self.burst = burst
+        self.max_level = logging.getLevelName(max_level) if isinstance(max_level, str) else max_level
+        self.max_sites = max_sites
+        self.suppressed = 0
+        self._buckets: Dict[Tuple[str, int], list] = {}
+        self._lock = threading.Lock()
+
+    def filter(self, record):
+        if record.levelno > self.max_level or self.rate <= 0:
+            return True
+        site = (record.pathname, record.lineno)
+        now = time.monotonic()
+        with self._lock:
+            bucket = self._buckets.get(site)
+            if bucket is None:
+                if len(self._buckets) >= self.max_sites:
+                    self._buckets.clear()
+                bucket = self._buckets[site] = [float(self.burst), now]
+            tokens = min(self.burst, bucket[0] + (now - bucket[1]) * self.rate)
+            bucket[1] = now
+            if tokens < 1:
+                bucket[0] = tokens
+                self.suppressed += 1
+                return False
+            bucket[0] = tokens - 1
+            return True
+
+
+class DrainingQueueListener(QueueListener):
+    """QueueListener whose stop() waits for room in a full queue instead of raising"""
+
+    def enqueue_sentinel(self):
+        self.queue.put(self._sentinel)
+
+
+class BoundedQueueHandler(QueueHandler):
+    """
+    QueueHandler for a bounded queue that never blocks the logging thread.
+
+    When the queue is full the record is dropped (``drop_policy='drop_new'``)
+    or the oldest queued record is discarded to make room
+    (``drop_policy='drop_oldest'``). Drops are counted and reported by a
+    warning record once there is room again. The listener that dictConfig
+    attaches is started on first use in each process and stopped at exit.
+    """
+
+    DROP_REPORT_INTERVAL = 10.0
+
+    def __init__(self, queue, drop_policy: str = 'drop_new'):
+        super().__init__(queue)
+        if drop_policy not in ('drop_new', 'drop_oldest'):
+            raise ValueError(f"Unknown drop_policy: {drop_policy}")
+        self.drop_policy = drop_policy
+        self.dropped = 0
+        self._unreported = 0
+        self._last_report = 0.0
+        self._listener_pid = None
+        self._lock = threading.Lock()
+
+    def prepare(self, record):
+        # merge args and render the traceback here, but leave JSON formatting to the listener
+        record = logging.makeLogRecord(vars(record))
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def emit(self, record):
+        self._ensure_listener()
+        super().emit(record)
+
+    def enqueue(self, record):
+        if self._put(record):
+            if self._unreported and time.monotonic() - self._last_report >= self.DROP_REPORT_INTERVAL:
+                self._report_drops()
+            return
+        with self._lock:
+            self.dropped += 1
+            self._unreported += 1
+
+    def _put(self, record) -> bool:
+        try:
+            self.queue.put_nowait(record)
+            return True
+        except queue.Full:
+            if self.drop_policy != 'drop_oldest':
+                return False
+        try:
+            self.queue.get_nowait()
+            with self._lock:
+                self.dropped += 1
+                self._unreported += 1
+            self.queue.put_nowait(record)
+            return True
+        except (queue.Empty, queue.Full):
+            return False
+
+    def _report_drops(self):
+        with self._lock:
+            count, self._unreported = self._unreported, 0
+            self._last_report = time.monotonic()
+        if count:
+            report = logging.makeLogRecord({
+                'name': __name__, 'levelno': logging.WARNING, 'levelname': 'WARNING',
+                'msg': f"Log queue full: dropped {count} records", 'dropped': count,
+            })
+            self._put(report)
+
+    def _ensure_listener(self):
+        listener = getattr(self, 'listener', None)
+        if listener is None or self._listener_pid == os.getpid():
+            return
+        with self._lock:
+            if self._listener_pid != os.getpid():
+                # a forked worker inherits the flag but not the thread
+                listener._thread = None
+                listener.start()
+                self._listener_pid = os.getpid()
+                atexit.register(self.stop_listener)
+
+    def stop_listener(self):
+        listener = getattr(self, 'listener', None)
+        if listener is not None and listener._thread is not None and self._listener_pid == os.getpid():
+            listener.stop()
@@ -0,0 +1,195 @@
+from array import array
+from bisect import bisect_left, insort
+from typing import Dict, Iterable, List, Optional, Tuple
+
+# Each entry is packed into one int that sorts highest score first, then lowest
+# member id: ((_BIAS - score) << _MEMBER_BITS) | member. That keeps a million
+# entries to a million small ints instead of a million tuples.
+_MEMBER_BITS = 40
+_MEMBER_MASK = (1 << _MEMBER_BITS) - 1
+_BIAS = 1 << 62
+
+
+def _pack(member: int, score: int) -> int:
+    return ((_BIAS - score) << _MEMBER_BITS) | member
+
+
+def _unpack(key: int) -> Tuple[int, int]:
+    return key & _MEMBER_MASK, _BIAS - (key >> _MEMBER_BITS)
+
+
+class RankedScores:
+    """
+    Integer scores per member, kept ranked (highest first, ties broken by the
+    lower member id).
+
+    Entries live in a list of sorted buckets of roughly ``load`` keys, the
+    same layout as sortedcontainers' SortedList, with a Fenwick tree over the
+    bucket sizes. Updates, rank lookups and seeking to an offset are
+    O(log n); reading a page is O(log n + limit). Not thread-safe.
+    """
+
+    def __init__(self, load: int = 1000):
+        self.load = load
+        self._scores: Dict[int, int] = {}
+        self._buckets: List[List[int]] = []
+        self._maxes: List[int] = []
+        self._tree: List[int] = [0]
+
+    def __len__(self) -> int:
+        return len(self._scores)
+
+    def __contains__(self, member: int) -> bool:
+        return member in self._scores
+
+    def score(self, member: int) -> Optional[int]:
+        return self._scores.get(member)
+
+    def add(self, member: int, delta: int) -> int:
+        """Add ``delta`` to a member's score (starting from 0); returns the new score"""
+        old = self._scores.get(member)
+        if old is not None:
+            self._remove(_pack(member, old))
+        new = (old or 0) + delta
+        self._scores[member] = new
+        self._insert(_pack(member, new))
+        return new
+
+    def set(self, member: int, score: int) -> None:
+        old = self._scores.get(member)
+        if old == score:
+            return
+        if old is not None:
+            self._remove(_pack(member, old))
+        self._scores[member] = score
+        self._insert(_pack(member, score))
+
+    def discard(self, member: int) -> None:
+        old = self._scores.pop(member, None)
+        if old is not None:
+            self._remove(_pack(member, old))
+
+    def rank(self, member: int) -> Optional[int]:
+        """1-based rank of a member, or None if it has no score"""
+        score = self._scores.get(member)
+        if score is None:
+            return None
+        key = _pack(member, score)
+        i = bisect_left(self._maxes, key)
+        return self._prefix(i) + bisect_left(self._buckets[i], key) + 1
+
+    def page(self, offset: int = 0, limit: int = 20) -> List[Tuple[int, int, int]]:
+        """``(rank, member, score)`` rows starting at the 0-based ``offset``"""
+        if offset < 0 or limit <= 0 or offset >= len(self._scores):
+            return []
+        i, j = self._locate(offset)
+        rows = []
+        rank = offset + 1
+        while i < len(self._buckets) and len(rows) < limit:
+            bucket = self._buckets[i]
+            for key in bucket[j:j + limit - len(rows)]:
+                member, score = _unpack(key)
+                rows.append((rank, member, score))
+                rank += 1
+            i, j = i + 1, 0
+        return rows
+
+    def load_scores(self, scores: Iterable[Tuple[int, int]]) -> None:
+        """Replace all entries with ``(member, score)`` pairs in one O(n log n) build"""
+        self._scores = dict(scores)
+        keys = sorted(_pack(member, score) for member, score in self._scores.items())
+        self._buckets = [keys[n:n + self.load] for n in range(0, len(keys), self.load)]
+        self._maxes = [bucket[-1] for bucket in self._buckets]
+        self._rebuild_tree()
+
+    def copy(self) -> 'RankedScores':
+        clone = RankedScores(load=self.load)
+        clone._scores = dict(self._scores)
+        clone._buckets = [bucket[:] for bucket in self._buckets]
+        clone._maxes = self._maxes[:]
+        clone._tree = self._tree[:]
+        return clone
+
+    def to_arrays(self) -> Tuple[array, array]:
+        """Members and scores in rank order, compact enough to persist a million entries"""
+        members, scores = array('q'), array('q')
+        for bucket in self._buckets:
+            for key in bucket:
+                member, score = _unpack(key)
+                members.append(member)
+                scores.append(score)
+        return members, scores
+
+    @classmethod
+    def from_arrays(cls, members: array, scores: array, load: int = 1000) -> 'RankedScores':
+        ranked = cls(load=load)
+        ranked.load_scores(zip(members, scores))
+        return ranked
+
+    def _insert(self, key: int) -> None:
+        if not self._buckets:
+            self._buckets.append([key])
+            self._maxes.append(key)
+            self._rebuild_tree()
+            return
+        i = bisect_left(self._maxes, key)
+        if i == len(self._maxes):
+            i -= 1
+            self._buckets[i].append(key)
+            self._maxes[i] = key
+        else:
+            insort(self._buckets[i], key)
+        bucket = self._buckets[i]
+        if len(bucket) > 2 * self.load:
+            half = len(bucket) // 2
+            self._buckets[i:i + 1] = [bucket[:half], bucket[half:]]
+            self._maxes[i:i + 1] = [bucket[half - 1], bucket[-1]]
+            self._rebuild_tree()
+        else:
+            self._tree_add(i, 1)
+
+    def _remove(self, key: int) -> None:
+        i = bisect_left(self._maxes, key)
+        bucket = self._buckets[i]
+        del bucket[bisect_left(bucket, key)]
+        if bucket:
+            self._maxes[i] = bucket[-1]
+            self._tree_add(i, -1)
+        else:
+            del self._buckets[i]
+            del self._maxes[i]
+            self._rebuild_tree()
+
+    def _rebuild_tree(self) -> None:
+        tree = [0] + [len(bucket) for bucket in self._buckets]
+        for i in range(1, len(tree)):
+            parent = i + (i & -i)
+            if parent < len(tree):
+                tree[parent] += tree[i]
+        self._tree = tree
+
+    def _tree_add(self, i: int, delta: int) -> None:
+        i += 1
+        while i < len(self._tree):
+            self._tree[i] += delta
+            i += i & -i
+
+    def _prefix(self, i: int) -> int:
+        """Number of entries in buckets [0, i)"""
+        total = 0
+        while i > 0:
+            total += self._tree[i]
+            i -= i & -i
+        return total
+
+    def _locate(self, offset: int) -> Tuple[int, int]:
+        """(bucket index, index within bucket) of the entry at ``offset``"""
+        i = 0
+        step = 1 << (len(self._tree).bit_length() - 1)
+        while step:
+            nxt = i + step
+            if nxt < len(self._tree) and self._tree[nxt] <= offset:
+                i = nxt
+                offset -= self._tree[nxt]
+            step >>= 1
+        return i, offset
@@ -0,0 +1,74 @@
+import logging
+import threading
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib.auth.models import User
+from rest_framework.exceptions import AuthenticationFailed, NotAuthenticated
+
+from core.authentication import CachedJWTAuthentication
+
+logger = logging.getLogger(__name__)
+
+_fallback_user = None
+_fallback_lock = threading.Lock()
+
+
+def get_dev_fallback_user():
+    """
+    Returns the user configured by DEV_FALLBACK_USERNAME, looked up once per
+    process on first use. Raises NotAuthenticated when DEBUG is off, no fallback
+    is configured or the user doesn't exist.
+    """
+    global _fallback_user
+    if not settings.DEBUG:
+        raise NotAuthenticated()
+    if _fallback_user is not None:
+        return _fallback_user
+    username = settings.DEV_FALLBACK_USERNAME
+    if not username:
+        raise NotAuthenticated()
+    with _fallback_lock:
+        if _fallback_user is None:
+            try:
+                _fallback_user = User.objects.get(username=username)
+            except User.DoesNotExist:
+                logger.error(f"DEV_FALLBACK_USERNAME '{username}' does not exist")
+                raise NotAuthenticated()
+    return _fallback_user
+
+
+def reset_dev_fallback_user():
+    global _fallback_user
+    with _fallback_lock:
+        _fallback_user = None
+
+
+def get_request_user(request):
+    """
+    Returns the authenticated user for a request, or the dev fallback user
+    when the request is anonymous.
+    """
+    user = getattr(request, 'user', None)
+    if user is not None and user.is_authenticated:
+        return user
+    return get_dev_fallback_user()
+
+
+async def aget_request_user(request):
+    """Async variant of get_request_user for plain Django async views"""
+    user = None
+    if request.headers.get('Authorization'):
+        # Bearer tokens, resolved through the same cached JWT backend as the DRF views
+        try:
+            result = await sync_to_async(CachedJWTAuthentication().authenticate)(request)
+        except AuthenticationFailed:
+            raise NotAuthenticated()
+        user = result[0] if result else None
+    if user is None and hasattr(request, 'auser'):
+        user = await request.auser()
+    if user is not None and user.is_authenticated:
+        return user
+    if settings.DEBUG and _fallback_user is not None:
+        return _fallback_user
+    return await sync_to_async(get_dev_fallback_user)()
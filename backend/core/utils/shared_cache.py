@@ -0,0 +1,30 @@
+from typing import Optional
+
+from django.conf import settings
+from django.core.cache import DEFAULT_CACHE_ALIAS
+
+# backends whose contents (and invalidations) are private to one worker process
+_PROCESS_LOCAL_BACKENDS = {
+    'django.core.cache.backends.locmem.LocMemCache',
+    'django.core.cache.backends.dummy.DummyCache',
+}
+
+
+def cache_is_shared(alias: str = DEFAULT_CACHE_ALIAS) -> bool:
+    """
+    Whether every worker process sees the same cache (Redis, Memcached,
+    database or file), so a delete or version bump in one reaches the rest.
+    """
+    return settings.CACHES[alias]['BACKEND'] not in _PROCESS_LOCAL_BACKENDS
+
+
+def bounded_timeout(timeout: Optional[int]) -> Optional[int]:
+    """
+    ``timeout`` for an entry that other processes invalidate. On a per-process
+    cache their invalidations never arrive, so the entry is capped at
+    PROCESS_LOCAL_CACHE_TTL instead, which bounds how stale it can get.
+    """
+    if cache_is_shared():
+        return timeout
+    cap = settings.PROCESS_LOCAL_CACHE_TTL
+    return cap if timeout is None else min(timeout, cap)
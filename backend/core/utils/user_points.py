@@ -1,14 +1,79 @@
-from django.db.models import Sum
-from django.contrib.auth.models import User
+from django.db import IntegrityError, transaction
+from django.db.models import F, Sum
+from django.utils import timezone
+
+from core.models import PointsBalance, Reward
+from core.services.dashboard_cache import invalidate_dashboard
+from core.services.leaderboard import record_points
 
 def get_user_total_points(user_id):
     """
-    Calculates the total points for a user by summing all their rewards.
+    Returns the total points for a user from their materialized balance.
+    """
+    total = PointsBalance.objects.filter(user_id=user_id).values_list('total_points', flat=True).first()
+    return total or 0
+
+def credit_points(user_id, points, create=True, earned_at=None):
+    """
+    Atomically adds (or, with a negative value, removes) points from a user's balance.
+    The balance row is created on first credit unless create is False. earned_at is
+    the created_at of the reward the points belong to, for the leaderboard windows.
     """
+    if not points:
+        return
+    invalidate_dashboard(user_id)
+    record_points(user_id, points, earned_at)
+    updated = PointsBalance.objects.filter(user_id=user_id).update(
+        total_points=F('total_points') + points, updated_at=timezone.now()
+    )
+    if updated or not create:
+        return
     try:
-        user = User.objects.get(pk=user_id)
-        # 'rewards' is the related_name from the Reward model's user field
-        total = user.rewards.aggregate(total_points=Sum('points'))['total_points']
-        return total or 0
-    except User.DoesNotExist:
-        return 0
+        with transaction.atomic():
+            PointsBalance.objects.create(user_id=user_id, total_points=points)
+    except IntegrityError:
+        # another request created the balance row first
+        PointsBalance.objects.filter(user_id=user_id).update(
+            total_points=F('total_points') + points, updated_at=timezone.now()
+        )
+
+def bulk_create_rewards(rewards):
+    """
+    Inserts many Reward rows at once and credits each user's balance in the same
+    transaction (bulk_create doesn't send the post_save signal).
+    """
+    # per user and day, so each total lands in the leaderboard periods its rewards belong to
+    totals = {}
+    for reward in rewards:
+        key = (reward.user_id, reward.created_at.date())
+        earned_at, points = totals.get(key, (reward.created_at, 0))
+        totals[key] = (earned_at, points + reward.points)
+    with transaction.atomic():
+        created = Reward.objects.bulk_create(rewards)
+        for (user_id, _), (earned_at, points) in totals.items():
+            credit_points(user_id, points, earned_at=earned_at)
+    return created
+
+def reward_totals(using=None):
+    """
+    Sums the Reward table per user: ``{user_id: points}`` (the slow path that
+    balances are reconciled and backfilled from).
+    """
+    return dict(Reward.objects.using(using).values('user_id').annotate(total=Sum('points')).values_list('user_id', 'total'))
+
+def backfill_points_balances(using=None):
+    """
+    Creates the balance row of every user who has rewards but no balance yet,
+    e.g. rewards earned before balances were materialized. Existing balances
+    are left alone (reconcile_points --fix rewrites those). Returns the number
+    of balances created.
+    """
+    balances = PointsBalance.objects.using(using)
+    have_balance = set(balances.values_list('user_id', flat=True))
+    missing = [
+        PointsBalance(user_id=user_id, total_points=total)
+        for user_id, total in reward_totals(using).items()
+        if user_id not in have_balance
+    ]
+    balances.bulk_create(missing, ignore_conflicts=True)
+    return len(missing)
@@ -0,0 +1,13 @@
+from rest_framework.pagination import CursorPagination
+
+
+class VideoTaskCursorPagination(CursorPagination):
+    """
+    Newest-first cursor pagination for the video catalogue. The id tiebreak
+    keeps the ordering unique so pages never skip or repeat videos created in
+    the same instant, and the (created_at, id) index serves every page.
+    """
+    ordering = ('-created_at', '-id')
+    page_size = 20
+    page_size_query_param = 'page_size'
+    max_page_size = 100
@@ -1,110 +1,205 @@
 from rest_framework import viewsets, status
 from rest_framework.decorators import api_view, permission_classes
+from rest_framework.exceptions import NotAuthenticated
 from rest_framework.permissions import IsAuthenticated
+from rest_framework.renderers import JSONRenderer
 from rest_framework.response import Response
 from django.shortcuts import get_object_or_404
 from django.db import transaction
+from django.db.models import Count
 from django.utils import timezone
 from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import require_GET, require_POST
 from django.utils.decorators import method_decorator
-from django.http import JsonResponse
+from django.http import Http404, HttpResponse, JsonResponse
 from django.views import View
+from django.conf import settings
+from django.contrib.auth.models import User
 
+import hmac
 import json
 import uuid
 import logging
 
+from core.db_routers import replica_reads
+from core.videos.pagination import VideoTaskCursorPagination
 from core.videos.permissions import IsAdminOrReadOnly
-from core.services.bitlabs_service import BitLabsService
+from core.services.ad_rewards import get_ad_reward_buffer, get_ad_reward_limiter
+from core.services.bitlabs_service import get_async_bitlabs_service, get_bitlabs_service
+from core.services.bitlabs_callbacks import InvalidCallback, callback_queue_enabled, parse_reward, process_callback
+from core.services.catalogue_cache import catalogue_cache_enabled, get_catalogue_cache, get_catalogue_version
+from core.services.dashboard_cache import ainvalidate_dashboard, get_dashboard, invalidate_dashboard
+from core.services.heartbeat_buffer import get_heartbeat_buffer, heartbeat_buffering_enabled
+from core.services.leaderboard import BOARDS, WINDOWS, get_leaderboard, leaderboard_enabled
+from core.services.metrics import get_metrics_registry, metrics_enabled
+from core.services.placement_cache import get_placements_payload
+from core.services.survey_cache import get_survey_cache
+from core.utils.request_user import aget_request_user, get_request_user
 
 from .models import (
-    AdPlacement, VideoTask, QuizQuestion, VideoWatchSession, QuizResponse, Reward,
-    UserProfile, SurveyCompletion, SurveyTransaction
+    VideoTask, QuizQuestion, VideoWatchSession, QuizResponse, Reward,
+    UserProfile, SurveyCompletion, CallbackInbox
 )
 from .serializers import (
-    AdPlacementSerializer, VideoTaskSerializer, VideoCreateSerializer,
+    VideoTaskListSerializer, VideoTaskSerializer, VideoCreateSerializer,
     VideoWatchSessionSerializer, QuizResponseInputSerializer, QuizResultSerializer, 
 )
 
-from django.contrib.auth.models import User
-
-user = User.objects.get(username="abhay")
-print(user)
-
 logger = logging.getLogger(__name__)
 
 # Video tasks viewset
 class VideoTaskViewSet(viewsets.ModelViewSet):
-    queryset = VideoTask.objects.all().order_by('-created_at')
+    queryset = VideoTask.objects.all().order_by('-created_at', '-id')
     permission_classes = [IsAdminOrReadOnly]
+    pagination_class = VideoTaskCursorPagination
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        if self.action == 'list':
+            # list rows carry only a question count; questions are loaded on detail
+            return queryset.annotate(question_count=Count('questions'))
+        if self.action == 'retrieve':
+            return queryset.prefetch_related('questions')
+        return queryset
+
     def get_serializer_class(self):
         if self.action in ['create', 'update', 'partial_update']:
             return VideoCreateSerializer
+        if self.action == 'list':
+            return VideoTaskListSerializer
         return VideoTaskSerializer
 
+    # Uncached reads may come from the replica. Cache misses are rendered from
+    # the primary: a body built from a lagging replica would be kept for the
+    # whole catalogue version.
+    def list(self, request, *args, **kwargs):
+        if not catalogue_cache_enabled():
+            with replica_reads():
+                return super().list(request, *args, **kwargs)
+        # next/previous links are absolute, so the host is part of the key
+        key = ('list', request.build_absolute_uri(request.path),
+               request.query_params.get('cursor'), request.query_params.get('page_size'))
+        return self._cached_json(key, super().list, request, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        if not catalogue_cache_enabled():
+            with replica_reads():
+                return super().retrieve(request, *args, **kwargs)
+        return self._cached_json(('detail', kwargs.get('pk')), super().retrieve, request, *args, **kwargs)
+
+    def _cached_json(self, key, render, request, *args, **kwargs):
+        """Serve a read from the catalogue cache, rendering and storing it on a miss"""
+        catalogue_cache = get_catalogue_cache()
+        version = get_catalogue_version()
+        body = catalogue_cache.get(version, key)
+        if body is None:
+            response = render(request, *args, **kwargs)
+            if response.status_code != status.HTTP_200_OK:
+                return response
+            body = JSONRenderer().render(response.data)
+            catalogue_cache.set(version, key, body)
+        return HttpResponse(body, content_type='application/json')
+
 # Start session
 @api_view(['POST'])
 # @permission_classes([IsAuthenticated])
 def start_video_session(request):
-    print("start video session")
-    task_id = request.data.get('task_id')
-    task = get_object_or_404(VideoTask, id=task_id)
-    # return existing open session if exists
-    session, created = VideoWatchSession.objects.get_or_create(
-        user=user,
-        video=task,
-        completed=False,
-        defaults={'started_at': timezone.now()}
-    )
+    """
+    Return the open session for a video, creating it on first start. Retries
+    and double taps get the same session back; clients may also send an
+    Idempotency-Key header (or idempotency_key field) per play attempt.
+    """
+    user = get_request_user(request)
+    try:
+        task_id = int(request.data.get('task_id'))
+    except (TypeError, ValueError):
+        return Response({'error': 'task_id is required.'}, status=status.HTTP_400_BAD_REQUEST)
+    idempotency_key = request.headers.get('Idempotency-Key') or request.data.get('idempotency_key') or None
+    if idempotency_key is not None and (not isinstance(idempotency_key, str) or len(idempotency_key) > 64):
+        return Response({'error': 'Invalid idempotency key.'}, status=status.HTTP_400_BAD_REQUEST)
+
+    try:
+        session, created = VideoWatchSession.objects.start(user, task_id, idempotency_key)
+    except VideoTask.DoesNotExist:
+        raise Http404('No VideoTask matches the given query.')
+    if session.video_id != task_id:
+        return Response(
+            {'error': 'Idempotency key was already used for a different video.'},
+            status=status.HTTP_409_CONFLICT
+        )
+
+    if heartbeat_buffering_enabled():
+        get_heartbeat_buffer().remember_session(session.id, user.id)
     serializer = VideoWatchSessionSerializer(session)
-    return Response(serializer.data)
+    return Response(serializer.data, status=status.HTTP_201_CREATED if created else status.HTTP_200_OK)
 
-# Update progress
-@api_view(['PUT'])
-# @permission_classes([IsAuthenticated])
-def update_watch_progress(request, session_id):
-    print("update watch progress")
-    session = get_object_or_404(VideoWatchSession, id=session_id, user=user)
-    watch_duration = request.data.get('watch_duration')
-    percent_viewed = request.data.get('percent_viewed')
+def _parse_progress(data):
+    """Read watch_duration / percent_viewed from a heartbeat, ignoring bad values"""
+    watch_duration = data.get('watch_duration')
+    percent_viewed = data.get('percent_viewed')
+    wd = pv = None
     if watch_duration is not None:
         try:
             wd = int(watch_duration)
-            if wd > session.watch_duration:
-                session.watch_duration = wd
         except:
             pass
     if percent_viewed is not None:
         try:
             pv = float(percent_viewed)
-            session.percent_viewed = max(session.percent_viewed, pv)
         except:
             pass
-    session.save()
+    return wd, pv
+
+# Update progress
+@api_view(['PUT'])
+# @permission_classes([IsAuthenticated])
+def update_watch_progress(request, session_id):
+    user = get_request_user(request)
+    logger.debug("update watch progress", extra={'session_id': session_id, 'user_id': user.id})
+    wd, pv = _parse_progress(request.data)
+    if heartbeat_buffering_enabled():
+        # coalesced in memory; progress is written to the session by the next flush
+        heartbeat_buffer = get_heartbeat_buffer()
+        if not heartbeat_buffer.owns_session(session_id, user.id):
+            raise Http404('No VideoWatchSession matches the given query.')
+        heartbeat_buffer.record(session_id, user.id, wd, pv)
+        return Response({'status': 'ok'})
+
+    # single conditional UPDATE scoped to the user's session, no read-modify-write
+    updated = VideoWatchSession.objects.filter(id=session_id, user=user).advance_progress(wd, pv)
+    if not updated:
+        raise Http404('No VideoWatchSession matches the given query.')
     return Response({'status': 'ok'})
 
 # Complete session
 @api_view(['POST'])
 # @permission_classes([IsAuthenticated])
 def complete_video_session(request, session_id):
-    print("in complete video session")
+    user = get_request_user(request)
+    logger.debug("complete video session", extra={'session_id': session_id, 'user_id': user.id})
     session = get_object_or_404(VideoWatchSession, id=session_id, user=user)
+    if heartbeat_buffering_enabled():
+        get_heartbeat_buffer().flush([session.id])
     if not session.completed:
         session.completed = True
         session.ended_at = timezone.now()
-        session.save()
+        # only touch completion fields so flushed progress isn't overwritten
+        session.save(update_fields=['completed', 'ended_at'])
     return Response({'status': 'completed'})
 
 # Submit quiz responses and grade
 @api_view(['POST'])
 # @permission_classes([IsAuthenticated])
 def submit_quiz_responses(request):
-    print("In submit quiz response")
+    user = get_request_user(request)
+    logger.debug("submit quiz responses", extra={'user_id': user.id})
     serializer_in = QuizResponseInputSerializer(many=True, data=request.data.get('responses', []))
     session_id = request.data.get('session_id')
     if not session_id:
         return Response({'detail': 'session_id required'}, status=status.HTTP_400_BAD_REQUEST)
     session = get_object_or_404(VideoWatchSession, id=session_id, user=user)
+    if heartbeat_buffering_enabled():
+        get_heartbeat_buffer().flush([session.id])
     if not serializer_in.is_valid():
         return Response(serializer_in.errors, status=status.HTTP_400_BAD_REQUEST)
 
@@ -113,30 +208,37 @@ def submit_quiz_responses(request):
     correct_answers = 0
     total_points_awarded = 0
 
+    # Load every referenced question for this video in one query
+    question_ids = {r['question'] for r in responses_data}
+    questions = QuizQuestion.objects.filter(video_id=session.video_id).for_grading(question_ids)
+    if len(questions) != len(question_ids):
+        raise Http404('No QuizQuestion matches the given query.')
+
+    quiz_responses = []
     with transaction.atomic():
         for r in responses_data:
-            q_id = r['question']
+            question = questions[r['question']]
             user_answer = r['user_answer'].strip()
-            question = get_object_or_404(QuizQuestion, id=q_id, video=session.video)
             total_questions += 1
-            is_correct = (user_answer.lower().strip() == question.correct_answer.lower().strip())
+            is_correct = question.is_correct_answer(user_answer)
             points = question.points if is_correct else 0
             if is_correct:
                 correct_answers += 1
                 total_points_awarded += points
-            QuizResponse.objects.create(
+            quiz_responses.append(QuizResponse(
                 session=session,
                 question=question,
                 user_answer=user_answer,
                 is_correct=is_correct,
                 points_awarded=points
-            )
+            ))
+        QuizResponse.objects.bulk_create(quiz_responses)
         # Award base completion points if session completed or mark completed now
         completion_points = 1
         if not session.completed:
             session.completed = True
             session.ended_at = timezone.now()
-            session.save()
+            session.save(update_fields=['completed', 'ended_at'])
         # create reward record (points from quiz + completion)
         reward_total = total_points_awarded + completion_points
         if reward_total > 0:
@@ -156,60 +258,88 @@ def submit_quiz_responses(request):
 # Google Ad mob
 @api_view(['POST'])
 def award_ad_points_view(request):
+    """
+    Creates a Reward entry for the authenticated user for watching a rewarded ad.
+    Expects {'placement_key': <key>} in the request body; the points come from the
+    placement's configured points_reward, never from the client.
+    """
+    user = get_request_user(request)
     try:
-        """
-        Creates a Reward entry for the authenticated user for watching a rewarded ad.
-        Expects {'points': <amount>} in the request body.
-        """
-        points_to_add = request.data.get('points')
-        print(f'points to add {points_to_add}')
-
-        if not isinstance(points_to_add, int) or points_to_add <= 0:
+        placement_key = request.data.get('placement_key') or settings.AD_REWARDS['DEFAULT_PLACEMENT']
+        placement = get_placements_payload()['data'].get(placement_key)
+        if not placement or placement['ad_format'] != 'REWARDED' or placement['points_reward'] <= 0:
             return Response(
-                {'error': 'A positive integer for "points" must be provided.'},
+                {'error': f'"{placement_key}" is not an enabled rewarded ad placement.'},
                 status=status.HTTP_400_BAD_REQUEST
             )
 
-        # Create a new Reward object instead of updating the user directly
-        Reward.objects.create(
-            user=user,
-            points=points_to_add,
-            session=None  # This reward is not tied to a video session
-        )
+        # Reject floods before they reach the database
+        if not get_ad_reward_limiter().allow((user.id, placement_key)):
+            return Response(
+                {'error': 'Too many ad rewards, please try again later.'},
+                status=status.HTTP_429_TOO_MANY_REQUESTS
+            )
+
+        points_to_add = placement['points_reward']
+        # This reward is not tied to a video session
+        reward = Reward(user_id=user.id, points=points_to_add, session=None)
+        if settings.AD_REWARDS.get('BATCH_ENABLED', True):
+            # returns once the reward is committed, possibly in a batch with concurrent ones
+            get_ad_reward_buffer().save(reward)
+        else:
+            reward.save()
 
         return Response(
             {'message': f'{points_to_add} points awarded successfully.'},
             status=status.HTTP_200_OK
         )
     except Exception as error:
-        print(f'Error {error}')
+        logger.error(f"Error in award_ad_points_view: {error}")
+        return Response(
+            {'error': 'Internal server error'},
+            status=status.HTTP_500_INTERNAL_SERVER_ERROR
+        )
 
 @api_view(['GET'])
 def get_placements_view(request):
     """
     Returns a dictionary of all enabled ad placements, keyed by their placement_key.
+    Served from a versioned cache with a strong ETag; If-None-Match hits get a 304.
     """
-    placements = AdPlacement.objects.filter(is_enabled=True)
-    data = {
-        p.placement_key: AdPlacementSerializer(p).data 
-        for p in placements
+    payload = get_placements_payload()
+    etag = payload['etag']
+    if_none_match = request.headers.get('If-None-Match', '')
+    if etag in [tag.strip() for tag in if_none_match.split(',')] or if_none_match.strip() == '*':
+        return HttpResponse(status=status.HTTP_304_NOT_MODIFIED, headers={'ETag': etag})
+    return HttpResponse(payload['body'], content_type='application/json', headers={'ETag': etag})
+
+def _format_survey(survey):
+    """Trim a BitLabs survey down to the fields the mobile app uses"""
+    return {
+        "id": survey.get("id"),
+        "reward": int(survey.get("value", 0)),  # BitLabs returns "value" as string → convert to int
+        "duration": survey.get("loi", 0),       # length of interview
+        "category": survey.get("category", {}).get("name", "General"),
+        "rating": survey.get("rating", 0),
+        "conversion_level": survey.get("conversion_level", "medium"),  # may not always exist
+        "click_url": survey.get("click_url"),
+        "cpi": float(survey.get("cpi", 0)),     # cost per install, convert string → float
+        "country": survey.get("country", "Unknown"),
+        "language": survey.get("language", "en"),
     }
-    print("google ad data", data)
-    return Response(data)
 
 @api_view(['GET'])
 # @permission_classes([IsAuthenticated])
 def get_surveys(request):
     """Fetch available surveys for authenticated user"""
+    user = get_request_user(request)
     try:
         user_profile, created = UserProfile.objects.get_or_create(
             user=user,
             defaults={'bitlabs_user_id': str(uuid.uuid4())}
         )
         
-        bitlabs_service = BitLabsService()
-        surveys_data = bitlabs_service.get_surveys(user_profile.bitlabs_user_id)
-        print(f'surveys data {len(surveys_data)}')
+        surveys_data = get_survey_cache().get_feed(user_profile.bitlabs_user_id)
         if surveys_data is None:
             return Response(
                 {'error': 'Failed to fetch surveys'}, 
@@ -218,22 +348,8 @@ def get_surveys(request):
         
         # Filter and format surveys for mobile
         surveys = surveys_data['data'].get('surveys', [])
-        formatted_surveys = []
-        # print(f'surveys {surveys}')
-        for survey in surveys:
-            formatted_surveys.append({
-                "id": survey.get("id"),
-                "reward": int(survey.get("value", 0)),  # BitLabs returns "value" as string → convert to int
-                "duration": survey.get("loi", 0),       # length of interview
-                "category": survey.get("category", {}).get("name", "General"),
-                "rating": survey.get("rating", 0),
-                "conversion_level": survey.get("conversion_level", "medium"),  # may not always exist
-                "click_url": survey.get("click_url"),
-                "cpi": float(survey.get("cpi", 0)),     # cost per install, convert string → float
-                "country": survey.get("country", "Unknown"),
-                "language": survey.get("language", "en"),
-            })
-        print(f'surveys {surveys}\n user balance {float(user_profile.available_balance)}\n total earning {float(user_profile.total_earnings)}')
+        formatted_surveys = [_format_survey(survey) for survey in surveys]
+        logger.debug("surveys fetched", extra={'user_id': user.id, 'surveys': len(surveys)})
         return Response({
             'surveys': formatted_surveys,
             'user_balance': float(user_profile.available_balance),
@@ -251,6 +367,7 @@ def get_surveys(request):
 # @permission_classes([IsAuthenticated])
 def start_survey(request):
     """Generate survey URL for user to start survey"""
+    user = get_request_user(request)
     try:
         survey_id = request.data.get('survey_id')
         if not survey_id:
@@ -269,18 +386,19 @@ def start_survey(request):
         if not created:
             return Response({'error': 'Survey already started'}, status=status.HTTP_400_BAD_REQUEST)
         
-        bitlabs_service = BitLabsService()
-        surveys = bitlabs_service.get_surveys(user_profile.bitlabs_user_id)
+        survey_cache = get_survey_cache()
+        surveys = survey_cache.get_feed(user_profile.bitlabs_user_id)
         if not surveys:
             survey_completion.delete()  # Cleanup
             return Response({'error': 'Failed to fetch surveys'}, status=status.HTTP_503_SERVICE_UNAVAILABLE)
         
-        # Find the survey with the matching survey_id
-        survey = next((s for s in surveys['data']['surveys'] if s['id'] == survey_id), None)
+        # Find the survey with the matching survey_id (indexed by id in the cached feed)
+        survey = survey_cache.get_survey(user_profile.bitlabs_user_id, survey_id)
         if not survey:
             survey_completion.delete()  # Cleanup
             return Response({'error': 'Survey not found'}, status=status.HTTP_404_NOT_FOUND)
         
+        invalidate_dashboard(user.id)
         # Redirect to the survey's click_url
         return Response({'survey_url': survey['click_url'], 'click_id': click_id})
         
@@ -290,55 +408,117 @@ def start_survey(request):
         logger.error(f"Error in start_survey: {e}")
         return Response({'error': 'Internal server error'}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
     
+# Async (ASGI) survey endpoints: upstream BitLabs calls don't hold a worker thread
+@require_GET
+async def get_surveys_async(request):
+    """Fetch available surveys for the user without blocking a worker thread"""
+    try:
+        user = await aget_request_user(request)
+    except NotAuthenticated as e:
+        return JsonResponse({'detail': str(e.detail)}, status=401)
+    try:
+        user_profile, created = await UserProfile.objects.aget_or_create(
+            user=user,
+            defaults={'bitlabs_user_id': str(uuid.uuid4())}
+        )
+
+        surveys_data = await get_survey_cache().aget_feed(user_profile.bitlabs_user_id)
+        if surveys_data is None:
+            return JsonResponse({'error': 'Failed to fetch surveys'}, status=503)
+
+        surveys = surveys_data['data'].get('surveys', [])
+        return JsonResponse({
+            'surveys': [_format_survey(survey) for survey in surveys],
+            'user_balance': float(user_profile.available_balance),
+            'total_earnings': float(user_profile.total_earnings),
+        })
+
+    except Exception as e:
+        logger.error(f"Error in get_surveys_async: {e}")
+        return JsonResponse({'error': 'Internal server error'}, status=500)
+
+@csrf_exempt
+@require_POST
+async def start_survey_async(request):
+    """Generate survey URL for user to start survey without blocking a worker thread"""
+    try:
+        user = await aget_request_user(request)
+    except NotAuthenticated as e:
+        return JsonResponse({'detail': str(e.detail)}, status=401)
+    try:
+        try:
+            survey_id = json.loads(request.body or b'{}').get('survey_id')
+        except (json.JSONDecodeError, AttributeError):
+            return JsonResponse({'error': 'Invalid JSON'}, status=400)
+        if not survey_id:
+            return JsonResponse({'error': 'survey_id is required'}, status=400)
+
+        user_profile = await UserProfile.objects.aget(user=user)
+        click_id = str(uuid.uuid4())
+
+        survey_completion, created = await SurveyCompletion.objects.aget_or_create(
+            user_profile=user_profile,
+            survey_id=survey_id,
+            defaults={'click_id': click_id}
+        )
+
+        if not created:
+            return JsonResponse({'error': 'Survey already started'}, status=400)
+
+        survey_cache = get_survey_cache()
+        surveys = await survey_cache.aget_feed(user_profile.bitlabs_user_id)
+        if not surveys:
+            await survey_completion.adelete()  # Cleanup
+            return JsonResponse({'error': 'Failed to fetch surveys'}, status=503)
+
+        survey = await survey_cache.aget_survey(user_profile.bitlabs_user_id, survey_id)
+        if not survey:
+            await survey_completion.adelete()  # Cleanup
+            return JsonResponse({'error': 'Survey not found'}, status=404)
+
+        await ainvalidate_dashboard(user.id)
+        return JsonResponse({'survey_url': survey['click_url'], 'click_id': click_id})
+
+    except UserProfile.DoesNotExist:
+        return JsonResponse({'error': 'User profile not found'}, status=404)
+    except Exception as e:
+        logger.error(f"Error in start_survey_async: {e}")
+        return JsonResponse({'error': 'Internal server error'}, status=500)
+
+@require_GET
+async def get_user_rewards_async(request):
+    """Proxy the user's BitLabs reward information without blocking a worker thread"""
+    try:
+        user = await aget_request_user(request)
+    except NotAuthenticated as e:
+        return JsonResponse({'detail': str(e.detail)}, status=401)
+    try:
+        user_profile = await UserProfile.objects.aget(user=user)
+        rewards = await get_async_bitlabs_service().get_user_rewards(user_profile.bitlabs_user_id)
+        if rewards is None:
+            return JsonResponse({'error': 'Failed to fetch rewards'}, status=503)
+        return JsonResponse(rewards)
+
+    except UserProfile.DoesNotExist:
+        return JsonResponse({'error': 'User profile not found'}, status=404)
+    except Exception as e:
+        logger.error(f"Error in get_user_rewards_async: {e}")
+        return JsonResponse({'error': 'Internal server error'}, status=500)
+
 @api_view(['GET'])
 # @permission_classes([IsAuthenticated])
 def user_dashboard(request):
-    """Get user dashboard data"""
+    """Get user dashboard data (cached per user until a balance or survey changes)"""
+    user = get_request_user(request)
     try:
-        user_profile = UserProfile.objects.get(user=user)
-        
-        recent_completions = SurveyCompletion.objects.filter(
-            user_profile=user_profile
-        ).order_by('-started_at')[:10]
-        
-        recent_transactions = SurveyTransaction.objects.filter(
-            user_profile=user_profile
-        ).order_by('-created_at')[:10]
-        
-        completion_data = []
-        for completion in recent_completions:
-            completion_data.append({
-                'survey_id': completion.survey_id,
-                'status': completion.status,
-                'reward_amount': float(completion.reward_amount) if completion.reward_amount else 0,
-                'started_at': completion.started_at.isoformat(),
-                'completed_at': completion.completed_at.isoformat() if completion.completed_at else None,
-            })
-        
-        transaction_data = []
-        for transaction in recent_transactions:
-            transaction_data.append({
-                'type': transaction.transaction_type,
-                'amount': float(transaction.amount),
-                'description': transaction.description,
-                'created_at': transaction.created_at.isoformat(),
-            })
-        
-        return Response({
-            'user_profile': {
-                'username': user_profile.user.username,
-                'available_balance': float(user_profile.available_balance),
-                'total_earnings': float(user_profile.total_earnings),
-            },
-            'recent_completions': completion_data,
-            'recent_transactions': transaction_data,
-        })
+        dashboard = get_dashboard(user)
+        if dashboard is None:
+            return Response(
+                {'error': 'User profile not found'}, 
+                status=status.HTTP_404_NOT_FOUND
+            )
+        return Response(dashboard)
         
-    except UserProfile.DoesNotExist:
-        return Response(
-            {'error': 'User profile not found'}, 
-            status=status.HTTP_404_NOT_FOUND
-        )
     except Exception as e:
         logger.error(f"Error in user_dashboard: {e}")
         return Response(
@@ -346,6 +526,82 @@ def user_dashboard(request):
             status=status.HTTP_500_INTERNAL_SERVER_ERROR
         )
 
+def _board_score(score, board):
+    # earnings are ranked in cents
+    return score / 100 if board == 'earnings' else score
+
+@api_view(['GET'])
+def leaderboard_view(request):
+    """
+    One page of a leaderboard plus the caller's own rank.
+    Query params: board=points|earnings, window=daily|weekly|all, offset, limit (max 100).
+    """
+    if not leaderboard_enabled():
+        return Response({'error': 'Leaderboard is disabled'}, status=status.HTTP_404_NOT_FOUND)
+    board = request.query_params.get('board', 'points')
+    window = request.query_params.get('window', 'all')
+    if board not in BOARDS or window not in WINDOWS:
+        return Response({'error': 'Unknown board or window'}, status=status.HTTP_400_BAD_REQUEST)
+    try:
+        offset = max(0, int(request.query_params.get('offset', 0)))
+        limit = min(100, max(1, int(request.query_params.get('limit', 20))))
+    except ValueError:
+        return Response({'error': 'offset and limit must be integers'}, status=status.HTTP_400_BAD_REQUEST)
+
+    try:
+        user = get_request_user(request)
+    except NotAuthenticated:
+        user = None
+
+    leaderboard = get_leaderboard()
+    if not leaderboard.loaded:
+        # no snapshot to start from; the boards are still being built from the database
+        return Response({'error': 'Leaderboard is being built'}, status=status.HTTP_503_SERVICE_UNAVAILABLE,
+                        headers={'Retry-After': '30'})
+    period, total, rows = leaderboard.top(board, window, offset, limit)
+    with replica_reads():
+        usernames = dict(User.objects.filter(id__in=[member for _, member, _ in rows]).values_list('id', 'username'))
+
+    me = leaderboard.rank(board, window, user.id) if user is not None else None
+    return Response({
+        'board': board,
+        'window': window,
+        'period': period,
+        'total': total,
+        'results': [
+            {'rank': rank, 'user_id': member, 'username': usernames.get(member), 'score': _board_score(score, board)}
+            for rank, member, score in rows
+        ],
+        'me': {'rank': me[0], 'score': _board_score(me[1], board)} if me else None,
+    })
+
+# set by reverse proxies; REMOTE_ADDR of such a request is the proxy, not the client
+FORWARDING_HEADERS = ('HTTP_FORWARDED', 'HTTP_X_FORWARDED_FOR', 'HTTP_X_REAL_IP')
+
+def _metrics_scraper_allowed(request):
+    """
+    With METRICS TOKEN set, only a scraper presenting it as a bearer token is
+    let in. Without one, only direct connections from ALLOWED_IPS are: behind
+    a reverse proxy on the same host every client would otherwise look local.
+    """
+    token = settings.METRICS.get('TOKEN')
+    if token:
+        scheme, _, presented = request.META.get('HTTP_AUTHORIZATION', '').partition(' ')
+        return scheme.lower() == 'bearer' and hmac.compare_digest(presented.encode(), token.encode())
+    if any(header in request.META for header in FORWARDING_HEADERS):
+        return False
+    return request.META.get('REMOTE_ADDR') in settings.METRICS.get('ALLOWED_IPS', [])
+
+@require_GET
+def metrics_view(request):
+    """Prometheus text exposition of the in-process request metrics, for authorised scrapers only"""
+    if not metrics_enabled() or not _metrics_scraper_allowed(request):
+        raise Http404()
+    return HttpResponse(
+        get_metrics_registry().render_prometheus(),
+        content_type='text/plain; version=0.0.4; charset=utf-8'
+    )
+
 @method_decorator(csrf_exempt, name='dispatch')
 class BitLabsCallbackView(View):
     """Handle S2S callbacks from BitLabs"""
@@ -362,77 +618,32 @@ class BitLabsCallbackView(View):
             payload = request.body.decode('utf-8')
             
             # Verify signature
-            bitlabs_service = BitLabsService()
+            bitlabs_service = get_bitlabs_service()
             if not bitlabs_service.verify_callback_signature(payload, signature):
                 logger.warning("Invalid signature in callback")
                 return JsonResponse({'error': 'Invalid signature'}, status=401)
             
-            # Parse callback data
+            # Parse and validate before queueing or applying: a malformed
+            # callback gets a 400 instead of a 500 that BitLabs would retry
             callback_data = json.loads(payload)
+            parse_reward(callback_data)
+
+            if callback_queue_enabled():
+                # Acknowledge once the raw payload is stored; drain_callback_inbox applies it
+                CallbackInbox.objects.create(payload=payload)
+                return JsonResponse({'status': 'queued'})
             
             # Process callback
-            self._process_callback(callback_data)
+            process_callback(callback_data)
             
             return JsonResponse({'status': 'success'})
             
         except json.JSONDecodeError:
             logger.error("Invalid JSON in callback")
             return JsonResponse({'error': 'Invalid JSON'}, status=400)
+        except InvalidCallback as e:
+            logger.error(f"Invalid callback: {e}")
+            return JsonResponse({'error': str(e)}, status=400)
         except Exception as e:
             logger.error(f"Error processing callback: {e}")
             return JsonResponse({'error': 'Internal server error'}, status=500)
-    
-    def _process_callback(self, data):
-        """Process the callback data and update user rewards"""
-        event_type = data.get('type')
-        user_id = data.get('uid')
-        survey_id = data.get('survey_id')
-        click_id = data.get('click_id')
-        reward = data.get('reward', 0)
-        
-        try:
-            user_profile = UserProfile.objects.get(bitlabs_user_id=user_id)
-            
-            if event_type == 'survey_completed':
-                # Update survey completion
-                survey_completion = SurveyCompletion.objects.get(
-                    user_profile=user_profile,
-                    click_id=click_id
-                )
-                survey_completion.status = 'completed'
-                survey_completion.reward_amount = reward
-                survey_completion.completed_at = timezone.now()
-                survey_completion.save()
-                
-                # Update user balance
-                user_profile.available_balance += reward
-                user_profile.total_earnings += reward
-                user_profile.save()
-                
-                # Create transaction record
-                SurveyTransaction.objects.create(
-                    user_profile=user_profile,
-                    transaction_type='survey_reward',
-                    amount=reward,
-                    description=f'Survey {survey_id} completion reward',
-                    survey_completion=survey_completion
-                )
-                
-                logger.info(f"Processed survey completion for user {user_id}: ${reward}")
-                
-            elif event_type == 'survey_rejected':
-                survey_completion = SurveyCompletion.objects.get(
-                    user_profile=user_profile,
-                    click_id=click_id
-                )
-                survey_completion.status = 'rejected'
-                survey_completion.save()
-                
-                logger.info(f"Survey rejected for user {user_id}")
-                
-        except UserProfile.DoesNotExist:
-            logger.error(f"User profile not found for BitLabs user ID: {user_id}")
-        except SurveyCompletion.DoesNotExist:
-            logger.error(f"Survey completion not found for click ID: {click_id}")
-        except Exception as e:
-            logger.error(f"Error processing callback for user {user_id}: {e}")
\ No newline at end of file
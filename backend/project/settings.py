@@ -13,8 +13,8 @@ https://docs.djangoproject.com/en/5.2/ref/settings/
 import os
 from pathlib import Path
 from decouple import config
+from django.core.exceptions import ImproperlyConfigured
 from datetime import timedelta
-from logging.handlers import RotatingFileHandler
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
@@ -33,7 +33,77 @@ BITLABS_CONFIG = {
     'APP_SECRET': config('BITLABS_APP_SECRET'),      # App secret (backup auth)
     'S2S_SECRET': config('BITLABS_S2S_SECRET'),      # For webhook signature verification
     'BASE_URL': config('BITLABS_BASE_URL', default='https://api.bitlabs.ai'),
-    'USER_ID': config('USER_ID')
+    'USER_ID': config('USER_ID'),
+    # Per-user survey feed cache (seconds)
+    'SURVEY_CACHE_TTL': config('BITLABS_SURVEY_CACHE_TTL', default=60, cast=int),
+    'SURVEY_CACHE_STALE_TTL': config('BITLABS_SURVEY_CACHE_STALE_TTL', default=240, cast=int),
+    'SURVEY_CACHE_MAX_USERS': config('BITLABS_SURVEY_CACHE_MAX_USERS', default=10000, cast=int),
+    # Shared HTTP client: connection pool, timeouts (seconds), retries and circuit breaker
+    'POOL_CONNECTIONS': config('BITLABS_POOL_CONNECTIONS', default=4, cast=int),
+    'POOL_MAXSIZE': config('BITLABS_POOL_MAXSIZE', default=32, cast=int),
+    'ASYNC_POOL_MAXSIZE': config('BITLABS_ASYNC_POOL_MAXSIZE', default=256, cast=int),
+    'CONNECT_TIMEOUT': config('BITLABS_CONNECT_TIMEOUT', default=3.05, cast=float),
+    'READ_TIMEOUT': config('BITLABS_READ_TIMEOUT', default=30, cast=float),
+    'MAX_RETRIES': config('BITLABS_MAX_RETRIES', default=2, cast=int),
+    'BACKOFF_FACTOR': config('BITLABS_BACKOFF_FACTOR', default=0.3, cast=float),
+    'BACKOFF_JITTER': config('BITLABS_BACKOFF_JITTER', default=0.3, cast=float),
+    # longest Retry-After honoured; a longer one returns the 429/503 instead of waiting
+    'MAX_RETRY_AFTER': config('BITLABS_MAX_RETRY_AFTER', default=5, cast=float),
+    'BREAKER_FAILURE_THRESHOLD': config('BITLABS_BREAKER_FAILURE_THRESHOLD', default=5, cast=int),
+    'BREAKER_RESET_TIMEOUT': config('BITLABS_BREAKER_RESET_TIMEOUT', default=30, cast=float),
+    # 'sync' processes S2S callbacks in the request, 'queue' stores them for drain_callback_inbox
+    'CALLBACK_MODE': config('BITLABS_CALLBACK_MODE', default='sync'),
+}
+
+# With DEBUG on, anonymous API requests act as this user until the app sends JWTs
+# (empty requires auth; ignored entirely when DEBUG is off)
+DEV_FALLBACK_USERNAME = config('DEV_FALLBACK_USERNAME', default='')
+
+# Buffered watch-progress heartbeats (see core.services.heartbeat_buffer)
+HEARTBEAT_BUFFER = {
+    'ENABLED': config('HEARTBEAT_BUFFER_ENABLED', default=False, cast=bool),
+    'FLUSH_INTERVAL': config('HEARTBEAT_BUFFER_FLUSH_INTERVAL', default=5.0, cast=float),
+    # sessions with pending progress before a heartbeat flushes inline
+    'MAX_PENDING': config('HEARTBEAT_BUFFER_MAX_PENDING', default=10000, cast=int),
+}
+
+# Rewarded ads: per user+placement rate limit (in the Django cache, so shared only when
+# CACHE_BACKEND is) and group-committed Reward inserts
+AD_REWARDS = {
+    'DEFAULT_PLACEMENT': config('AD_REWARDS_DEFAULT_PLACEMENT', default='home_screen_rewarded'),
+    'BURST': config('AD_REWARDS_BURST', default=3, cast=int),
+    'PER_HOUR': config('AD_REWARDS_PER_HOUR', default=30, cast=int),
+    'BATCH_ENABLED': config('AD_REWARDS_BATCH_ENABLED', default=True, cast=bool),
+    'MAX_BATCH': config('AD_REWARDS_MAX_BATCH', default=500, cast=int),
+}
+
+# Serialized video catalogue pages / details (core.services.catalogue_cache)
+VIDEO_CATALOGUE_CACHE = {
+    'ENABLED': config('VIDEO_CATALOGUE_CACHE_ENABLED', default=True, cast=bool),
+    'MAX_ENTRIES': config('VIDEO_CATALOGUE_CACHE_MAX_ENTRIES', default=2000, cast=int),
+    'MAX_BYTES': config('VIDEO_CATALOGUE_CACHE_MAX_BYTES', default=32 * 1024 * 1024, cast=int),
+}
+
+# In-memory points / earnings leaderboards (core.services.leaderboard)
+LEADERBOARD = {
+    'ENABLED': config('LEADERBOARD_ENABLED', default=True, cast=bool),
+    'STORE_PATH': config('LEADERBOARD_STORE_PATH', default=str(BASE_DIR / 'leaderboard.snapshot')),
+    'SNAPSHOT_INTERVAL': config('LEADERBOARD_SNAPSHOT_INTERVAL', default=60.0, cast=float),
+    'SNAPSHOT_MAX_AGE': config('LEADERBOARD_SNAPSHOT_MAX_AGE', default=600.0, cast=float),
+    # rebuild from the database this often to pick up other processes' credits (0 = never)
+    'REFRESH_INTERVAL': config('LEADERBOARD_REFRESH_INTERVAL', default=300.0, cast=float),
+}
+
+# Per-endpoint request metrics (core.middleware / core.services.metrics), scraped from /metrics/
+METRICS = {
+    'ENABLED': config('METRICS_ENABLED', default=True, cast=bool),
+    # scrapers send 'Authorization: Bearer <TOKEN>'; required behind a reverse proxy
+    'TOKEN': config('METRICS_TOKEN', default=''),
+    # without a TOKEN: direct (unproxied) connections from these addresses only
+    'ALLOWED_IPS': config('METRICS_ALLOWED_IPS', default='127.0.0.1,::1', cast=lambda v: [ip.strip() for ip in v.split(',') if ip.strip()]),
+    # log requests slower than this / running more queries than this (0 = off)
+    'SLOW_REQUEST_MS': config('METRICS_SLOW_REQUEST_MS', default=500, cast=int),
+    'QUERY_BUDGET': config('METRICS_QUERY_BUDGET', default=20, cast=int),
 }
 
 ALLOWED_HOSTS = ["*", "10.0.2.2", "localhost", "127.0.0.1"]
@@ -56,6 +126,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'core.middleware.RequestMetricsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'corsheaders.middleware.CorsMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
@@ -89,12 +160,114 @@ WSGI_APPLICATION = 'project.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/5.2/ref/settings/#databases
 
-DATABASES = {
-    'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
+# DB_PROFILE picks the backend: 'sqlite' (single file, tuned for concurrent
+# writers) or 'postgres' (persistent or pooled connections, optional replica)
+DB_PROFILE = config('DB_PROFILE', default='sqlite')
+DB_CONN_MAX_AGE = config('DB_CONN_MAX_AGE', default=60, cast=int)
+
+if DB_PROFILE == 'sqlite':
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': config('SQLITE_PATH', default=str(BASE_DIR / 'db.sqlite3')),
+            'CONN_MAX_AGE': DB_CONN_MAX_AGE,
+            'CONN_HEALTH_CHECKS': True,
+            'OPTIONS': {
+                # WAL lets readers run alongside the one writer; NORMAL sync is still crash-safe in WAL mode
+                'init_command': ';'.join([
+                    'PRAGMA journal_mode=WAL',
+                    'PRAGMA synchronous=NORMAL',
+                    f"PRAGMA cache_size=-{config('SQLITE_CACHE_KB', default=16384, cast=int)}",
+                    f"PRAGMA mmap_size={config('SQLITE_MMAP_MB', default=128, cast=int) * 1024 * 1024}",
+                    'PRAGMA temp_store=MEMORY',
+                ]),
+                # seconds a writer waits for the lock before "database is locked"
+                'timeout': config('SQLITE_BUSY_TIMEOUT', default=20, cast=float),
+                # take the write lock at BEGIN, so transactions queue on the busy timeout
+                # instead of failing when a reader tries to upgrade
+                'transaction_mode': 'IMMEDIATE',
+            },
+        }
     }
-}
+elif DB_PROFILE == 'postgres':
+    _postgres = {
+        'ENGINE': 'django.db.backends.postgresql',
+        'NAME': config('POSTGRES_DB', default='teebal'),
+        'USER': config('POSTGRES_USER', default='teebal'),
+        'PASSWORD': config('POSTGRES_PASSWORD', default=''),
+        'HOST': config('POSTGRES_HOST', default='127.0.0.1'),
+        'PORT': config('POSTGRES_PORT', default='5432'),
+        'OPTIONS': {
+            'connect_timeout': config('POSTGRES_CONNECT_TIMEOUT', default=5, cast=int),
+        },
+    }
+    if config('POSTGRES_POOL', default=False, cast=bool):
+        # psycopg 3 connection pool per process (needs psycopg[pool]); Django requires CONN_MAX_AGE = 0 with it
+        _postgres['CONN_MAX_AGE'] = 0
+        _postgres['OPTIONS']['pool'] = {
+            'min_size': config('POSTGRES_POOL_MIN_SIZE', default=2, cast=int),
+            'max_size': config('POSTGRES_POOL_MAX_SIZE', default=20, cast=int),
+            'timeout': config('POSTGRES_POOL_TIMEOUT', default=10, cast=float),
+        }
+    else:
+        _postgres['CONN_MAX_AGE'] = DB_CONN_MAX_AGE
+        _postgres['CONN_HEALTH_CHECKS'] = True
+    DATABASES = {'default': _postgres}
+
+    # Read replica for reads wrapped in core.db_routers.replica_reads(). That is
+    # only the leaderboard's username lookup and, with VIDEO_CATALOGUE_CACHE
+    # disabled, the video list / detail; with the catalogue cache on (the
+    # default) cache misses read from default, so the replica takes little load.
+    _replica_host = config('POSTGRES_REPLICA_HOST', default='')
+    if _replica_host:
+        DATABASES['replica'] = {
+            **_postgres,
+            'HOST': _replica_host,
+            'PORT': config('POSTGRES_REPLICA_PORT', default=_postgres['PORT']),
+            'OPTIONS': {**_postgres['OPTIONS']},
+            'TEST': {'MIRROR': 'default'},
+        }
+else:
+    raise ImproperlyConfigured(f"Unknown DB_PROFILE {DB_PROFILE!r}, expected 'sqlite' or 'postgres'")
+
+DATABASE_ROUTERS = ['core.db_routers.ReadReplicaRouter']
+
+
+# Cache
+# https://docs.djangoproject.com/en/5.2/ref/settings/#caches
+
+# CACHE_BACKEND 'locmem' keeps a separate cache in every worker process, so an
+# invalidation (placements, catalogue, dashboards, JWT users) only reaches the
+# process that made it; other workers catch up when their copy expires after
+# PROCESS_LOCAL_CACHE_TTL seconds. Run more than one worker with 'redis' (needs
+# the redis extra) or 'memcached' (needs the memcached extra) at CACHE_LOCATION.
+CACHE_BACKEND = config('CACHE_BACKEND', default='locmem')
+PROCESS_LOCAL_CACHE_TTL = config('PROCESS_LOCAL_CACHE_TTL', default=30, cast=int)
+
+if CACHE_BACKEND == 'locmem':
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        }
+    }
+elif CACHE_BACKEND == 'redis':
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': config('CACHE_LOCATION', default='redis://127.0.0.1:6379/0'),
+        }
+    }
+elif CACHE_BACKEND == 'memcached':
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.memcached.PyMemcacheCache',
+            'LOCATION': config('CACHE_LOCATION', default='127.0.0.1:11211'),
+        }
+    }
+else:
+    raise ImproperlyConfigured(
+        f"Unknown CACHE_BACKEND {CACHE_BACKEND!r}, expected 'locmem', 'redis' or 'memcached'"
+    )
 
 
 # Password validation
@@ -159,11 +332,24 @@ CORS_ALLOW_HEADERS = [
 ]
 
 REST_FRAMEWORK = {
+    'DEFAULT_AUTHENTICATION_CLASSES': [
+        'core.authentication.CachedJWTAuthentication',
+        'rest_framework.authentication.SessionAuthentication',
+    ],
     'DEFAULT_PERMISSION_CLASSES': [
         'rest_framework.permissions.AllowAny',  # <-- make all APIs public
     ]
 }
 
+# In-process (TTL, MAX_SIZE) and shared-cache (SHARED_TTL, 0 disables) lifetime of users resolved from JWTs.
+# TTL bounds how long other workers accept a deactivated user's tokens; the shared level is
+# skipped unless CACHES is shared between processes.
+JWT_USER_CACHE = {
+    'TTL': config('JWT_USER_CACHE_TTL', default=5, cast=int),
+    'MAX_SIZE': config('JWT_USER_CACHE_MAX_SIZE', default=10000, cast=int),
+    'SHARED_TTL': config('JWT_USER_CACHE_SHARED_TTL', default=300, cast=int),
+}
+
 SIMPLE_JWT = {
     "ACCESS_TOKEN_LIFETIME": timedelta(days=1),
     "REFRESH_TOKEN_LIFETIME": timedelta(days=30),
@@ -189,18 +375,40 @@ SIMPLE_JWT = {
 LOGGING = {
     'version': 1,
     'disable_existing_loggers': False,
+    'formatters': {
+        'json': {'()': 'core.utils.log_pipeline.JsonFormatter'},
+    },
+    'filters': {
+        # per call site budget for DEBUG lines in hot paths; INFO and up (audit logs) always pass
+        'rate_limit': {
+            '()': 'core.utils.log_pipeline.RateLimitFilter',
+            'rate': config('LOG_RATE_LIMIT', default=20.0, cast=float),
+            'burst': config('LOG_RATE_BURST', default=100, cast=int),
+            'max_level': 'DEBUG',
+        },
+    },
     'handlers': {
+        # only written to by the queue listener thread
         'teebal_file': {
-            'level': 'INFO',
+            'level': 'DEBUG',
             'class': 'logging.handlers.RotatingFileHandler',
             'filename': os.path.join(LOG_DIR, 'teebal.log'),
             'maxBytes': 5 * 1024 * 1024,  
             'backupCount': 5,            
             'encoding': 'utf-8',
+            'formatter': 'json',
+        },
+        'queue': {
+            'class': 'core.utils.log_pipeline.BoundedQueueHandler',
+            'handlers': ['teebal_file'],
+            'listener': 'core.utils.log_pipeline.DrainingQueueListener',
+            'queue': {'()': 'queue.Queue', 'maxsize': config('LOG_QUEUE_SIZE', default=10000, cast=int)},
+            'drop_policy': config('LOG_DROP_POLICY', default='drop_new'),
+            'filters': ['rate_limit'],
         },
     },
     'root': {
-        'handlers': ['teebal_file'],
-        'level': 'INFO',
+        'handlers': ['queue'],
+        'level': config('LOG_LEVEL', default='INFO'),
     },
 }
\ No newline at end of file
@@ -15,8 +15,8 @@ import LoadingScreen from './LoadingScreen';
 import CompletedTaskView from './CompletedTaskView';
 import InfoSection from './InfoSection';
 import EmptyState from './EmptyState';
-import { VideoTask, VideoWatchSession, UserResponse, QuizResult } from '../types/video';
-import { apiCall } from '../services/api';
+import { CursorPage, VideoTask, VideoWatchSession, UserResponse, QuizResult } from '../types/video';
+import { apiCall, toEndpoint } from '../services/api';
 import { RewardedAd, InterstitialAd, RewardedAdEventType, AdEventType } from 'react-native-google-mobile-ads';
 import SurveysScreen from './SurveysScreen';
 
@@ -38,7 +38,9 @@ type HomeScreenNavigationProp = StackNavigationProp<RootStackParamList, 'Home'>;
 const HomeScreen: React.FC = () => {
   // --- State for Video Tasks ---
   const [videoTasks, setVideoTasks] = useState<VideoTask[]>([]);
+  const [nextTasksPage, setNextTasksPage] = useState<string | null>(null);
   const [loading, setLoading] = useState<boolean>(true);
+  const [loadingMoreTasks, setLoadingMoreTasks] = useState<boolean>(false);
   const [currentTask, setCurrentTask] = useState<VideoTask | null>(null);
   const [session, setSession] = useState<VideoWatchSession | null>(null);
   const [videoCompleted, setVideoCompleted] = useState<boolean>(false);
@@ -102,7 +104,7 @@ const HomeScreen: React.FC = () => {
     
     Alert.alert('Reward Earned!', `You've earned ${pointsToAward} points.`);
     try {
-      await apiCall('/api/award-ad-points/', { method: 'POST', data: { points: pointsToAward } });
+      await apiCall('/api/award-ad-points/', { method: 'POST', data: { placement_key: 'home_screen_rewarded' } });
     } catch (error) {
       Alert.alert('Sync Error', 'Could not save your points.');
     }
@@ -128,24 +130,50 @@ const HomeScreen: React.FC = () => {
 
   const fetchVideoTasks = async (): Promise<void> => {
     try {
-      const response = await apiCall<{ data: VideoTask[] }>('/api/video-tasks/');
-      setVideoTasks(response.data || []);
+      const response = await apiCall<CursorPage<VideoTask>>('/api/video-tasks/');
+      setVideoTasks(response.data?.results || []);
+      setNextTasksPage(response.data?.next || null);
     } catch (error) {
       console.error('Failed to fetch video tasks:', error);
       setVideoTasks([]);
+      setNextTasksPage(null);
     } finally {
       setLoading(false);
     }
   };
 
-  const startVideoTask = async (task: VideoTask): Promise<void> => {
+  // The catalogue is cursor-paginated; follow `next` for the following page
+  const loadMoreVideoTasks = async (): Promise<void> => {
+    if (!nextTasksPage || loadingMoreTasks) return;
+    setLoadingMoreTasks(true);
     try {
-      const response = await apiCall<VideoWatchSession>('/api/start-video-session/', {
-        method: 'POST', data: { task_id: task.id },
+      const response = await apiCall<CursorPage<VideoTask>>(toEndpoint(nextTasksPage));
+      const page = response.data?.results || [];
+      setVideoTasks(prev => {
+        const seen = new Set(prev.map(task => task.id));
+        return [...prev, ...page.filter(task => !seen.has(task.id))];
       });
+      setNextTasksPage(response.data?.next || null);
+    } catch (error) {
+      console.error('Failed to fetch more video tasks:', error);
+      Alert.alert('Error', 'Failed to load more tasks');
+    } finally {
+      setLoadingMoreTasks(false);
+    }
+  };
+
+  const startVideoTask = async (task: VideoTask): Promise<void> => {
+    try {
+      // the catalogue list has no questions; load them from the task detail
+      const [response, detail] = await Promise.all([
+        apiCall<VideoWatchSession>('/api/start-video-session/', {
+          method: 'POST', data: { task_id: task.id },
+        }),
+        apiCall<VideoTask>(`/api/video-tasks/${task.id}/`),
+      ]);
       console.log("session : ", response)
       setSession(response.data);
-      setCurrentTask(task);
+      setCurrentTask(detail.data);
       setVideoCompleted(false);
       setQuizSubmitted(false);
     } catch (error) {
@@ -236,7 +264,7 @@ const HomeScreen: React.FC = () => {
         )}
         {videoCompleted && !quizSubmitted && (
           <VideoQuiz
-            questions={currentTask.questions}
+            questions={currentTask.questions || []}
             onSubmit={handleQuizSubmit}
             loading={submittingQuiz}
           />
@@ -283,11 +311,21 @@ const HomeScreen: React.FC = () => {
               key={task.id}
               title={`📹 ${task.title}`}
               description={task.description}
-              footerText={`${task.questions.length} quiz questions`}
+              footerText={`${task.question_count ?? 0} quiz questions`}
               onPress={() => showInterstitialAndStartTask(task)}
             />
           ))
         )}
+
+        {nextTasksPage && (
+          <TaskCard
+            title="More tasks"
+            description="Load the next page of video tasks."
+            footerText={loadingMoreTasks ? 'Loading...' : 'Tap to load more'}
+            onPress={loadMoreVideoTasks}
+            disabled={loadingMoreTasks}
+          />
+        )}
         
         <InfoSection 
           title="How it works:"
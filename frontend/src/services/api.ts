@@ -35,3 +35,7 @@ export const apiCall = async <T>(endpoint: string, options: ApiOptions = {}): Pr
     throw error;
   }
 };
+
+// Pagination links (e.g. a cursor page's `next`) come back as absolute URLs;
+// apiCall expects a path on BASE_URL.
+export const toEndpoint = (url: string): string => url.replace(/^https?:\/\/[^/]+/, '');
@@ -9,7 +9,15 @@ export interface VideoTask {
   youtube_url: string;
   title: string;
   description: string;
-  questions: QuizQuestion[];
+  // list responses carry question_count; questions only come with the detail
+  question_count?: number;
+  questions?: QuizQuestion[];
+}
+
+export interface CursorPage<T> {
+  next: string | null;
+  previous: string | null;
+  results: T[];
 }
 
 export interface VideoWatchSession {